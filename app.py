@@ -1,7 +1,7 @@
 import os
+import sys
 import json
 import logging
-import sqlite3
 from datetime import datetime
 from flask import Flask, render_template, jsonify, request, send_from_directory
 from pymodbus.client import ModbusTcpClient
@@ -10,8 +10,33 @@ import ipaddress
 import socket
 import threading
 import time
-import concurrent.futures
-from concurrent.futures import ThreadPoolExecutor
+
+# 共享的Modbus工具模块位于桌面应用的utils目录
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scada_desktop_app'))
+from utils.read_planner import plan_reads, read_blocks
+from utils.register_map import REGISTER_MAP, BOARD_RECORD, BMS_RECORD
+from utils.acquisition import AcquisitionLoop
+from utils.connection_health import ConnectionHealth
+from utils.async_poller import MultiDevicePoller
+from utils.poll_scheduler import GroupScheduler
+from utils.transaction_queue import TransactionQueue
+from utils.pipelined_transport import PipelinedModbusTransport
+from utils.recorder import BatchRecorder
+from utils.sqlite_store import SQLiteStore
+from utils.schema import migrate
+from utils.recordings import STORAGE_FORMATS, read_recording, to_records, delete_recording_data
+from utils.rollups import RESOLUTIONS, choose_resolution, read_rollups, sample_count
+from utils.downsample import lttb_indices
+from utils.archive import archive_available, archive_in_background
+from utils.ring_buffer import SampleRingBuffer, ring_buffer_available
+from utils.event_bus import EventBus
+from utils.async_scanner import AsyncScanner, DEFAULT_CONCURRENCY, parse_unit_ids
+from utils.log_store import (LogStore, LogSampler, LEVELS, LEVEL_DEBUG, LEVEL_INFO, LEVEL_WARNING, LEVEL_ERROR,
+                             CATEGORY_GENERAL, CATEGORY_CONNECTION, CATEGORY_READ, CATEGORY_RECORDING,
+                             CATEGORY_SCAN, CATEGORY_DEVICE)
+from utils.export import EXPORT_CSV, EXPORT_FORMATS, EXPORT_MIMETYPES, iter_export
+from utils.wire_format import (FORMATS, FORMAT_ROWS, FORMAT_COLUMNAR, FORMAT_BINARY, BINARY_MIMETYPE,
+                               encode_columnar, encode_binary, compress)
 
 # 设置环境变量以确保UTF-8编码
 os.environ['PYTHONIOENCODING'] = 'utf-8'
@@ -36,14 +61,34 @@ app = Flask(__name__, template_folder='templates', static_folder='static')
 # 数据库文件路径
 DB_FILE = 'modbus_data.db'
 
+# 数据库连接：一个长期保持的写连接（WAL模式）和只读连接池
+db = SQLiteStore(DB_FILE)
+
 # 存储Modbus连接配置
 modbus_config = {
     'host': '192.168.1.10',
-    'port': 502
+    'port': 502,
+    'gap_tolerance': 0,  # 合并读取时允许跨越的空洞寄存器数量
+    'poll_interval': 1.0,  # 多设备轮询的最短周期（秒）
+    'group_periods': {},  # 覆盖寄存器分组的默认轮询周期 {分组名: 秒}
+    'keepalive_idle': 10.0,  # 链路空闲超过该秒数才发送保活探测
+    'transport': 'pymodbus',  # 传输方式: pymodbus, lean(精简编解码, 串行) 或 pipelined(精简编解码, 流水线)
+    'pipeline_window': 4,  # 流水线模式下每个连接允许的未完成请求数
+    'record_interval': 1.0,  # 服务端记录的样本间隔（秒），采集快照更频繁时按该间隔抽取；0表示记录每个快照
+    'storage_format': 'columns',  # 记录存储格式: columns(每个数据项一列) 或 raw(打包的原始寄存器，约为1/4大小)
+    'archive_recordings': False,  # 记录结束后归档为Parquet文件并从数据库中删除样本（可选功能，需要pyarrow）
+    'read_log_interval': 10.0,  # 同一寄存器区间的读取日志最短记录间隔（秒），期间的重复记录合并计数
+    'scan_ports': [502],  # 设备扫描默认检查的端口
+    'scan_unit_ids': [1]  # 设备扫描在开放端口上探测的单元ID（网关后面可能有多个从站）
 }
 
-# 通信日志
-communication_log = []
+# 通信日志：固定容量的环形缓冲区，客户端按序号增量获取
+communication_log = LogStore(capacity=1000)
+# 采集热路径上的读取日志按间隔采样
+read_log_sampler = LogSampler(interval=modbus_config['read_log_interval'])
+
+# 实时事件推送：数据快照、日志和状态变化由一个发布者推送给所有页面
+live_events = EventBus()
 
 # 连接状态
 connection_status = {
@@ -57,297 +102,228 @@ recording_status = {
     'recording_id': None
 }
 
+def publish_recording_status(name=None):
+    """推送记录状态"""
+    live_events.publish_state('recording', dict(recording_status, name=name))
+
 def init_db():
-    """初始化数据库"""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    
-    # 创建数据记录表
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS data_records (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            recording_id TEXT,
-            timestamp DATETIME,
-            in1_current REAL,
-            in1_voltage REAL,
-            in2_current REAL,
-            in2_voltage REAL,
-            in3_current REAL,
-            in3_voltage REAL,
-            in4_current REAL,
-            in4_voltage REAL,
-            in5_current REAL,
-            in5_voltage REAL,
-            in6_current REAL,
-            in6_voltage REAL,
-            in7_current REAL,
-            in7_voltage REAL,
-            in8_current REAL,
-            in8_voltage REAL,
-            in9_current REAL,
-            in9_voltage REAL,
-            in10_current REAL,
-            in10_voltage REAL,
-            ac_current REAL,
-            vbat_voltage REAL,
-            temperature REAL,
-            humidity REAL,
-            door_status INTEGER,
-            water_status INTEGER,
-            ac_status INTEGER,
-            battery1_voltage REAL,
-            battery2_voltage REAL,
-            battery3_voltage REAL,
-            battery4_voltage REAL,
-            battery5_voltage REAL,
-            battery6_voltage REAL,
-            battery7_voltage REAL,
-            battery8_voltage REAL,
-            total_voltage REAL,
-            current REAL,
-            temperature1 REAL,
-            temperature2 REAL,
-            balance_status INTEGER,
-            charge_discharge_status INTEGER,
-            battery_percentage INTEGER
-        )
-    ''')
-    
-    # 创建记录会话表
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS recording_sessions (
-            id TEXT PRIMARY KEY,
-            name TEXT,
-            start_time DATETIME,
-            end_time DATETIME
-        )
-    ''')
-    
-    conn.commit()
-    conn.close()
+    """初始化数据库（创建或升级数据库结构）"""
+    with db.write() as conn:
+        migrate(conn)
 
-def log_communication(message):
+def log_communication(message, level=LEVEL_INFO, category=CATEGORY_GENERAL):
     """记录通信日志"""
-    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    log_entry = f"[{timestamp}] {message}"
-    communication_log.append(log_entry)
-    if len(communication_log) > 100:  # 只保留最近100条日志
-        communication_log.pop(0)
-    logger.info(message)
+    entry = communication_log.append(message, level, category)
+    live_events.publish('log', entry.to_dict())
+    getattr(logger, level)(message)
+
+def log_sampled(key, message, level=LEVEL_INFO, category=CATEGORY_READ):
+    """
+    采样记录热路径日志：同一个key在间隔内只记录一次
+
+    Args:
+        message (callable): 返回日志内容的函数，只在需要记录时才格式化
+    """
+    suppressed = read_log_sampler.sample(key)
+    if suppressed is None:
+        return
+    text = message()
+    if suppressed:
+        text += f" (期间另有 {suppressed} 次)"
+    log_communication(text, level, category)
 
 class ModbusReader:
     def __init__(self):
         self.client = None
+        self.health = ConnectionHealth(idle_threshold=modbus_config['keepalive_idle'])
+        # 所有设备I/O经由同一工作线程串行执行，相同的并发读取只执行一次
+        self.io = TransactionQueue('modbus-io')
+    
+    def _update_connection_status(self):
+        """根据连接健康状态更新全局连接状态"""
+        connection_status['connected'] = self.health.is_connected()
+        connection_status['last_check'] = self.health.last_check() or datetime.now().isoformat()
+        # 只在连接状态变化时推送
+        live_events.publish_state('status', {'connected': connection_status['connected']})
     
     def connect(self, host, port):
         """连接到Modbus TCP服务器"""
+        return self.io.call(self._connect, host, port)
+    
+    def _connect(self, host, port):
         try:
             if self.client:
                 self.client.close()
             
-            self.client = ModbusTcpClient(host, port)
+            if modbus_config['transport'] == 'pipelined':
+                self.client = PipelinedModbusTransport(host, port, window=modbus_config['pipeline_window'])
+            elif modbus_config['transport'] == 'lean':
+                self.client = PipelinedModbusTransport(host, port, pipelining=False)
+            else:
+                self.client = ModbusTcpClient(host, port)
             connection = self.client.connect()
             
             if connection:
-                log_communication(f"成功连接到Modbus服务器 {host}:{port}")
-                connection_status['connected'] = True
-                connection_status['last_check'] = datetime.now().isoformat()
+                read_log_sampler.reset()
+                log_communication(f"成功连接到Modbus服务器 {host}:{port}", category=CATEGORY_CONNECTION)
+                self.health.mark_connected()
+                self._update_connection_status()
                 return True
             else:
-                log_communication(f"无法连接到Modbus服务器 {host}:{port}")
-                connection_status['connected'] = False
-                connection_status['last_check'] = datetime.now().isoformat()
+                log_communication(f"无法连接到Modbus服务器 {host}:{port}", LEVEL_WARNING, CATEGORY_CONNECTION)
+                self.health.mark_disconnected()
+                self._update_connection_status()
                 return False
         except Exception as e:
-            log_communication(f"连接Modbus服务器时出错: {str(e)}")
-            connection_status['connected'] = False
-            connection_status['last_check'] = datetime.now().isoformat()
+            log_communication(f"连接Modbus服务器时出错: {str(e)}", LEVEL_ERROR, CATEGORY_CONNECTION)
+            self.health.mark_disconnected()
+            self._update_connection_status()
             return False
     
     def is_connected(self):
-        """检查连接状态"""
+        """检查连接状态（根据实际通信结果判断，仅在链路空闲过久时发送保活探测）"""
         if not self.client:
             return False
+        if self.health.needs_probe():
+            self.io.call(self._probe, key=('probe',))
+        self._update_connection_status()
+        return connection_status['connected']
+    
+    def _probe(self):
+        """发送保活探测：读取一个寄存器"""
+        started = time.monotonic()
         try:
-            # 尝试读取一个寄存器来检查连接
             result = self.client.read_holding_registers(0x0000, 1, slave=1)
-            is_conn = not result.isError()
-            connection_status['connected'] = is_conn
-            connection_status['last_check'] = datetime.now().isoformat()
-            return is_conn
-        except:
-            connection_status['connected'] = False
-            connection_status['last_check'] = datetime.now().isoformat()
-            return False
+            ok = not result.isError()
+            self.health.record(ok, time.monotonic() - started, None if ok else result)
+        except Exception as e:
+            self.health.record_failure(e)
     
-    def read_board_data(self):
+    def read_registers(self, ranges):
+        """按读取规划合并寄存器区间并读取，返回寄存器映像"""
+        if not self.client:
+            return None
+
+        blocks = plan_reads(ranges, gap_tolerance=modbus_config.get('gap_tolerance', 0))
+        key = ('read',) + tuple((block.address, block.count) for block in blocks)
+        return self.io.call(self._read_blocks, blocks, key=key)
+
+    def _read_blocks(self, blocks):
+        if not self.client:
+            return None
+        image, failures = read_blocks(self.client, blocks, slave=1, on_transaction=self.health.record)
+        self._update_connection_status()
+        # 每次采集都会执行：成功的读取按间隔采样记录，只在需要记录时才格式化寄存器值
+        for block in blocks:
+            registers = image.get(block.address, block.count)
+            if registers is not None:
+                log_sampled(('read', block.address, block.count),
+                            lambda: f"成功读取寄存器 0x{block.address:04X}-0x{block.end - 1:04X}: {registers}",
+                            LEVEL_DEBUG)
+        for block, result in failures:
+            log_sampled(('read-failed', block.address, block.count),
+                        lambda: f"读取寄存器 0x{block.address:04X}-0x{block.end - 1:04X} 失败: {result}",
+                        LEVEL_WARNING)
+            # 恢复后的第一次成功读取立即记录
+            read_log_sampler.reset(('read', block.address, block.count))
+        return image
+
+    def read_all_data(self):
+        """一次规划读取二号板和BMS数据，返回 (board_data, bms_data)"""
+        try:
+            image = self.read_registers(REGISTER_MAP.ranges())
+            if image is None:
+                return None, None
+            return self.read_board_data(image), self.read_bms_data(image)
+        except Exception as e:
+            log_communication(f"读取数据时出错: {str(e)}", LEVEL_ERROR, CATEGORY_READ)
+            return None, None
+
+    def read_board_data(self, image=None):
         """读取二号板数据 (地址 0x0000 - 0x001B)"""
         try:
-            if not self.client:
-                return None
-            
-            # 读取电源监测数据 (0x0000 - 0x0015)
-            rr = self.client.read_holding_registers(0x0000, 22, slave=1)
-            if not rr.isError():
-                registers = rr.registers
-                
-                # 读取环境监测数据和安全状态 (0x0016 - 0x001B)
-                data = {
-                    # 电源监测数据
-                    'IN1_current': registers[0],  # mA
-                    'IN1_voltage': registers[1] / 100.0,  # V
-                    'IN2_current': registers[2],  # mA
-                    'IN2_voltage': registers[3] / 100.0,  # V
-                    'IN3_current': registers[4],  # mA
-                    'IN3_voltage': registers[5] / 100.0,  # V
-                    'IN4_current': registers[6],  # mA
-                    'IN4_voltage': registers[7] / 100.0,  # V
-                    'IN5_current': registers[8],  # mA
-                    'IN5_voltage': registers[9] / 100.0,  # V
-                    'IN6_current': registers[10],  # mA
-                    'IN6_voltage': registers[11] / 100.0,  # V
-                    'IN7_current': registers[12],  # mA
-                    'IN7_voltage': registers[13] / 100.0,  # V
-                    'IN8_current': registers[14],  # mA
-                    'IN8_voltage': registers[15] / 100.0,  # V
-                    'IN9_current': registers[16],  # mA
-                    'IN9_voltage': registers[17] / 100.0,  # V
-                    'IN10_current': registers[18],  # mA
-                    'IN10_voltage': registers[19] / 100.0,  # V
-                    'AC_current': registers[20],  # A
-                    'VBAT_voltage': registers[21] / 100.0,  # V
-                    
-                    # 环境监测数据
-                    'temperature_sign': None,  # 将在下面读取
-                    'temperature_value': None,  # 将在下面读取
-                    'humidity': None,  # 将在下面读取
-                    
-                    # 安全状态
-                    'door_status': None,  # 将在下面读取
-                    'water_status': None,  # 将在下面读取
-                    'ac_status': None  # 将在下面读取
-                }
-                
-                log_communication(f"成功读取二号板电源监测数据: {registers[:22]}")
-            else:
-                log_communication(f"读取二号板电源监测数据失败: {rr}")
-                return None
-            
-            # 读取环境监测数据 (0x0016 - 0x0018)
-            rr = self.client.read_holding_registers(0x0016, 3, slave=1)
-            if not rr.isError():
-                registers = rr.registers
-                # 处理温度符号和值
-                temp_sign = registers[0]  # 0=正数, 1=负数
-                temp_value = registers[1]  # 温度绝对值
-                actual_temp = temp_value if temp_sign == 0 else -temp_value
-                
-                data.update({
-                    'temperature_sign': temp_sign,
-                    'temperature_value': actual_temp,
-                    'humidity': registers[2]  # %RH
-                })
-                
-                log_communication(f"成功读取二号板环境监测数据: {registers}")
-            else:
-                log_communication(f"读取二号板环境监测数据失败: {rr}")
-            
-            # 读取安全状态 (0x0019 - 0x001B)
-            rr = self.client.read_holding_registers(0x0019, 3, slave=1)
-            if not rr.isError():
-                registers = rr.registers
-                data.update({
-                    'door_status': registers[0],  # 1=打开, 0=关闭
-                    'water_status': registers[1],  # 1=有水, 0=没水
-                    'ac_status': registers[2]  # 0=主电源, 1=备用电源
-                })
-                
-                log_communication(f"成功读取二号板安全状态数据: {registers}")
-            else:
-                log_communication(f"读取二号板安全状态数据失败: {rr}")
-            
+            if image is None:
+                image = self.read_registers(REGISTER_MAP.ranges(BOARD_RECORD))
+                if image is None:
+                    return None
+
+            data, missing = REGISTER_MAP.decode_record(image, BOARD_RECORD)
+            for group_name in missing:
+                log_sampled(('group-failed', group_name), lambda: f"读取二号板数据分组 {group_name} 失败", LEVEL_WARNING)
             return data
         except Exception as e:
-            log_communication(f"读取二号板数据时出错: {str(e)}")
+            log_communication(f"读取二号板数据时出错: {str(e)}", LEVEL_ERROR, CATEGORY_READ)
             return None
-    
-    def read_bms_data(self):
+
+    def read_bms_data(self, image=None):
         """读取BMS保护板数据 (地址 0x0100 - 0x010E)"""
         try:
-            if not self.client:
-                return None
-            
-            # 读取电池单体电压 (0x0100 - 0x0107)
-            rr = self.client.read_holding_registers(0x0100, 8, slave=1)
-            if not rr.isError():
-                registers = rr.registers
-                # 读取系统级参数 (0x0108 - 0x010B)
-                rr2 = self.client.read_holding_registers(0x0108, 4, slave=1)
-                if not rr2.isError():
-                    registers2 = rr2.registers
-                    
-                    # 读取状态与控制 (0x010C - 0x010E)
-                    rr3 = self.client.read_holding_registers(0x010C, 3, slave=1)
-                    if not rr3.isError():
-                        registers3 = rr3.registers
-                        
-                        # 处理电流值 (有符号)
-                        current_raw = registers2[1]
-                        if current_raw >= 32768:
-                            current_actual = (current_raw - 65536) / 100.0
-                        else:
-                            current_actual = current_raw / 100.0
-                        
-                        data = {
-                            # 电池单体电压 (mV)
-                            'battery1_voltage': registers[0] / 1000.0,  # 转换为V
-                            'battery2_voltage': registers[1] / 1000.0,
-                            'battery3_voltage': registers[2] / 1000.0,
-                            'battery4_voltage': registers[3] / 1000.0,
-                            'battery5_voltage': registers[4] / 1000.0,
-                            'battery6_voltage': registers[5] / 1000.0,
-                            'battery7_voltage': registers[6] / 1000.0,
-                            'battery8_voltage': registers[7] / 1000.0,
-                            
-                            # 系统级参数
-                            'total_voltage': registers2[0] / 1000.0,  # mV转V
-                            'current': current_actual,  # A
-                            'temperature1': registers2[2] / 10.0,  # ℃
-                            'temperature2': registers2[3] / 10.0,  # ℃
-                            
-                            # 状态与控制
-                            'balance_status': registers3[0],  # 1=正在平衡, 0=没有平衡
-                            'charge_discharge_status': registers3[1],  # 1=充电, 2=放电, 3=空闲
-                            'battery_percentage': registers3[2]  # %
-                        }
-                        
-                        log_communication(f"成功读取BMS数据: 电池电压={registers}, 系统参数={registers2}, 状态={registers3}")
-                        return data
-                    else:
-                        log_communication(f"读取BMS状态数据失败: {rr3}")
-                else:
-                    log_communication(f"读取BMS系统参数失败: {rr2}")
-            else:
-                log_communication(f"读取BMS电池电压失败: {rr}")
-            
-            return None
+            if image is None:
+                image = self.read_registers(REGISTER_MAP.ranges(BMS_RECORD))
+                if image is None:
+                    return None
+
+            data, missing = REGISTER_MAP.decode_record(image, BMS_RECORD)
+            for group_name in missing:
+                log_sampled(('group-failed', group_name), lambda: f"读取BMS数据分组 {group_name} 失败", LEVEL_WARNING)
+            return data
         except Exception as e:
-            log_communication(f"读取BMS数据时出错: {str(e)}")
+            log_communication(f"读取BMS数据时出错: {str(e)}", LEVEL_ERROR, CATEGORY_READ)
             return None
-    
+
     def close(self):
         """关闭连接"""
+        self.io.call(self._close)
+
+    def _close(self):
         if self.client:
             self.client.close()
-            log_communication("关闭Modbus连接")
-            connection_status['connected'] = False
-            connection_status['last_check'] = datetime.now().isoformat()
+            log_communication("关闭Modbus连接", category=CATEGORY_CONNECTION)
+        self.health.mark_disconnected()
+        self._update_connection_status()
 
 # 创建Modbus读取器实例
 modbus_reader = ModbusReader()
 
+# 寄存器分组调度：电流等快变量高频读取，温湿度和状态量低频读取
+group_scheduler = GroupScheduler(periods=modbus_config['group_periods'],
+                                 gap_tolerance=modbus_config['gap_tolerance'])
+
+# 后台采集循环，所有页面共享同一份最新数据快照
+acquisition_loop = AcquisitionLoop(lambda: group_scheduler.poll(modbus_reader.read_registers),
+                                   next_poll=group_scheduler.time_until_due)
+
+# 服务端记录器：由采集循环直接提供样本，不依赖浏览器页面
+recorder = BatchRecorder(db, record_interval=modbus_config['record_interval'])
+acquisition_loop.add_listener(recorder.record_snapshot)
+
+# 近期样本环形缓冲区，实时曲线读取近期历史不需要查询数据库；
+# 每个采集快照追加一行，快照频率由最快的分组周期决定（默认200ms），容量按启动时的分组周期保留约1小时
+HISTORY_SECONDS = 3600
+HISTORY_CAPACITY = int(HISTORY_SECONDS / min(group_scheduler.periods.values()))
+history = SampleRingBuffer(HISTORY_CAPACITY) if ring_buffer_available() else None
+if history is not None:
+    acquisition_loop.add_listener(history.append_snapshot)
+
+def publish_snapshot(snapshot):
+    """采集循环的快照回调：把数据变化推送给所有页面（只推送变化的字段）"""
+    # 读取失败的记录明确推送为None，页面清除显示，不会把上一次的值当作实时数据
+    live_events.publish_state('data', snapshot.to_dict())
+
+acquisition_loop.add_listener(publish_snapshot)
+live_events.publish_state('status', {'connected': connection_status['connected']})
+publish_recording_status()
+
+# 多设备异步轮询器，同一站点的多台二号板/BMS设备共用一个事件循环
+device_poller = MultiDevicePoller(interval=modbus_config['poll_interval'],
+                                  periods=modbus_config['group_periods'],
+                                  gap_tolerance=modbus_config['gap_tolerance'])
+
 # 初始化数据库
 init_db()
+# 归档之前已结束但尚未归档的记录会话
+if modbus_config['archive_recordings']:
+    archive_in_background(db)
 
 @app.route('/')
 def index():
@@ -368,9 +344,49 @@ def config():
         data = request.json
         modbus_config['host'] = data.get('host', modbus_config['host'])
         modbus_config['port'] = int(data.get('port', modbus_config['port']))
-        return jsonify({'success': True, 'config': modbus_config})
+        modbus_config['gap_tolerance'] = int(data.get('gap_tolerance', modbus_config['gap_tolerance']))
+        modbus_config['poll_interval'] = float(data.get('poll_interval', modbus_config['poll_interval']))
+        modbus_config['keepalive_idle'] = float(data.get('keepalive_idle', modbus_config['keepalive_idle']))
+        transport = data.get('transport', modbus_config['transport'])
+        if transport not in ('pymodbus', 'lean', 'pipelined'):
+            return jsonify({'success': False, 'error': f'未知的传输方式: {transport}'}), 400
+        modbus_config['transport'] = transport
+        storage_format = data.get('storage_format', modbus_config['storage_format'])
+        if storage_format not in STORAGE_FORMATS:
+            return jsonify({'success': False, 'error': f'未知的存储格式: {storage_format}'}), 400
+        modbus_config['storage_format'] = storage_format
+        modbus_config['record_interval'] = max(0.0, float(data.get('record_interval', modbus_config['record_interval'])))
+        recorder.record_interval = modbus_config['record_interval']
+        archive_recordings = bool(data.get('archive_recordings', modbus_config['archive_recordings']))
+        if archive_recordings and not archive_available():
+            return jsonify({'success': False, 'error': '记录归档需要安装pyarrow'}), 400
+        modbus_config['archive_recordings'] = archive_recordings
+        modbus_config['read_log_interval'] = max(0.0, float(data.get('read_log_interval', modbus_config['read_log_interval'])))
+        read_log_sampler.interval = modbus_config['read_log_interval']
+        try:
+            modbus_config['scan_ports'] = parse_ports(data.get('scan_ports', modbus_config['scan_ports']))
+            modbus_config['scan_unit_ids'] = list(parse_unit_ids(data.get('scan_unit_ids', modbus_config['scan_unit_ids'])))
+        except (TypeError, ValueError) as e:
+            return jsonify({'success': False, 'error': f'扫描设置错误: {str(e)}'}), 400
+        modbus_config['pipeline_window'] = max(1, int(data.get('pipeline_window', modbus_config['pipeline_window'])))
+        modbus_reader.health.idle_threshold = modbus_config['keepalive_idle']
+        try:
+            for name, period in (data.get('group_periods') or {}).items():
+                group_scheduler.set_period(name, period)
+                modbus_config['group_periods'][name] = group_scheduler.periods[name]
+        except (KeyError, ValueError) as e:
+            return jsonify({'success': False, 'error': f'分组周期设置错误: {str(e)}'}), 400
+        group_scheduler.set_gap_tolerance(modbus_config['gap_tolerance'])
+        # poll_interval只作用于多设备轮询器；单设备采集由各分组周期（group_periods）决定
+        device_poller.set_interval(modbus_config['poll_interval'])
+        acquisition_loop.wake()
+        return jsonify({'success': True, 'config': current_config()})
     
-    return jsonify(modbus_config)
+    return jsonify(current_config())
+
+def current_config():
+    """当前配置（包含各寄存器分组的实际轮询周期）"""
+    return dict(modbus_config, group_periods=dict(group_scheduler.periods))
 
 @app.route('/api/connect', methods=['POST'])
 def connect():
@@ -380,48 +396,135 @@ def connect():
     host = data.get('host', modbus_config['host'])
     port = int(data.get('port', modbus_config['port']))
     
+    acquisition_loop.stop()
     success = modbus_reader.connect(host, port)
     if success:
         modbus_config['host'] = host
         modbus_config['port'] = port
+        group_scheduler.reset()
+        acquisition_loop.start()
     
     return jsonify({'success': success})
 
 @app.route('/api/disconnect', methods=['POST'])
 def disconnect():
     """断开Modbus服务器连接"""
+    acquisition_loop.stop()
     modbus_reader.close()
+    # 新打开的页面不再显示断开前的数据
+    live_events.clear_state('data')
     return jsonify({'success': True})
 
 @app.route('/api/connection-status')
 def get_connection_status():
     """获取连接状态"""
-    # 实时检查连接状态
+    # 根据最近的通信结果判断连接状态
     is_connected = modbus_reader.is_connected()
     return jsonify({
         'connected': is_connected,
-        'last_check': connection_status['last_check']
+        'last_check': connection_status['last_check'],
+        'health': modbus_reader.health.to_dict()
     })
 
-@app.route('/api/data')
-def get_data():
-    """获取所有数据"""
-    # 检查连接状态
-    if not modbus_reader.is_connected():
+@app.route('/api/events')
+def events():
+    """实时事件流 (Server-Sent Events)：数据快照、通信日志、连接/记录状态和扫描进度"""
+    subscription = live_events.subscribe()
+    response = app.response_class(subscription.frames(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # 反向代理不要缓冲事件流
+    return response
+
+def snapshot_response(snapshot):
+    """将数据快照转换为接口响应"""
+    # 没有快照或整次采集失败时视为连接断开
+    if snapshot is None or (snapshot.board_data is None and snapshot.bms_data is None):
         return jsonify({
             'error': '未连接到服务器',
             'connected': False
         }), 400
-        
-    board_data = modbus_reader.read_board_data()
-    bms_data = modbus_reader.read_bms_data()
+
+    result = snapshot.to_dict()
+    result['connected'] = True
+    return jsonify(result)
+
+@app.route('/api/data')
+def get_data():
+    """获取所有数据（返回后台采集的最新快照）"""
+    snapshot = acquisition_loop.latest(wait=2.0)
+    return snapshot_response(snapshot)
+
+@app.route('/api/history')
+def get_history():
+    """
+    获取内存中的近期样本（不查询数据库）
+
+    参数: seconds(最近N秒) 或 last(最近N个样本)，默认全部；columns: 逗号分隔的列名；
+    max_points: 超过时按第一个请求列做LTTB降采样；format: columnar(默认) / binary
+    """
+    if history is None:
+        return jsonify({'error': '近期历史不可用（需要安装numpy）'}), 503
+    args = request.args
+    try:
+        columns = parse_columns(args.get('columns')) or list(history.channels)
+        unknown = [c for c in columns if c not in history.channels]
+        if unknown:
+            raise ValueError(f"未知的数据列: {', '.join(unknown)}")
+        max_points = max(3, int(args['max_points'])) if args.get('max_points') else None
+        fmt = args.get('format', FORMAT_COLUMNAR)
+        if fmt not in (FORMAT_COLUMNAR, FORMAT_BINARY):
+            raise ValueError(f'未知的数据格式: {fmt}')
+        if args.get('seconds'):
+            window = history.window(float(args['seconds']))
+        else:
+            window = history.last(int(args['last']) if args.get('last') else None)
+    except ValueError as e:
+        return jsonify({'error': f'参数错误: {str(e)}'}), 400
+
+    data = window.to_columns(columns)
+    meta = {'total': len(window), 'downsampled': None}
+    if max_points is not None and len(window) > max_points:
+        keep = lttb_indices(data['ts_ms'], data[columns[0]], max_points)
+        data = {name: [values[i] for i in keep] for name, values in data.items()}
+        meta['downsampled'] = 'lttb'
+    if fmt == FORMAT_BINARY:
+        return encoded_response(encode_binary(data, meta), BINARY_MIMETYPE)
+    return encoded_response(encode_columnar(data, meta))
+
+@app.route('/api/devices', methods=['GET', 'POST'])
+def devices():
+    """获取或添加多设备轮询中的设备"""
+    if request.method == 'POST':
+        data = request.json or {}
+        host = data.get('host')
+        if not host:
+            return jsonify({'success': False, 'error': '缺少设备地址'}), 400
+        device_id = device_poller.add_device(
+            host,
+            int(data.get('port', 502)),
+            int(data.get('slave', 1)),
+            data.get('name')
+        )
+        device_poller.start()
+        log_communication(f"添加轮询设备: {device_id}", category=CATEGORY_DEVICE)
+        return jsonify({'success': True, 'device_id': device_id})
     
-    return jsonify({
-        'board_data': board_data,
-        'bms_data': bms_data,
-        'timestamp': datetime.now().isoformat(),
-        'connected': True
-    })
+    return jsonify(device_poller.devices())
+
+@app.route('/api/devices/<device_id>', methods=['DELETE'])
+def remove_device(device_id):
+    """移除多设备轮询中的设备"""
+    if not device_poller.remove_device(device_id):
+        return jsonify({'success': False, 'error': '设备不存在'}), 404
+    log_communication(f"移除轮询设备: {device_id}", category=CATEGORY_DEVICE)
+    return jsonify({'success': True})
+
+@app.route('/api/devices/<device_id>/data')
+def get_device_data(device_id):
+    """获取指定设备的最新数据快照"""
+    if device_poller.device(device_id) is None:
+        return jsonify({'error': '设备不存在'}), 404
+    return snapshot_response(device_poller.snapshot(device_id))
 
 @app.route('/api/start-recording', methods=['POST'])
 def start_recording():
@@ -434,31 +537,34 @@ def start_recording():
     # 生成记录ID
     recording_id = datetime.now().strftime('%Y%m%d_%H%M%S')
     recording_name = request.json.get('name', f'记录_{recording_id}')
+    storage = request.json.get('storage', modbus_config['storage_format'])
+    if storage not in STORAGE_FORMATS:
+        return jsonify({'success': False, 'error': f'未知的存储格式: {storage}'}), 400
     
     try:
         # 保存记录会话信息
-        conn = sqlite3.connect(DB_FILE)
-        cursor = conn.cursor()
-        cursor.execute(
-            'INSERT INTO recording_sessions (id, name, start_time) VALUES (?, ?, ?)',
-            (recording_id, recording_name, datetime.now().isoformat())
-        )
-        conn.commit()
-        conn.close()
+        with db.write() as conn:
+            conn.execute(
+                'INSERT INTO recording_sessions (id, name, start_time, storage) VALUES (?, ?, ?, ?)',
+                (recording_id, recording_name, datetime.now().isoformat(), storage)
+            )
         
         # 更新记录状态
         recording_status['is_recording'] = True
         recording_status['recording_id'] = recording_id
+        recorder.start(recording_id, storage)
+        publish_recording_status(recording_name)
         
-        log_communication(f"开始数据记录: {recording_name} (ID: {recording_id})")
+        log_communication(f"开始数据记录: {recording_name} (ID: {recording_id})", category=CATEGORY_RECORDING)
         
         return jsonify({
             'success': True,
             'recording_id': recording_id,
-            'recording_name': recording_name
+            'recording_name': recording_name,
+            'storage': storage
         })
     except Exception as e:
-        log_communication(f"开始记录时出错: {str(e)}")
+        log_communication(f"开始记录时出错: {str(e)}", LEVEL_ERROR, CATEGORY_RECORDING)
         return jsonify({'success': False, 'error': f'开始记录时出错: {str(e)}'}), 500
 
 @app.route('/api/stop-recording', methods=['POST'])
@@ -470,174 +576,286 @@ def stop_recording():
         return jsonify({'success': False, 'error': '未在记录状态'}), 400
     
     try:
-        # 更新记录会话结束时间
-        conn = sqlite3.connect(DB_FILE)
-        cursor = conn.cursor()
-        cursor.execute(
-            'UPDATE recording_sessions SET end_time = ? WHERE id = ?',
-            (datetime.now().isoformat(), recording_status['recording_id'])
-        )
-        conn.commit()
-        conn.close()
+        # 写入剩余样本后再更新记录会话结束时间
+        recorder.stop()
+        with db.write() as conn:
+            conn.execute(
+                'UPDATE recording_sessions SET end_time = ? WHERE id = ?',
+                (datetime.now().isoformat(), recording_status['recording_id'])
+            )
         
         # 更新记录状态
         recording_id = recording_status['recording_id']
         recording_status['is_recording'] = False
         recording_status['recording_id'] = None
+        publish_recording_status()
         
-        log_communication(f"停止数据记录: ID {recording_id}")
+        log_communication(f"停止数据记录: ID {recording_id}", category=CATEGORY_RECORDING)
+        if modbus_config['archive_recordings']:
+            archive_in_background(db, recording_id)
         
         return jsonify({'success': True, 'recording_id': recording_id})
     except Exception as e:
-        log_communication(f"停止记录时出错: {str(e)}")
+        log_communication(f"停止记录时出错: {str(e)}", LEVEL_ERROR, CATEGORY_RECORDING)
         return jsonify({'success': False, 'error': f'停止记录时出错: {str(e)}'}), 500
 
 @app.route('/api/save-data', methods=['POST'])
 def save_data():
-    """保存当前数据到数据库"""
-    global recording_status
-    
+    """获取服务端记录状态（数据由采集循环自动记录，保留该接口兼容旧页面）"""
     if not recording_status['is_recording']:
         return jsonify({'success': False, 'error': '未在记录状态'}), 400
-    
-    # 获取当前数据
-    board_data = modbus_reader.read_board_data()
-    bms_data = modbus_reader.read_bms_data()
-    
-    if not board_data or not bms_data:
-        return jsonify({'success': False, 'error': '读取数据失败'}), 400
-    
-    try:
-        # 保存数据到数据库
-        conn = sqlite3.connect(DB_FILE)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO data_records (
-                recording_id, timestamp,
-                in1_current, in1_voltage, in2_current, in2_voltage,
-                in3_current, in3_voltage, in4_current, in4_voltage,
-                in5_current, in5_voltage, in6_current, in6_voltage,
-                in7_current, in7_voltage, in8_current, in8_voltage,
-                in9_current, in9_voltage, in10_current, in10_voltage,
-                ac_current, vbat_voltage, temperature, humidity,
-                door_status, water_status, ac_status,
-                battery1_voltage, battery2_voltage, battery3_voltage, battery4_voltage,
-                battery5_voltage, battery6_voltage, battery7_voltage, battery8_voltage,
-                total_voltage, current, temperature1, temperature2,
-                balance_status, charge_discharge_status, battery_percentage
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            recording_status['recording_id'],
-            datetime.now().isoformat(),
-            board_data['IN1_current'], board_data['IN1_voltage'],
-            board_data['IN2_current'], board_data['IN2_voltage'],
-            board_data['IN3_current'], board_data['IN3_voltage'],
-            board_data['IN4_current'], board_data['IN4_voltage'],
-            board_data['IN5_current'], board_data['IN5_voltage'],
-            board_data['IN6_current'], board_data['IN6_voltage'],
-            board_data['IN7_current'], board_data['IN7_voltage'],
-            board_data['IN8_current'], board_data['IN8_voltage'],
-            board_data['IN9_current'], board_data['IN9_voltage'],
-            board_data['IN10_current'], board_data['IN10_voltage'],
-            board_data['AC_current'], board_data['VBAT_voltage'],
-            board_data['temperature_value'], board_data['humidity'],
-            board_data['door_status'], board_data['water_status'], board_data['ac_status'],
-            bms_data['battery1_voltage'], bms_data['battery2_voltage'],
-            bms_data['battery3_voltage'], bms_data['battery4_voltage'],
-            bms_data['battery5_voltage'], bms_data['battery6_voltage'],
-            bms_data['battery7_voltage'], bms_data['battery8_voltage'],
-            bms_data['total_voltage'], bms_data['current'],
-            bms_data['temperature1'], bms_data['temperature2'],
-            bms_data['balance_status'], bms_data['charge_discharge_status'],
-            bms_data['battery_percentage']
-        ))
-        
-        conn.commit()
-        conn.close()
-        
-        log_communication(f"保存数据记录: ID {recording_status['recording_id']}")
-        return jsonify({'success': True})
-    except Exception as e:
-        log_communication(f"保存数据时出错: {str(e)}")
-        return jsonify({'success': False, 'error': f'保存数据时出错: {str(e)}'}), 500
+    return jsonify({'success': True, 'recorder': recorder.to_dict()})
 
 @app.route('/api/recordings')
 def get_recordings():
     """获取所有记录会话"""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute('SELECT id, name, start_time, end_time FROM recording_sessions ORDER BY start_time DESC')
-    recordings = cursor.fetchall()
-    conn.close()
+    with db.read() as conn:
+        recordings = conn.execute(
+            'SELECT id, name, start_time, end_time, storage FROM recording_sessions ORDER BY start_time DESC'
+        ).fetchall()
     
     return jsonify([{
         'id': row[0],
         'name': row[1],
         'start_time': row[2],
-        'end_time': row[3]
+        'end_time': row[3],
+        'storage': row[4]
     } for row in recordings])
 
+def parse_time_ms(value):
+    """解析时间参数：epoch毫秒整数或ISO格式时间字符串，空值返回None"""
+    if value in (None, ''):
+        return None
+    if value.lstrip('-').isdigit():
+        return int(value)
+    return int(datetime.fromisoformat(value).timestamp() * 1000)
+
+def parse_columns(value):
+    """解析逗号分隔的列名参数，空值返回None（全部列）"""
+    if not value:
+        return None
+    return [c.strip() for c in value.split(',') if c.strip()]
+
+def query_recording(conn, recording_id, columns=None, start_ms=None, end_ms=None, limit=None, cursor=None,
+                    max_points=None, downsample='minmax'):
+    """
+    按时间范围、列、分页和点数预算查询记录数据
+
+    Returns:
+        tuple: (元信息 {'next_cursor', 'downsampled', 'resolution_ms', 'total'}, 按列组织的数据)
+    """
+    columns = list(columns or REGISTER_MAP.columns)
+    result = {'recording_id': recording_id, 'next_cursor': None, 'downsampled': None, 'resolution_ms': None}
+
+    if max_points is not None and limit is None:
+        total = sample_count(conn, recording_id, start_ms, end_ms)
+        result['total'] = total
+        if total > max_points:
+            if downsample == 'minmax':
+                # 使用汇总表：每个时间桶返回平均值以及最小值/最大值包络
+                resolution = choose_resolution(conn, recording_id, max_points, start_ms, end_ms)
+                rollup = read_rollups(conn, recording_id, resolution, columns, start_ms, end_ms)
+                data = {
+                    'ts_ms': rollup['ts_ms'],
+                    'timestamp': [datetime.fromtimestamp(ts / 1000).isoformat() for ts in rollup['ts_ms']],
+                    'count': rollup['count'],
+                }
+                for column in columns:
+                    data[column] = rollup[f'{column}_avg']
+                    data[f'{column}_min'] = rollup[f'{column}_min']
+                    data[f'{column}_max'] = rollup[f'{column}_max']
+                result.update(downsampled='minmax', resolution_ms=resolution)
+            else:
+                # LTTB按第一个请求列的曲线形状选点
+                data = read_recording(conn, recording_id, columns, start_ms, end_ms)
+                keep = lttb_indices(data['ts_ms'], data[columns[0]], max_points)
+                data = {name: [values[i] for i in keep] for name, values in data.items()}
+                result['downsampled'] = 'lttb'
+            return result, data
+
+    data = read_recording(conn, recording_id, columns, start_ms, end_ms, after_ms=cursor, limit=limit)
+    if limit is not None and len(data['ts_ms']) == limit:
+        result['next_cursor'] = data['ts_ms'][-1]
+    return result, data
+
+def encoded_response(payload, mimetype='application/json'):
+    """按客户端的Accept-Encoding压缩响应体"""
+    if not isinstance(payload, bytes):
+        payload = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    body, encoding = compress(payload, request.headers.get('Accept-Encoding'))
+    response = app.response_class(body, mimetype=mimetype)
+    response.headers['Vary'] = 'Accept-Encoding'
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    return response
+
 @app.route('/api/recording/<recording_id>')
 def get_recording_data(recording_id):
-    """获取指定记录会话的数据"""
+    """
+    获取指定记录会话的数据
+
+    不带参数时返回全部样本的列表（兼容旧版）；支持的参数:
+    start/end: 时间范围（epoch毫秒或ISO时间）；columns: 逗号分隔的列名；
+    limit/cursor: 分页，cursor为上一页返回的next_cursor；
+    max_points/downsample: 样本数超过max_points时降采样，minmax(汇总表包络，默认)或lttb；
+    format: rows(每行一个对象，默认) / columnar(每列一个数组，时间戳差分编码) / binary(小端float32数组)
+    """
+    args = request.args
     try:
-        conn = sqlite3.connect(DB_FILE)
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM data_records WHERE recording_id = ? ORDER BY timestamp', (recording_id,))
-        data = cursor.fetchall()
-        conn.close()
-        
-        # 获取列名
-        column_names = [description[0] for description in cursor.description]
-        
-        # 转换为字典列表
-        result = []
-        for row in data:
-            row_dict = dict(zip(column_names, row))
-            result.append(row_dict)
-        
-        return jsonify(result)
+        start_ms = parse_time_ms(args.get('start'))
+        end_ms = parse_time_ms(args.get('end'))
+        columns = parse_columns(args.get('columns'))
+        limit = max(1, int(args['limit'])) if args.get('limit') else None
+        cursor = int(args['cursor']) if args.get('cursor') else None
+        max_points = max(3, int(args['max_points'])) if args.get('max_points') else None
+        downsample = args.get('downsample', 'minmax')
+        if downsample not in ('minmax', 'lttb'):
+            raise ValueError(f'未知的降采样方式: {downsample}')
+        fmt = args.get('format', FORMAT_ROWS)
+        if fmt not in FORMATS:
+            raise ValueError(f'未知的数据格式: {fmt}')
+    except ValueError as e:
+        return jsonify({'error': f'参数错误: {str(e)}'}), 400
+
+    legacy = not any(args.get(k) for k in ('start', 'end', 'columns', 'limit', 'cursor', 'max_points', 'format'))
+    try:
+        with db.read() as conn:
+            if legacy:
+                data = read_recording(conn, recording_id)
+                data['recording_id'] = [recording_id] * len(data['ts_ms'])
+                return encoded_response(to_records(data))
+            result, data = query_recording(conn, recording_id, columns, start_ms, end_ms, limit, cursor,
+                                           max_points, downsample)
+        if fmt == FORMAT_BINARY:
+            return encoded_response(encode_binary(data, result), BINARY_MIMETYPE)
+        if fmt == FORMAT_ROWS:
+            result['records'] = to_records(data)
+            return encoded_response(result)
+        return encoded_response(encode_columnar(data, result))
+    except ValueError as e:
+        return jsonify({'error': f'参数错误: {str(e)}'}), 400
     except Exception as e:
-        log_communication(f"获取记录数据时出错: {str(e)}")
+        log_communication(f"获取记录数据时出错: {str(e)}", LEVEL_ERROR, CATEGORY_RECORDING)
         return jsonify({'error': f'获取记录数据时出错: {str(e)}'}), 500
 
+@app.route('/api/recording/<recording_id>/rollups')
+def get_recording_rollups(recording_id):
+    """
+    获取记录会话的汇总数据 (min/max/avg/count)
+
+    参数: resolution=auto|1000|60000|3600000, max_points, start, end, columns
+    """
+    try:
+        start_ms = parse_time_ms(request.args.get('start'))
+        end_ms = parse_time_ms(request.args.get('end'))
+        columns = parse_columns(request.args.get('columns'))
+        resolution = request.args.get('resolution', 'auto')
+        max_points = max(1, int(request.args.get('max_points', 1000)))
+    except ValueError as e:
+        return jsonify({'error': f'参数错误: {str(e)}'}), 400
+    try:
+        with db.read() as conn:
+            if resolution == 'auto':
+                resolution = choose_resolution(conn, recording_id, max_points, start_ms, end_ms) or RESOLUTIONS[0]
+            data = read_rollups(conn, recording_id, int(resolution), columns, start_ms, end_ms)
+        return jsonify({'resolution_ms': int(resolution), 'data': data})
+    except ValueError as e:
+        return jsonify({'error': f'参数错误: {str(e)}'}), 400
+    except Exception as e:
+        log_communication(f"获取汇总数据时出错: {str(e)}", LEVEL_ERROR, CATEGORY_RECORDING)
+        return jsonify({'error': f'获取汇总数据时出错: {str(e)}'}), 500
+
+@app.route('/api/recording/<recording_id>/export')
+def export_recording_stream(recording_id):
+    """
+    流式导出记录数据，分块输出，内存占用与记录长度无关
+
+    参数: format=csv|ndjson, start, end, columns, batch_size
+    """
+    try:
+        fmt = request.args.get('format', EXPORT_CSV)
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f'不支持的导出格式: {fmt}')
+        start_ms = parse_time_ms(request.args.get('start'))
+        end_ms = parse_time_ms(request.args.get('end'))
+        columns = parse_columns(request.args.get('columns'))
+        batch_size = min(max(1, int(request.args.get('batch_size', 5000))), 50000)
+        # 提前检查列名，避免响应开始后才报错
+        if columns:
+            unknown = [c for c in columns if c not in REGISTER_MAP.columns]
+            if unknown:
+                raise ValueError(f"未知的数据列: {', '.join(unknown)}")
+    except ValueError as e:
+        return jsonify({'error': f'参数错误: {str(e)}'}), 400
+
+    def generate():
+        # 整个导出期间占用一个只读连接；WAL模式下不阻塞实时记录的写入
+        with db.read() as conn:
+            if fmt == EXPORT_CSV:
+                yield '\ufeff'
+            yield from iter_export(conn, recording_id, fmt, columns, start_ms, end_ms,
+                                   batch_size=batch_size)
+
+    response = app.response_class(generate(), mimetype=EXPORT_MIMETYPES[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename="recording_{recording_id}.{fmt}"'
+    return response
+
 @app.route('/api/delete-recording/<recording_id>', methods=['DELETE'])
 def delete_recording(recording_id):
     """删除指定记录会话"""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    
-    # 删除数据记录
-    cursor.execute('DELETE FROM data_records WHERE recording_id = ?', (recording_id,))
-    
-    # 删除记录会话
-    cursor.execute('DELETE FROM recording_sessions WHERE id = ?', (recording_id,))
-    
-    conn.commit()
-    conn.close()
+    with db.write() as conn:
+        # 删除数据记录
+        delete_recording_data(conn, recording_id)
+        
+        # 删除记录会话
+        conn.execute('DELETE FROM recording_sessions WHERE id = ?', (recording_id,))
     
-    log_communication(f"删除数据记录: ID {recording_id}")
+    log_communication(f"删除数据记录: ID {recording_id}", category=CATEGORY_RECORDING)
     
     return jsonify({'success': True})
 
 @app.route('/api/logs')
 def get_logs():
-    """获取通信日志"""
-    return jsonify(communication_log)
+    """
+    获取通信日志
+
+    不带参数时返回最近100条日志文本（兼容旧页面）；
+    带since参数时返回序号大于since的日志，可选 limit、level(最低级别)、category 过滤
+    """
+    if not request.args:
+        return jsonify([entry.text() for entry in communication_log.tail(100)])
+
+    try:
+        since = int(request.args.get('since', 0))
+        limit = request.args.get('limit', type=int)
+    except ValueError as e:
+        return jsonify({'error': f'参数错误: {str(e)}'}), 400
+    level = request.args.get('level')
+    if level is not None and level not in LEVELS:
+        return jsonify({'error': f'未知的日志级别: {level}'}), 400
+
+    first_seq = communication_log.first_seq
+    entries = communication_log.since(since, limit, level, request.args.get('category'))
+    return jsonify({
+        'entries': [entry.to_dict() for entry in entries],
+        'latest_seq': communication_log.latest_seq,
+        # since之后的部分日志已被环形缓冲区丢弃
+        'missed': since + 1 < first_seq and since < communication_log.latest_seq
+    })
 
 @app.route('/api/logs/clear', methods=['POST'])
 def clear_logs():
     """清除通信日志"""
-    global communication_log
-    communication_log = []
+    communication_log.clear()
     log_communication("通信日志已清除")
     return jsonify({'success': True})
 
 @app.route('/api/refresh')
 def refresh_data():
-    """手动刷新数据"""
-    return get_data()
+    """手动刷新数据（立即触发一次采集）"""
+    group_scheduler.request_all()
+    snapshot = acquisition_loop.refresh(timeout=2.0)
+    return snapshot_response(snapshot)
 
 @app.route('/Modbus寄存器地址手册 .html')
 def modbus_manual():
@@ -645,29 +863,6 @@ def modbus_manual():
     return send_from_directory('.', 'Modbus寄存器地址手册 .html')
 
 
-def scan_modbus_device(ip, port=502, timeout=2):
-    """扫描单个Modbus设备"""
-    try:
-        # 创建Modbus TCP客户端
-        client = ModbusTcpClient(ip, port, timeout=timeout)
-        
-        # 尝试连接
-        if client.connect():
-            # 尝试读取一个寄存器来验证是否是Modbus设备
-            result = client.read_holding_registers(0x0000, 1, slave=1)
-            client.close()
-            
-            # 如果没有错误，说明是Modbus设备
-            return not result.isError()
-        else:
-            client.close()
-            return False
-    except Exception as e:
-        if 'client' in locals():
-            client.close()
-        return False
-
-
 def get_local_network_range():
     """获取本地网络范围"""
     try:
@@ -689,6 +884,24 @@ def get_local_network_range():
         return "192.168.1.0/24"
 
 
+# 单次扫描的最大地址数（/16网段）
+MAX_SCAN_ADDRESSES = 65536
+
+# 正在进行的设备扫描（同一时间只允许一个）
+active_scanner = None
+scan_lock = threading.Lock()
+
+def parse_ports(value):
+    """解析端口列表（整数、列表或逗号分隔的字符串）"""
+    if isinstance(value, int):
+        value = [value]
+    elif isinstance(value, str):
+        value = [part for part in value.replace(' ', '').split(',') if part]
+    ports = list(dict.fromkeys(int(port) for port in value))
+    if not ports or any(not 0 < port < 65536 for port in ports):
+        raise ValueError(f'端口必须在1-65535之间: {value}')
+    return ports
+
 def generate_ip_range(network):
     """生成IP范围内的所有IP地址"""
     try:
@@ -703,51 +916,90 @@ def generate_ip_range(network):
 
 @app.route('/api/scan-devices', methods=['POST'])
 def scan_devices():
-    """扫描网络中的Modbus设备"""
+    """开始在后台扫描网络中的Modbus设备（异步并发探测，进度和结果通过事件流推送），返回202"""
+    global active_scanner
     try:
         data = request.json
         network = data.get('network', get_local_network_range())
-        port = int(data.get('port', 502))
-        timeout = int(data.get('timeout', 1))  # 减少超时时间
-        max_workers = int(data.get('max_workers', 50))  # 默认并发数
+        adaptive = bool(data.get('adaptive', True))  # 根据RTT调整超时时间和并发数
+        try:
+            # 超时时间上限（秒，可以是小数），自适应时实际超时时间由测得的RTT决定
+            timeout = float(data.get('timeout', 1))
+            if not 0 < timeout <= 60:
+                raise ValueError(f'超时时间必须在0到60秒之间: {timeout}')
+            # 同时进行的探测数上限，自适应时从较小的并发数开始逐步增加
+            concurrency = int(data.get('max_workers', DEFAULT_CONCURRENCY))
+            if concurrency < 1:
+                raise ValueError(f'并发数必须大于0: {concurrency}')
+            # 兼容旧页面只传单个port
+            ports = parse_ports(data.get('ports', data.get('port', modbus_config['scan_ports'])))
+            unit_ids = parse_unit_ids(data.get('unit_ids', modbus_config['scan_unit_ids']))
+        except (TypeError, ValueError) as e:
+            return jsonify({'success': False, 'error': f'参数错误: {str(e)}'}), 400
         
         # 生成IP地址列表
         ip_list = generate_ip_range(network)
+        if len(ip_list) * len(ports) > MAX_SCAN_ADDRESSES:
+            return jsonify({'success': False, 'error': f'扫描范围过大（地址数×端口数最多 {MAX_SCAN_ADDRESSES}）'}), 400
         
-        # 存储发现的设备
-        found_devices = []
+        scanner = AsyncScanner(ports=ports, timeout=timeout, concurrency=concurrency, unit_ids=unit_ids,
+                               adaptive=adaptive)
+        with scan_lock:
+            if active_scanner is not None:
+                return jsonify({'success': False, 'error': '扫描已在进行中'}), 409
+            active_scanner = scanner
         
-        # 使用线程池并发扫描
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # 提交所有扫描任务
-            future_to_ip = {executor.submit(scan_modbus_device, ip, port, timeout): ip for ip in ip_list}
-            
-            # 处理完成的任务
-            for future in concurrent.futures.as_completed(future_to_ip):
-                ip = future_to_ip[future]
-                try:
-                    if future.result():
-                        found_devices.append({
-                            'ip': ip,
-                            'port': port
-                        })
-                        # 记录发现的设备
-                        log_communication(f"发现Modbus设备: {ip}:{port}")
-                except Exception as e:
-                    # 忽略单个IP扫描的错误
-                    pass
+        def on_found(result):
+            # 记录发现的设备
+            log_communication(f"发现Modbus设备: {result.host}:{result.port} (单元ID {', '.join(map(str, result.units))})",
+                              category=CATEGORY_SCAN)
+            live_events.publish('scan_device', result.to_dict())
+        
+        def on_progress(scanned, total, found):
+            live_events.publish('scan', dict(scanner.stats(), total=total))
+        
+        def run_scan():
+            global active_scanner
+            try:
+                results = scanner.scan(ip_list, on_found=on_found, on_progress=on_progress)
+                found_devices = [result.to_dict() for result in results]
+                outcome = {
+                    'success': True,
+                    'devices': found_devices,
+                    'count': len(found_devices),
+                    'stats': scanner.stats(),
+                    'stopped': scanner.stopped
+                }
+            except Exception as e:
+                log_communication(f"扫描设备时出错: {str(e)}", LEVEL_ERROR, CATEGORY_SCAN)
+                outcome = {'success': False, 'error': str(e)}
+            with scan_lock:
+                active_scanner = None
+            # 扫描结果通过事件流推送给页面
+            live_events.publish('scan_done', outcome)
         
+        # 扫描在后台线程中进行，不占用请求线程；停止扫描通过 /api/scan-devices/stop
+        threading.Thread(target=run_scan, daemon=True).start()
         return jsonify({
             'success': True,
-            'devices': found_devices,
-            'count': len(found_devices)
-        })
+            'total': len(ip_list) * len(ports)
+        }), 202
     except Exception as e:
-        log_communication(f"扫描设备时出错: {str(e)}")
+        log_communication(f"扫描设备时出错: {str(e)}", LEVEL_ERROR, CATEGORY_SCAN)
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
+@app.route('/api/scan-devices/stop', methods=['POST'])
+def stop_scan_devices():
+    """停止正在进行的设备扫描（后台扫描结束后推送scan_done事件）"""
+    scanner = active_scanner
+    if scanner is None:
+        return jsonify({'success': False, 'error': '没有正在进行的扫描'}), 400
+    scanner.stop()
+    log_communication("设备扫描已停止", category=CATEGORY_SCAN)
+    return jsonify({'success': True})
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
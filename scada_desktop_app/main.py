@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 
 import sys
+import multiprocessing
 from PyQt5.QtWidgets import QApplication
 from ui.main_window import SCADAMainWindow
 
@@ -12,4 +13,6 @@ def main():
     sys.exit(app.exec_())
 
 if __name__ == '__main__':
+    # 打包为exe后导出进程池的子进程需要
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
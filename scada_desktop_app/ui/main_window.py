@@ -17,6 +17,24 @@ from PyQt5.QtGui import QFont, QIcon, QColor, QScreen
 from utils.modbus_client import ModbusClient
 from utils.database import DatabaseManager
 from utils.scanner import DeviceScanner, ScannerThread
+from utils.async_scanner import DEFAULT_UNIT_IDS, parse_unit_ids
+from utils.export import EXPORT_CSV, EXPORT_NDJSON, export_format_from_path
+from utils.export_worker import ExportThread
+from utils.ring_buffer import SampleRingBuffer, ring_buffer_available
+from ui.trend_chart import TrendChart
+
+# 趋势图可选的数据项: (显示名称, 数据列, 单位)
+CHART_SERIES = [
+    ('IN1电流', 'in1_current', 'mA'), ('IN1电压', 'in1_voltage', 'V'),
+    ('IN2电流', 'in2_current', 'mA'), ('IN2电压', 'in2_voltage', 'V'),
+    ('电池1电压', 'battery1_voltage', 'V'), ('电池2电压', 'battery2_voltage', 'V'),
+    ('总电压', 'total_voltage', 'V'), ('电流', 'current', 'A'),
+    ('温度1', 'temperature1', '℃'), ('温度2', 'temperature2', '℃'),
+    ('环境温度', 'temperature', '℃'), ('湿度', 'humidity', '%RH'),
+]
+
+# 趋势图时间范围: (显示名称, 秒数)，None表示缓冲区中的全部样本
+CHART_WINDOWS = [('最近5分钟', 300), ('最近30分钟', 1800), ('最近1小时', 3600), ('全部', None)]
 
 class SCADAMainWindow(QMainWindow):
     def __init__(self):
@@ -33,6 +51,14 @@ class SCADAMainWindow(QMainWindow):
         self.scan_thread = None
         self.found_devices_set = set()  # 用于过滤重复设备
         
+        # 导出相关属性
+        self.export_thread = None
+        self.export_directory = ''
+        self.export_fractions = {}
+        
+        # 近期样本环形缓冲区，趋势图读取近期历史不需要查询数据库（每次刷新一个样本，最短1秒周期约6小时）
+        self.history = SampleRingBuffer(6 * 3600) if ring_buffer_available() else None
+        
         # 获取屏幕信息用于自适应调整
         self.screen = QApplication.primaryScreen()
         self.screen_geometry = self.screen.availableGeometry()
@@ -574,6 +600,15 @@ class SCADAMainWindow(QMainWindow):
         self.stop_scan_button.setEnabled(False)
         config_layout.addWidget(self.stop_scan_button, 0, 6)
         
+        # 扫描时探测的单元ID
+        unit_id_label = QLabel('单元ID:')
+        unit_id_label.setStyleSheet(f"font-size: {int(16 * self.scale_factor)}px; font-family: 'Microsoft YaHei';")
+        config_layout.addWidget(unit_id_label, 1, 0)
+        self.unit_id_input = QLineEdit(', '.join(map(str, DEFAULT_UNIT_IDS)))
+        self.unit_id_input.setPlaceholderText('如: 1,2,10-20')
+        self.unit_id_input.setStyleSheet(f"font-size: {int(16 * self.scale_factor)}px; font-family: 'Microsoft YaHei';")
+        config_layout.addWidget(self.unit_id_input, 1, 1)
+        
         # 设置列伸缩策略，使IP输入框可以扩展
         config_layout.setColumnStretch(1, 1)
         
@@ -1207,33 +1242,30 @@ class SCADAMainWindow(QMainWindow):
         chart_tab = QWidget()
         layout = QVBoxLayout(chart_tab)
         
-        chart_label = QLabel('数据趋势图 (功能待实现)')
-        chart_label.setAlignment(Qt.AlignCenter)
-        chart_label.setStyleSheet("""
-            QLabel {
-                font-size: 16px;
-                color: #7f8c8d;
-                padding: 50px;
-            }
-        """)
-        layout.addWidget(chart_label)
+        self.trend_chart = TrendChart()
+        layout.addWidget(self.trend_chart)
         
         # 图表控制
         chart_control_layout = QHBoxLayout()
         chart_control_layout.addWidget(QLabel('选择数据类型:'))
         
         self.chart_data_type = QComboBox()
-        self.chart_data_type.addItems([
-            'IN1电流', 'IN1电压', 'IN2电流', 'IN2电压',
-            '电池1电压', '电池2电压', '总电压', '电流',
-            '温度1', '温度2', '环境温度', '湿度'
-        ])
+        self.chart_data_type.addItems([title for title, _, _ in CHART_SERIES])
+        self.chart_data_type.currentIndexChanged.connect(self.update_chart)
         chart_control_layout.addWidget(self.chart_data_type)
         
+        chart_control_layout.addWidget(QLabel('时间范围:'))
+        self.chart_window = QComboBox()
+        self.chart_window.addItems([title for title, _ in CHART_WINDOWS])
+        self.chart_window.currentIndexChanged.connect(self.update_chart)
+        chart_control_layout.addWidget(self.chart_window)
+        
         self.clear_chart_button = QPushButton('清除图表')
+        self.clear_chart_button.clicked.connect(self.clear_chart)
         chart_control_layout.addWidget(self.clear_chart_button)
         
         layout.addLayout(chart_control_layout)
+        self.update_chart()
         
         self.tab_widget.addTab(chart_tab, '数据趋势图')
         
@@ -1425,22 +1457,24 @@ class SCADAMainWindow(QMainWindow):
             return
             
         try:
-            # 读取二号板数据
-            board_data = self.modbus_client.read_board_data()
+            # 一次规划读取二号板和BMS数据
+            board_data, bms_data = self.modbus_client.read_all_data()
             if board_data:
                 self.update_board_data_display(board_data)
                 self.log_message('二号板数据刷新成功')
             else:
                 self.log_message('读取二号板数据失败')
                 
-            # 读取BMS数据
-            bms_data = self.modbus_client.read_bms_data()
             if bms_data:
                 self.update_bms_data_display(bms_data)
                 self.log_message('BMS数据刷新成功')
             else:
                 self.log_message('读取BMS数据失败')
                 
+            if self.history is not None:
+                self.history.append_data(board_data, bms_data)
+                self.update_chart()
+                
             # 如果正在记录，保存数据到数据库
             if self.is_recording and self.recording_id:
                 self.db_manager.save_data(self.recording_id, board_data or {}, bms_data or {})
@@ -1449,6 +1483,23 @@ class SCADAMainWindow(QMainWindow):
             self.log_message(f'刷新数据出错: {str(e)}')
             QMessageBox.critical(self, '数据刷新错误', f'刷新数据时发生错误:\n{str(e)}')
             
+    def update_chart(self):
+        """用环形缓冲区中的近期样本重绘趋势图"""
+        if self.history is None:
+            self.trend_chart.set_message('趋势图需要安装numpy')
+            return
+        title, column, unit = CHART_SERIES[self.chart_data_type.currentIndex()]
+        seconds = CHART_WINDOWS[self.chart_window.currentIndex()][1]
+        window = self.history.last() if seconds is None else self.history.window(seconds)
+        timestamps, values = window.series(column)
+        self.trend_chart.set_series(timestamps, values, title, unit)
+        
+    def clear_chart(self):
+        """清空近期样本，趋势图从下一次刷新重新开始"""
+        if self.history is not None:
+            self.history.clear()
+        self.update_chart()
+        
     def update_board_data_display(self, data):
         # 更新电源监测数据 (IN1-IN10)
         self.in1_current_label.setText(f"{data.get('IN1_current', '--')} mA")
@@ -1639,6 +1690,10 @@ class SCADAMainWindow(QMainWindow):
                 self.progress_bar.setVisible(False)
                 return
             
+            # 扫描连接配置中的端口和单元ID
+            port = int(self.port_input.text())
+            unit_ids = parse_unit_ids(self.unit_id_input.text())
+            
             # 使用新的扫描模块进行扫描
             if self.scan_thread and self.scan_thread.isRunning():
                 self.log_message('扫描已在进行中...')
@@ -1651,8 +1706,8 @@ class SCADAMainWindow(QMainWindow):
             self.scan_results.setRowCount(0)
             self.found_devices_set.clear()
             
-            # 使用50个并发线程进行扫描
-            self.scan_thread = ScannerThread(self.scanner, base_ip, 502, 0.3, (1, 50), 50)
+            # 最多50个并发连接
+            self.scan_thread = ScannerThread(self.scanner, base_ip, port, 0.3, (1, 50), 50, unit_ids)
             self.scan_thread.start()
             
         except Exception as e:
@@ -1790,8 +1845,12 @@ class SCADAMainWindow(QMainWindow):
         self.select_all_button.setText('取消全选' if new_state == Qt.Checked else '全选')
         
     def export_selected_record(self):
-        """导出选中的记录为Excel文件"""
+        """导出选中的记录（后台导出，多个记录由进程池并行处理）"""
         try:
+            if self.export_thread is not None and self.export_thread.isRunning():
+                QMessageBox.warning(self, '警告', '正在导出记录，请稍候')
+                return
+                
             # 获取选中复选框的行
             selected_rows = []
             for row in range(self.recordings_table.rowCount()):
@@ -1806,31 +1865,27 @@ class SCADAMainWindow(QMainWindow):
             # 如果只选择了一个记录，使用保存文件对话框
             if len(selected_rows) == 1:
                 # 选择保存路径
-                file_path, _ = QFileDialog.getSaveFileName(
+                file_path, selected_filter = QFileDialog.getSaveFileName(
                     self, 
-                    '导出记录为Excel文件', 
+                    '导出记录', 
                     '', 
-                    'Excel文件 (*.xlsx);;所有文件 (*)'
+                    'Excel文件 (*.xlsx);;CSV文件 (*.csv);;NDJSON文件 (*.ndjson);;所有文件 (*)'
                 )
                 
                 if not file_path:
                     return
                     
-                # 如果用户没有添加扩展名，自动添加.xlsx
-                if not file_path.endswith('.xlsx'):
-                    file_path += '.xlsx'
+                # 如果用户没有添加扩展名，按选择的文件类型自动添加
+                if export_format_from_path(file_path) is None:
+                    if selected_filter.startswith('CSV'):
+                        file_path += f'.{EXPORT_CSV}'
+                    elif selected_filter.startswith('NDJSON'):
+                        file_path += f'.{EXPORT_NDJSON}'
+                    else:
+                        file_path += '.xlsx'
                     
-                # 导出选中的记录
-                row = selected_rows[0]
-                recording_id = self.recordings_table.item(row, 1).text()
-                
-                # 导出记录
-                if self.db_manager.export_recording_to_excel(recording_id, file_path):
-                    self.log_message(f'成功导出记录 {recording_id} 到 {file_path}')
-                    QMessageBox.information(self, '导出成功', f'成功导出记录 {recording_id}')
-                else:
-                    self.log_message('导出记录失败')
-                    QMessageBox.critical(self, '导出失败', '导出记录时发生错误')
+                recording_id = self.recordings_table.item(selected_rows[0], 1).text()
+                tasks = [(recording_id, file_path)]
             else:
                 # 如果选择了多个记录，使用选择文件夹对话框
                 directory = QFileDialog.getExistingDirectory(
@@ -1842,35 +1897,74 @@ class SCADAMainWindow(QMainWindow):
                 if not directory:
                     return
                     
-                # 导出选中的记录
-                success_count = 0
-                failed_records = []
-                
+                # 为每个记录创建独立的文件名
+                tasks = []
                 for row in selected_rows:
                     recording_id = self.recordings_table.item(row, 1).text()
-                    
-                    # 为每个记录创建独立的文件名
-                    record_file_path = os.path.join(directory, f"记录{recording_id}.xlsx")
-                    
-                    # 导出记录
-                    if self.db_manager.export_recording_to_excel(recording_id, record_file_path):
-                        success_count += 1
-                    else:
-                        failed_records.append(recording_id)
-                        
-                if success_count > 0:
-                    message = f'成功导出 {success_count} 条记录到 {directory}'
-                    if failed_records:
-                        message += f'\n以下记录导出失败: {", ".join(failed_records)}'
-                    self.log_message(message)
-                    QMessageBox.information(self, '导出成功', message)
-                else:
-                    self.log_message('导出记录失败')
-                    QMessageBox.critical(self, '导出失败', '导出记录时发生错误')
+                    tasks.append((recording_id, os.path.join(directory, f"记录{recording_id}.xlsx")))
+                self.export_directory = directory
+                
+            # 确保正在记录的样本已写入，导出进程才能读到
+            self.db_manager.recorder.flush()
+            
+            self.export_thread = ExportThread(self.db_manager.db_path, tasks)
+            self.export_thread.record_progress.connect(self.on_record_progress)
+            self.export_thread.record_exported.connect(self.on_record_exported)
+            self.export_thread.record_failed.connect(self.on_record_failed)
+            self.export_thread.export_finished.connect(self.on_export_finished)
+            
+            # 各记录的完成比例，进度条显示它们的平均值
+            self.export_fractions = {recording_id: 0.0 for recording_id, _ in tasks}
+            self.export_record_button.setEnabled(False)
+            self.progress_bar.setRange(0, 100)
+            self.progress_bar.setValue(0)
+            self.progress_bar.setVisible(True)
+            self.log_message(f'开始导出 {len(tasks)} 条记录')
+            self.export_thread.start()
                 
         except Exception as e:
             self.log_message(f'导出记录出错: {str(e)}')
             QMessageBox.critical(self, '错误', f'导出记录时发生错误:\n{str(e)}')
+            
+    def on_record_progress(self, recording_id, written, total):
+        """单个记录的写入进度更新"""
+        self.set_export_fraction(recording_id, written / total if total else 1.0)
+            
+    def set_export_fraction(self, recording_id, fraction):
+        """更新一个记录的完成比例并刷新进度条"""
+        self.export_fractions[recording_id] = min(1.0, fraction)
+        self.progress_bar.setValue(int(100 * sum(self.export_fractions.values()) / len(self.export_fractions)))
+            
+    def on_record_exported(self, recording_id, file_path):
+        """单个记录导出完成"""
+        self.set_export_fraction(recording_id, 1.0)
+        self.log_message(f'成功导出记录 {recording_id} 到 {file_path}')
+        
+    def on_record_failed(self, recording_id, error_msg):
+        """单个记录导出失败"""
+        self.set_export_fraction(recording_id, 1.0)
+        self.log_message(f'导出记录 {recording_id} 失败: {error_msg}')
+        
+    def on_export_finished(self, succeeded, failed):
+        """全部导出完成"""
+        self.progress_bar.setVisible(False)
+        self.export_record_button.setEnabled(True)
+        total = len(succeeded) + len(failed)
+        if total == 1:
+            if succeeded:
+                QMessageBox.information(self, '导出成功', f'成功导出记录 {succeeded[0]}')
+            else:
+                QMessageBox.critical(self, '导出失败', '导出记录时发生错误')
+        elif succeeded:
+            message = f'成功导出 {len(succeeded)} 条记录到 {self.export_directory}'
+            if failed:
+                message += f'\n以下记录导出失败: {", ".join(failed)}'
+            self.log_message(message)
+            QMessageBox.information(self, '导出成功', message)
+        else:
+            self.log_message('导出记录失败')
+            QMessageBox.critical(self, '导出失败', '导出记录时发生错误')
+            
     def clear_logs(self):
         self.log_text.clear()
         self.log_message('日志已清除')
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+数据趋势图控件
+用QPainter绘制单个数据项的时间曲线，数据来自近期样本环形缓冲区，不查询数据库
+"""
+
+import math
+from datetime import datetime
+
+from PyQt5.QtWidgets import QWidget
+from PyQt5.QtCore import Qt, QPointF, QRectF
+from PyQt5.QtGui import QPainter, QPainterPath, QPen, QColor, QFont
+
+
+class TrendChart(QWidget):
+    """单数据项趋势曲线，缺失值（NaN）处曲线断开"""
+
+    MARGIN_LEFT = 70
+    MARGIN_RIGHT = 20
+    MARGIN_TOP = 30
+    MARGIN_BOTTOM = 40
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setMinimumHeight(250)
+        self._timestamps = []
+        self._values = []
+        self._title = ''
+        self._unit = ''
+        self._message = '暂无数据'
+
+    def set_series(self, timestamps, values, title='', unit=''):
+        """
+        设置曲线数据并重绘
+
+        Args:
+            timestamps (list): 采集时间 (epoch秒)
+            values (list): 数据值，NaN表示缺失
+            title (str): 数据项名称
+            unit (str): 单位
+        """
+        self._timestamps = list(timestamps)
+        self._values = list(values)
+        self._title = title
+        self._unit = unit
+        self._message = '暂无数据'
+        self.update()
+
+    def set_message(self, message):
+        """清除曲线并显示提示文字"""
+        self._timestamps = []
+        self._values = []
+        self._message = message
+        self.update()
+
+    def _points(self, plot):
+        """把样本转换为绘图坐标，返回 (按缺失值断开的线段列表, 最小值, 最大值)"""
+        valid = [v for v in self._values if not math.isnan(v)]
+        if not valid:
+            return [], None, None
+        low, high = min(valid), max(valid)
+        if high == low:
+            low, high = low - 1, high + 1
+        start, end = self._timestamps[0], self._timestamps[-1]
+        span = (end - start) or 1.0
+
+        # 点数远多于像素时按步长抽取
+        step = max(1, len(self._values) // max(1, int(plot.width()) * 2))
+        segments = [[]]
+        for t, v in zip(self._timestamps[::step], self._values[::step]):
+            if math.isnan(v):
+                if segments[-1]:
+                    segments.append([])
+                continue
+            x = plot.left() + (t - start) / span * plot.width()
+            y = plot.bottom() - (v - low) / (high - low) * plot.height()
+            segments[-1].append(QPointF(x, y))
+        return [s for s in segments if s], low, high
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.fillRect(self.rect(), QColor('#ffffff'))
+        plot = QRectF(self.MARGIN_LEFT, self.MARGIN_TOP,
+                      max(1, self.width() - self.MARGIN_LEFT - self.MARGIN_RIGHT),
+                      max(1, self.height() - self.MARGIN_TOP - self.MARGIN_BOTTOM))
+
+        painter.setPen(QPen(QColor('#bdc3c7'), 1))
+        painter.drawRect(plot)
+
+        segments, low, high = self._points(plot) if self._values else ([], None, None)
+        if not segments:
+            painter.setPen(QColor('#7f8c8d'))
+            painter.drawText(plot, Qt.AlignCenter, self._message)
+            return
+
+        # 标题、纵轴范围和时间范围
+        painter.setPen(QColor('#2c3e50'))
+        painter.setFont(QFont(self.font().family(), 10, QFont.Bold))
+        title = f'{self._title} ({self._unit})' if self._unit else self._title
+        painter.drawText(QRectF(plot.left(), 0, plot.width(), self.MARGIN_TOP), Qt.AlignCenter, title)
+        painter.setFont(self.font())
+        label = QRectF(0, 0, self.MARGIN_LEFT - 6, 20)
+        painter.drawText(label.translated(0, plot.top() - 10), Qt.AlignRight | Qt.AlignVCenter, f'{high:g}')
+        painter.drawText(label.translated(0, plot.bottom() - 10), Qt.AlignRight | Qt.AlignVCenter, f'{low:g}')
+        bottom = QRectF(plot.left(), plot.bottom() + 4, plot.width(), 20)
+        time_format = '%H:%M:%S'
+        painter.drawText(bottom, Qt.AlignLeft,
+                         datetime.fromtimestamp(self._timestamps[0]).strftime(time_format))
+        painter.drawText(bottom, Qt.AlignRight,
+                         datetime.fromtimestamp(self._timestamps[-1]).strftime(time_format))
+
+        painter.setPen(QPen(QColor('#3498db'), 2))
+        for segment in segments:
+            if len(segment) == 1:
+                painter.drawPoint(segment[0])
+                continue
+            path = QPainterPath(segment[0])
+            for point in segment[1:]:
+                path.lineTo(point)
+            painter.drawPath(path)
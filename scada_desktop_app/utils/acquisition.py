@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+数据采集模块
+由单独的采集线程按固定周期轮询设备，并发布不可变的最新数据快照，
+HTTP请求或界面刷新只读取快照，设备负载与查看者数量无关
+"""
+
+import logging
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+from types import MappingProxyType
+
+logger = logging.getLogger(__name__)
+
+
+class Snapshot(namedtuple('Snapshot', ['sequence', 'timestamp', 'board_data', 'bms_data'])):
+    """
+    一次采集得到的数据快照（不可变）
+
+    Attributes:
+        sequence (int): 单调递增的采集序号
+        timestamp (float): 采集完成时间 (time.time())
+        board_data (Mapping or None): 二号板数据（只读）
+        bms_data (Mapping or None): BMS保护板数据（只读）
+    """
+
+    __slots__ = ()
+
+    @property
+    def ok(self):
+        """二号板和BMS数据是否都读取成功"""
+        return self.board_data is not None and self.bms_data is not None
+
+    def isoformat(self):
+        """采集时间的ISO格式字符串"""
+        return datetime.fromtimestamp(self.timestamp).isoformat()
+
+    def to_dict(self):
+        """转换为可JSON序列化的字典"""
+        return {
+            'board_data': dict(self.board_data) if self.board_data is not None else None,
+            'bms_data': dict(self.bms_data) if self.bms_data is not None else None,
+            'timestamp': self.isoformat(),
+            'sequence': self.sequence,
+        }
+
+
+def _freeze(data):
+    return MappingProxyType(dict(data)) if data is not None else None
+
+
+def make_snapshot(sequence, board_data, bms_data, timestamp=None):
+    """创建数据快照，数据字典会被复制为只读映射"""
+    return Snapshot(sequence, timestamp if timestamp is not None else time.time(),
+                    _freeze(board_data), _freeze(bms_data))
+
+
+class AcquisitionLoop:
+    """后台采集循环"""
+
+    def __init__(self, read_func, interval=1.0, name='acquisition', next_poll=None):
+        """
+        Args:
+            read_func (callable): 读取函数，返回 (board_data, bms_data)；返回None表示本次没有新数据
+            interval (float): 采集周期（秒），默认1.0
+            name (str): 采集线程名称
+            next_poll (callable): 返回距下一次采集的秒数，用于分组调度；为None时按interval固定周期采集
+        """
+        self.read_func = read_func
+        self.interval = interval
+        self.name = name
+        self.next_poll = next_poll
+        self._latest = None
+        self._sequence = 0
+        self._listeners = []
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+        self._published = threading.Condition()
+
+    def add_listener(self, callback):
+        """注册快照回调，回调在采集线程中执行，参数为Snapshot"""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        """注销快照回调"""
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def set_interval(self, interval):
+        """修改采集周期，立即生效（使用next_poll分组调度时采集时间由调度器决定，该周期不起作用）"""
+        self.interval = max(0.01, float(interval))
+        self._wake_event.set()
+
+    def wake(self):
+        """唤醒采集线程，按next_poll重新计算下一次采集时间（分组周期修改后调用）"""
+        self._wake_event.set()
+
+    def is_running(self):
+        """采集线程是否正在运行"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """启动采集线程"""
+        if self.is_running():
+            return
+        self._stop_event.clear()
+        self._wake_event.clear()
+        with self._published:
+            self._latest = None
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        logger.info(f"采集线程已启动，周期 {self.interval} 秒")
+
+    def stop(self, timeout=5.0):
+        """停止采集线程并清除快照"""
+        thread = self._thread
+        if thread is None:
+            return
+        self._stop_event.set()
+        self._wake_event.set()
+        if thread is not threading.current_thread():
+            thread.join(timeout)
+        self._thread = None
+        with self._published:
+            self._latest = None
+            self._published.notify_all()
+        logger.info("采集线程已停止")
+
+    def latest(self, wait=0):
+        """
+        获取最新快照
+
+        Args:
+            wait (float): 尚无快照时最多等待的秒数，默认不等待
+
+        Returns:
+            Snapshot or None
+        """
+        snapshot = self._latest
+        if snapshot is not None or wait <= 0:
+            return snapshot
+        with self._published:
+            self._published.wait_for(lambda: self._latest is not None or not self.is_running(), wait)
+            return self._latest
+
+    def refresh(self, timeout=2.0):
+        """
+        请求立即采集一次，并等待新的快照
+
+        Returns:
+            Snapshot or None: 新快照；超时则返回当前最新快照
+        """
+        if not self.is_running():
+            return self._latest
+        current = self._latest.sequence if self._latest is not None else 0
+        self._wake_event.set()
+        with self._published:
+            self._published.wait_for(
+                lambda: (self._latest is not None and self._latest.sequence > current) or not self.is_running(),
+                timeout)
+            return self._latest
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            started = time.monotonic()
+            self.poll_once()
+            if self.next_poll is not None:
+                delay = self.next_poll()
+            else:
+                delay = self.interval - (time.monotonic() - started)
+            self._wake_event.wait(max(0.0, delay))
+            self._wake_event.clear()
+
+    def poll_once(self):
+        """执行一次采集并发布快照，没有新数据时返回None"""
+        try:
+            result = self.read_func()
+            if result is None:
+                return None
+            board_data, bms_data = result
+        except Exception as e:
+            logger.error(f"采集数据时出错: {str(e)}")
+            board_data, bms_data = None, None
+
+        self._sequence += 1
+        snapshot = make_snapshot(self._sequence, board_data, bms_data)
+        with self._published:
+            self._latest = snapshot
+            self._published.notify_all()
+
+        for callback in list(self._listeners):
+            try:
+                callback(snapshot)
+            except Exception as e:
+                logger.error(f"快照回调出错: {str(e)}")
+        return snapshot
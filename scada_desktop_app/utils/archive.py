@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+记录归档模块
+记录会话结束后把样本转换为列式Parquet文件（每个会话一个文件，zstd压缩，带行组统计信息），
+读回文件逐行核对无误后才从SQLite中删除这些样本，实时数据库只保留正在记录和未归档的数据；
+读取归档时只读取请求的列，按时间过滤可根据行组统计信息跳过无关的行组。
+汇总表 (rollup_records) 保留在数据库中，降采样浏览和数据摘要不需要打开归档文件。
+归档默认关闭（网页版 archive_recordings 配置项，桌面版 DatabaseManager(archive=True) 开启）；
+pyarrow为可选依赖（见requirements.txt），没有安装时不进行归档
+"""
+
+import logging
+import os
+import threading
+from itertools import chain, zip_longest
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # 没有pyarrow时不归档，已归档的记录也无法读取
+    pa = ds = pq = None
+
+from utils.register_map import REGISTER_MAP
+from utils.recordings import STORAGE_FORMATS, STORAGE_PARQUET, DATA_TABLES, database_dir, iter_recording
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR_NAME = 'archive'
+
+# 每个行组的样本数：行组越小，按时间过滤时能跳过的数据越精细
+ROW_GROUP_SIZE = 65536
+
+_archive_lock = threading.Lock()
+
+
+def archive_available():
+    """是否可以进行归档（已安装pyarrow）"""
+    return pa is not None
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError('读取归档记录需要安装pyarrow')
+
+
+def _filter(start_ms=None, end_ms=None, after_ms=None):
+    expression = None
+    for op, value in (('>=', start_ms), ('<=', end_ms), ('>', after_ms)):
+        if value is None:
+            continue
+        field = ds.field('ts_ms')
+        term = {'>=': field >= int(value), '<=': field <= int(value), '>': field > int(value)}[op]
+        expression = term if expression is None else expression & term
+    return expression
+
+
+def _scanner(path, columns, start_ms=None, end_ms=None, after_ms=None, batch_size=65536):
+    _require_pyarrow()
+    dataset = ds.dataset(path, format='parquet')
+    return dataset.scanner(columns=['ts_ms'] + list(columns), filter=_filter(start_ms, end_ms, after_ms),
+                           batch_size=batch_size)
+
+
+def _to_dict(table, columns):
+    return {name: table.column(name).to_pylist() for name in ['ts_ms'] + list(columns)}
+
+
+def read_archive(path, columns, start_ms=None, end_ms=None, after_ms=None, limit=None):
+    """
+    读取归档文件中的样本
+
+    Args:
+        path (str): 归档文件路径
+        columns (list): 需要的数据列（只读取这些列）
+        start_ms/end_ms/after_ms/limit: 同 recordings.read_recording
+
+    Returns:
+        dict: {'ts_ms': [...], 列名: [...]}
+    """
+    scanner = _scanner(path, columns, start_ms, end_ms, after_ms)
+    table = scanner.head(int(limit)) if limit is not None else scanner.to_table()
+    return _to_dict(table, columns)
+
+
+def iter_archive(path, columns, start_ms=None, end_ms=None, batch_size=5000):
+    """
+    按批次读取归档文件中的样本
+
+    Yields:
+        dict: {'ts_ms': [...], 列名: [...]}
+    """
+    for batch in _scanner(path, columns, start_ms, end_ms, batch_size=batch_size).to_batches():
+        if batch.num_rows:
+            yield _to_dict(pa.Table.from_batches([batch]), columns)
+
+
+def archive_stats(path, start_ms=None, end_ms=None):
+    """
+    统计归档文件中的样本数和起止时间，不带时间范围时直接使用文件元数据
+
+    Returns:
+        tuple: (样本数, 最早ts_ms, 最晚ts_ms)
+    """
+    _require_pyarrow()
+    if start_ms is None and end_ms is None:
+        metadata = pq.ParquetFile(path).metadata
+        index = metadata.schema.names.index('ts_ms')
+        first, last = None, None
+        for i in range(metadata.num_row_groups):
+            stats = metadata.row_group(i).column(index).statistics
+            if stats is None or not stats.has_min_max:
+                break
+            first = stats.min if first is None else min(first, stats.min)
+            last = stats.max if last is None else max(last, stats.max)
+        else:
+            return metadata.num_rows, first, last
+    ts = _scanner(path, [], start_ms, end_ms).to_table().column('ts_ms')
+    if len(ts) == 0:
+        return 0, None, None
+    return len(ts), ts[0].as_py(), ts[len(ts) - 1].as_py()
+
+
+def _arrow_schema(conn, columns):
+    # 按data_records中声明的类型确定列类型
+    declared = {row[1]: (row[2] or '').upper() for row in conn.execute('PRAGMA table_info(data_records)')}
+    fields = [pa.field('ts_ms', pa.int64(), nullable=False)]
+    for column in columns:
+        fields.append(pa.field(column, pa.int64() if declared.get(column) == 'INTEGER' else pa.float64()))
+    return pa.schema(fields)
+
+
+def write_archive(conn, path, batches, columns):
+    """
+    把按列组织的样本批次写入Parquet文件
+
+    Args:
+        conn (sqlite3.Connection): 数据库连接（用于读取列类型）
+        path (str): 目标文件路径
+        batches (iterable): recordings.iter_recording 产生的批次
+        columns (list): 数据列
+
+    Returns:
+        int: 写入的样本数
+    """
+    _require_pyarrow()
+    schema = _arrow_schema(conn, columns)
+    written = 0
+    pending, pending_rows = [], 0
+    with pq.ParquetWriter(path, schema, compression='zstd', write_statistics=True) as writer:
+        for batch in batches:
+            arrays = [pa.array(batch['ts_ms'], pa.int64())]
+            for field in list(schema)[1:]:
+                values = batch[field.name]
+                if field.type == pa.int64():
+                    values = [None if v is None else int(v) for v in values]
+                arrays.append(pa.array(values, field.type))
+            # 每次write_table都会产生新的行组，攒够一个行组再写入
+            pending.append(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            pending_rows += len(batch['ts_ms'])
+            if pending_rows >= ROW_GROUP_SIZE:
+                writer.write_table(pa.Table.from_batches(pending), row_group_size=ROW_GROUP_SIZE)
+                written += pending_rows
+                pending, pending_rows = [], 0
+        if pending:
+            writer.write_table(pa.Table.from_batches(pending), row_group_size=ROW_GROUP_SIZE)
+            written += pending_rows
+    return written
+
+
+def _rows(batches, columns):
+    names = ['ts_ms'] + list(columns)
+    return chain.from_iterable(zip(*(batch[name] for name in names)) for batch in batches)
+
+
+def verify_archive(conn, path, recording_id, columns):
+    """
+    读回归档文件，与数据库中的样本逐行逐列比较
+
+    Args:
+        conn (sqlite3.Connection): 数据库连接（会话尚未切换为parquet格式）
+        path (str): 归档文件路径
+        recording_id (str): 记录会话ID
+        columns (list): 数据列
+
+    Returns:
+        int: 核对的样本数
+
+    Raises:
+        RuntimeError: 文件内容与数据库不一致
+    """
+    _require_pyarrow()
+    expected = _rows(iter_recording(conn, recording_id, columns), columns)
+    actual = _rows(iter_archive(path, columns), columns)
+    count = 0
+    for row, archived in zip_longest(expected, actual):
+        if row != archived:
+            raise RuntimeError(f'归档文件第 {count + 1} 行与数据库不一致: {archived} != {row}')
+        count += 1
+    if pq.ParquetFile(path).metadata.num_rows != count:
+        raise RuntimeError('归档文件元数据中的样本数与数据库不一致')
+    return count
+
+
+def archive_recording(store, recording_id, archive_dir=None):
+    """
+    归档一个已结束的记录会话
+
+    先在只读连接上把样本写入临时文件，并读回与数据库逐行核对，核对通过后在一个事务中
+    更新会话的存储格式并删除数据库中的样本；任何一步失败都保留原数据
+
+    Args:
+        store (SQLiteStore): 数据库
+        recording_id (str): 记录会话ID
+        archive_dir (str): 归档目录，默认为数据库所在目录下的archive
+
+    Returns:
+        str or None: 归档文件路径，会话不满足归档条件时返回None
+    """
+    if not archive_available():
+        return None
+    with _archive_lock:
+        with store.read() as conn:
+            row = conn.execute('SELECT end_time, storage FROM recording_sessions WHERE id = ?',
+                               (recording_id,)).fetchone()
+            # 只归档已结束且尚未归档的会话
+            if row is None or row[0] is None or row[1] not in STORAGE_FORMATS:
+                return None
+            base_dir = database_dir(conn)
+        archive_dir = archive_dir or os.path.join(base_dir, ARCHIVE_DIR_NAME)
+        os.makedirs(archive_dir, exist_ok=True)
+        path = os.path.join(archive_dir, f'{recording_id}.parquet')
+        temp_path = path + '.tmp'
+        table = DATA_TABLES[row[1]]
+        columns = list(REGISTER_MAP.columns)
+
+        try:
+            with store.read() as conn:
+                count = write_archive(conn, temp_path, iter_recording(conn, recording_id, columns), columns)
+                verified = verify_archive(conn, temp_path, recording_id, columns)
+                if verified != count:
+                    raise RuntimeError(f'归档文件样本数 {verified} 与写入的 {count} 不一致')
+            with store.write() as conn:
+                current = conn.execute(f'SELECT COUNT(*) FROM {table} WHERE recording_id = ?',
+                                       (recording_id,)).fetchone()[0]
+                if current != count:
+                    raise RuntimeError(f'归档期间样本数发生变化 ({count} -> {current})')
+                os.replace(temp_path, path)
+                conn.execute('UPDATE recording_sessions SET storage = ?, archive_path = ? WHERE id = ?',
+                             (STORAGE_PARQUET, os.path.relpath(path, base_dir), recording_id))
+                conn.execute(f'DELETE FROM {table} WHERE recording_id = ?', (recording_id,))
+        except Exception:
+            for leftover in (temp_path, path):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+            raise
+    logger.info(f"记录 {recording_id} 已归档: {count} 个样本 -> {path}")
+    return path
+
+
+def archive_closed_recordings(store, archive_dir=None):
+    """
+    归档所有已结束但尚未归档的记录会话
+
+    Returns:
+        list: 已归档的记录会话ID
+    """
+    if not archive_available():
+        return []
+    with store.read() as conn:
+        placeholders = ', '.join('?' * len(STORAGE_FORMATS))
+        ids = [row[0] for row in conn.execute(
+            f'SELECT id FROM recording_sessions WHERE end_time IS NOT NULL AND storage IN ({placeholders})',
+            STORAGE_FORMATS)]
+    archived = []
+    for recording_id in ids:
+        try:
+            if archive_recording(store, recording_id, archive_dir):
+                archived.append(recording_id)
+        except Exception as e:
+            logger.error(f"归档记录 {recording_id} 失败: {str(e)}")
+    return archived
+
+
+def archive_in_background(store, recording_id=None, archive_dir=None):
+    """
+    在后台线程中归档（recording_id为None时归档所有已结束的会话）
+
+    Returns:
+        threading.Thread or None: 归档线程，不支持归档时返回None
+    """
+    if not archive_available():
+        return None
+
+    def run():
+        try:
+            if recording_id is None:
+                archive_closed_recordings(store, archive_dir)
+            else:
+                archive_recording(store, recording_id, archive_dir)
+        except Exception as e:
+            logger.error(f"归档记录 {recording_id} 失败: {str(e)}")
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
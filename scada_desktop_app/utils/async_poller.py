@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+多设备异步轮询模块
+在单个asyncio事件循环中为每台设备维持一个AsyncModbusTcpClient，
+并发轮询大量二号板/BMS设备，不需要为每台设备创建线程。
+目前只由Web端（app.py 的 /api/devices 接口）使用；桌面端仍通过 ModbusClient 读取单台设备
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+
+from pymodbus.client import AsyncModbusTcpClient
+
+from utils.acquisition import make_snapshot
+from utils.connection_health import ConnectionHealth
+from utils.poll_scheduler import GroupScheduler
+from utils.read_planner import RegisterBlock, RegisterImage
+from utils.register_map import REGISTER_MAP
+
+logger = logging.getLogger(__name__)
+
+
+class PolledDevice:
+    """被轮询设备的配置与运行状态"""
+
+    def __init__(self, device_id, host, port=502, slave=1, name=None, scheduler=None):
+        self.device_id = device_id
+        self.host = host
+        self.port = port
+        self.slave = slave
+        self.name = name or f'{host}:{port}'
+        self.health = ConnectionHealth()
+        self.scheduler = scheduler
+        self.snapshot = None  # 连接断开时清除，不会继续提供断开前的旧数据
+        self.sequence = 0
+        self.task = None
+        self.client = None
+
+    def to_dict(self):
+        """转换为可JSON序列化的字典，age为最新快照距今的秒数"""
+        snapshot = self.snapshot
+        return {
+            'device_id': self.device_id,
+            'name': self.name,
+            'host': self.host,
+            'port': self.port,
+            'slave': self.slave,
+            'connected': self.health.is_connected(),
+            'health': self.health.to_dict(),
+            'sequence': snapshot.sequence if snapshot else None,
+            'timestamp': snapshot.isoformat() if snapshot else None,
+            'age': round(time.time() - snapshot.timestamp, 3) if snapshot else None,
+        }
+
+
+class MultiDevicePoller:
+    """基于asyncio的多设备轮询器，事件循环运行在单独的后台线程中"""
+
+    def __init__(self, interval=1.0, periods=None, timeout=1.0, gap_tolerance=0, max_in_flight=256,
+                 reconnect_delay=5.0):
+        """
+        Args:
+            interval (float): 最短轮询周期（秒），比它更快的分组按此周期读取，默认1.0
+            periods (dict): 覆盖寄存器分组的默认周期 {分组名: 秒}
+            timeout (float): 单次请求超时时间（秒），默认1.0
+            gap_tolerance (int): 合并读取时允许跨越的空洞寄存器数量
+            max_in_flight (int): 同时进行中的设备轮询数量上限，默认256
+            reconnect_delay (float): 连接失败后重试的间隔（秒），默认5.0
+        """
+        self.interval = interval
+        self.periods = dict(periods or {})
+        self.timeout = timeout
+        self.gap_tolerance = gap_tolerance
+        self.max_in_flight = max_in_flight
+        self.reconnect_delay = reconnect_delay
+        self._devices = {}
+        self._loop = None
+        self._thread = None
+        self._semaphore = None
+        self._lock = threading.Lock()
+
+    # ---- 线程安全的公共接口 ----
+
+    def start(self):
+        """启动事件循环线程"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._loop = asyncio.new_event_loop()
+            ready = threading.Event()
+            self._thread = threading.Thread(target=self._run_loop, args=(ready,), name='multi-device-poller', daemon=True)
+            self._thread.start()
+            ready.wait()
+        for device in list(self._devices.values()):
+            self._submit(self._start_device(device))
+        logger.info(f"多设备轮询器已启动，周期 {self.interval} 秒")
+
+    def stop(self, timeout=5.0):
+        """停止所有设备轮询并关闭事件循环"""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            if loop is None:
+                return
+            future = asyncio.run_coroutine_threadsafe(self._shutdown(), loop)
+            try:
+                future.result(timeout)
+            except Exception as e:
+                logger.error(f"停止多设备轮询器时出错: {str(e)}")
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout)
+            self._loop = None
+            self._thread = None
+        logger.info("多设备轮询器已停止")
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def set_interval(self, interval):
+        """修改最短轮询周期，对所有设备立即生效"""
+        self.interval = max(0.01, float(interval))
+        for device in list(self._devices.values()):
+            self._apply_periods(device.scheduler)
+
+    def _make_scheduler(self):
+        scheduler = GroupScheduler(REGISTER_MAP, gap_tolerance=self.gap_tolerance)
+        self._apply_periods(scheduler)
+        return scheduler
+
+    def _apply_periods(self, scheduler):
+        for group in REGISTER_MAP.groups:
+            period = self.periods.get(group.name, group.period)
+            scheduler.set_period(group.name, max(period, self.interval))
+
+    def add_device(self, host, port=502, slave=1, name=None, device_id=None):
+        """
+        添加被轮询设备
+
+        Returns:
+            str: 设备ID
+        """
+        device_id = device_id or f'{host}:{port}:{slave}'
+        with self._lock:
+            if device_id in self._devices:
+                return device_id
+            device = PolledDevice(device_id, host, port, slave, name, self._make_scheduler())
+            self._devices[device_id] = device
+        if self.is_running():
+            self._submit(self._start_device(device))
+        return device_id
+
+    def remove_device(self, device_id):
+        """移除被轮询设备"""
+        with self._lock:
+            device = self._devices.pop(device_id, None)
+        if device is None:
+            return False
+        if self.is_running():
+            self._submit(self._stop_device(device))
+        return True
+
+    def devices(self):
+        """获取所有设备状态列表"""
+        return [device.to_dict() for device in list(self._devices.values())]
+
+    def device(self, device_id):
+        """获取指定设备，不存在时返回None"""
+        return self._devices.get(device_id)
+
+    def snapshot(self, device_id):
+        """获取指定设备的最新快照"""
+        device = self._devices.get(device_id)
+        return device.snapshot if device else None
+
+    def snapshots(self):
+        """获取所有设备的最新快照 {设备ID: Snapshot或None}"""
+        return {device_id: device.snapshot for device_id, device in list(self._devices.items())}
+
+    # ---- 事件循环内部实现 ----
+
+    def _run_loop(self, ready):
+        asyncio.set_event_loop(self._loop)
+        self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._loop.close()
+
+    def _submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    async def _start_device(self, device):
+        if device.task is None or device.task.done():
+            device.task = asyncio.ensure_future(self._poll_device(device))
+
+    async def _stop_device(self, device):
+        if device.task is not None:
+            device.task.cancel()
+            try:
+                await device.task
+            except asyncio.CancelledError:
+                pass
+            device.task = None
+        device.health.mark_disconnected()
+        device.snapshot = None
+
+    async def _shutdown(self):
+        await asyncio.gather(*(self._stop_device(d) for d in list(self._devices.values())), return_exceptions=True)
+
+    async def _poll_device(self, device):
+        """单台设备的轮询协程：按分组周期读取到期的寄存器并发布快照"""
+        scheduler = device.scheduler
+        # 随机错开首次轮询时间，避免所有设备在同一时刻发起请求
+        await asyncio.sleep(random.uniform(0, self.interval))
+        scheduler.reset()
+        try:
+            while True:
+                if device.client is None or not device.client.connected:
+                    device.snapshot = None
+                    if not await self._connect(device):
+                        await asyncio.sleep(self.reconnect_delay)
+                        scheduler.reset()
+                        continue
+
+                groups = scheduler.due_groups()
+                if groups:
+                    async with self._semaphore:
+                        image = await self._read_device(device, scheduler.plan(groups))
+                    scheduler.update(image, groups)
+                    board_data, bms_data = scheduler.records()
+                    device.sequence += 1
+                    device.snapshot = make_snapshot(device.sequence, board_data, bms_data)
+
+                await asyncio.sleep(scheduler.time_until_due())
+        finally:
+            if device.client is not None:
+                device.client.close()
+                device.client = None
+
+    async def _connect(self, device):
+        if device.client is not None:
+            device.client.close()
+        device.client = AsyncModbusTcpClient(device.host, device.port, timeout=self.timeout, retries=0,
+                                             reconnect_delay=0)
+        try:
+            connected = await device.client.connect()
+        except Exception as e:
+            logger.debug(f"连接设备 {device.name} 失败: {str(e)}")
+            connected = False
+        if connected:
+            device.health.mark_connected()
+            logger.info(f"已连接设备 {device.name}")
+        else:
+            device.health.mark_disconnected()
+            device.client.close()
+            device.client = None
+        return connected
+
+    async def _read_device(self, device, blocks):
+        image = RegisterImage()
+        blocks = list(blocks)
+        while blocks:
+            block = blocks.pop(0)
+            started = time.monotonic()
+            try:
+                rr = await device.client.read_holding_registers(block.address, block.count, slave=device.slave)
+            except Exception as e:
+                device.health.record_failure(e)
+                continue
+            if rr.isError():
+                device.health.record_failure(rr)
+                if len(block.parts) > 1 and getattr(rr, 'exception_code', None):
+                    # 合并块返回异常响应：按合并前的分组区间重新读取，可选分组的异常不影响必需分组
+                    blocks[:0] = [RegisterBlock(address, count) for address, count in block.parts]
+            else:
+                device.health.record_success(time.monotonic() - started)
+                image.add(block.address, rr.registers[:block.count])
+        if not device.health.is_connected() and device.client is not None:
+            # 连续失败达到阈值，关闭连接以便下一轮重连
+            device.client.close()
+            device.client = None
+        return image
@@ -0,0 +1,719 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+异步网络扫描模块
+扫描分两个阶段，在同一个asyncio事件循环中流水线执行：
+1. TCP端口扫描：用非阻塞socket并发连接 地址×端口（由AIMD并发控制限制同时进行的连接数），只判断端口是否开放；
+2. Modbus验证：端口开放的连接直接交给验证协程，对配置的各个单元ID发送手工构造的FC03读请求，
+   记录给出合法Modbus响应的单元ID（网关后面常有多个从站）。
+第一阶段的结果边产生边进入第二阶段，第二阶段的开销只与在线主机数有关，与地址空间大小无关；
+不需要线程，/16网段(65534个地址)的扫描可以在数十秒内完成。
+第一阶段的连接超时根据扫描过程中测得的连接RTT分布自动调整（p99 × k，不低于MIN_TIMEOUT），
+第二阶段等待Modbus响应的超时时间按主机估计（HostRtt）：以该主机的连接RTT为初始值，
+收到响应后按响应时间更新，同样限制在 [MIN_TIMEOUT, 配置的超时时间] 之间；主机还没有响应过时超时后加倍重试，
+握手很快但响应较慢的网关不会被漏掉；
+第一阶段的并发数按AIMD方式调整：网络正常时逐步增加，超时率突增、RTT明显变长或本机资源不足时减半
+"""
+
+import asyncio
+import errno
+import logging
+import socket
+import threading
+import time
+from collections import deque, namedtuple
+
+try:
+    import resource
+except ImportError:  # Windows没有resource模块
+    resource = None
+
+from utils.modbus_codec import MBAP, FC_READ_HOLDING_REGISTERS, MAX_ADU_SIZE, ReadRequestFrame
+
+logger = logging.getLogger(__name__)
+
+# 默认同时进行的TCP连接数（第一阶段）
+DEFAULT_CONCURRENCY = 2000
+
+# 默认同时进行的Modbus验证数（第二阶段）
+DEFAULT_VERIFY_CONCURRENCY = 64
+
+# 默认扫描的端口和单元ID
+DEFAULT_PORTS = (502,)
+DEFAULT_UNIT_IDS = (1,)
+
+# 为数据库、日志等保留的文件描述符数量
+RESERVED_FDS = 128
+
+# 进度回调的最短间隔（秒）
+PROGRESS_INTERVAL = 0.1
+
+# 网关返回的这两个异常码表示目标设备不存在，不算发现设备
+GATEWAY_EXCEPTIONS = (0x0A, 0x0B)
+
+# 自适应连接超时：超时时间 = 连接RTT的p99 × RTT_TIMEOUT_FACTOR，限制在 [MIN_TIMEOUT, 配置的超时时间] 之间。
+# RTT样本主要来自很快返回的RST或本机连接，下限保证握手较慢（150-500ms）的网关仍能连接成功
+# 每个主机的响应超时（HostRtt）使用同样的下限
+RTT_TIMEOUT_FACTOR = 3.0
+MIN_TIMEOUT = 0.3
+# 计算RTT分布使用的最近样本数，以及开始调整超时前至少需要的样本数
+RTT_SAMPLES = 1000
+RTT_MIN_SAMPLES = 20
+
+# AIMD并发控制：初始并发数、拥塞时的缩减比例、拥塞避免阶段每轮增加的并发数
+INITIAL_CONCURRENCY = 64
+AIMD_DECREASE = 0.5
+AIMD_INCREASE = 16
+# 一轮中超时率比基线高出该值时视为超时率突增
+TIMEOUT_SPIKE = 0.3
+# 一轮中RTT中位数超过基线的倍数时视为网络排队
+RTT_INFLATION = 2.0
+
+# 连接结果
+CONNECT_OPEN = 'open'
+CONNECT_CLOSED = 'closed'        # 端口关闭（收到RST），主机在线
+CONNECT_TIMEOUT = 'timeout'
+CONNECT_UNREACHABLE = 'unreachable'
+CONNECT_ERROR = 'error'          # 本机资源不足
+
+# 还没有单元ID响应时，连接被关闭后最多重新连接的次数
+MAX_RECONNECTS = 3
+
+# 探测使用的事务ID的高字节，低字节为单元ID
+PROBE_TID_BASE = 0x4D00
+
+
+class ScanResult(namedtuple('ScanResult', ['host', 'port', 'units', 'rtt'])):
+    """
+    发现的Modbus设备
+
+    Attributes:
+        host (str): IP地址
+        port (int): 端口
+        units (tuple): 给出合法响应的单元ID（正常响应或寄存器地址不存在等异常响应）
+        rtt (float): TCP连接建立耗时（秒）
+    """
+
+    __slots__ = ()
+
+    @property
+    def unit(self):
+        """第一个响应的单元ID"""
+        return self.units[0]
+
+    def to_dict(self):
+        """转换为可JSON序列化的字典"""
+        return {
+            'ip': self.host,
+            'port': self.port,
+            'unit': self.unit,
+            'units': list(self.units),
+            'rtt_ms': round(self.rtt * 1000, 2),
+        }
+
+
+def parse_unit_ids(value):
+    """
+    解析单元ID列表
+
+    Args:
+        value: 整数、列表或 "1,2,10-20" 形式的字符串
+
+    Returns:
+        tuple: 去重后的单元ID（0-255）
+    """
+    if isinstance(value, int):
+        items = [value]
+    elif isinstance(value, str):
+        items = []
+        for part in value.replace(' ', '').split(','):
+            if not part:
+                continue
+            if '-' in part:
+                first, last = (int(x) for x in part.split('-', 1))
+                items.extend(range(first, last + 1))
+            else:
+                items.append(int(part))
+    else:
+        items = [int(x) for x in value]
+    units = tuple(dict.fromkeys(items))
+    if not units or any(not 0 <= unit <= 255 for unit in units):
+        raise ValueError(f'单元ID必须在0-255之间: {value}')
+    return units
+
+
+def max_concurrency(requested=DEFAULT_CONCURRENCY):
+    """
+    根据文件描述符上限确定实际可用的并发数
+
+    文件描述符耗尽时connect会以EMFILE失败，被误判为端口关闭，因此并发数不能超过上限；
+    上限是整个进程共享的，扫描不修改它，需要更高的并发数时请在启动前提高 ulimit -n
+    """
+    requested = max(1, int(requested))
+    if resource is None:
+        return requested
+    try:
+        soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+    except (ValueError, OSError) as e:
+        logger.warning(f"无法读取文件描述符上限: {str(e)}")
+        return requested
+    if soft == resource.RLIM_INFINITY:
+        return requested
+    return max(1, min(requested, soft - RESERVED_FDS))
+
+
+class RttEstimator:
+    """
+    根据最近的RTT样本估计超时时间
+    样本不足时使用配置的超时时间，之后取 p99 × factor，并限制在 [minimum, maximum] 之间
+    """
+
+    def __init__(self, maximum, factor=RTT_TIMEOUT_FACTOR, minimum=MIN_TIMEOUT, adaptive=True):
+        """
+        Args:
+            maximum (float): 超时时间上限，也是样本不足时的超时时间（秒）
+            factor (float): p99的倍数
+            minimum (float): 超时时间下限（秒）
+            adaptive (bool): 为False时始终使用maximum
+        """
+        self.maximum = maximum
+        self.factor = factor
+        self.minimum = min(minimum, maximum)
+        self.adaptive = adaptive
+        self._samples = deque(maxlen=RTT_SAMPLES)
+        self._new = 0
+        self._timeout = maximum
+        self._p50 = None
+        self._p99 = None
+
+    def add(self, rtt):
+        """记录一个RTT样本（秒）"""
+        self._samples.append(rtt)
+        self._new += 1
+        # 每积累一定数量的新样本重新计算一次分位数
+        if self._new >= max(RTT_MIN_SAMPLES, len(self._samples) // 10):
+            self._update()
+
+    def _update(self):
+        self._new = 0
+        if len(self._samples) < RTT_MIN_SAMPLES:
+            return
+        ordered = sorted(self._samples)
+        self._p50 = ordered[len(ordered) // 2]
+        self._p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+        if self.adaptive:
+            self._timeout = min(self.maximum, max(self.minimum, self._p99 * self.factor))
+
+    def timeout(self):
+        """当前的超时时间（秒）"""
+        return self._timeout
+
+    def to_dict(self):
+        """RTT统计（毫秒）"""
+        return {
+            'samples': len(self._samples),
+            'p50_ms': None if self._p50 is None else round(self._p50 * 1000, 2),
+            'p99_ms': None if self._p99 is None else round(self._p99 * 1000, 2),
+            'timeout_ms': round(self._timeout * 1000, 2),
+        }
+
+
+class HostRtt:
+    """
+    单个主机的Modbus响应超时估计（RFC 6298：SRTT + 4 × RTTVAR）
+
+    以该主机的连接RTT为初始样本，收到第一个响应时用响应时间重新初始化，之后平滑更新；
+    超时时间限制在 [minimum, maximum] 之间。连接RTT只反映TCP握手，
+    主机还没有响应过时超时可能只是估计偏小，可以加倍超时时间（退避）后重试
+    """
+
+    def __init__(self, maximum, rtt=None, minimum=MIN_TIMEOUT, adaptive=True):
+        """
+        Args:
+            maximum (float): 超时时间上限，也是没有RTT样本时的超时时间（秒）
+            rtt (float): 该主机的连接RTT（秒）
+            minimum (float): 超时时间下限（秒）
+            adaptive (bool): 为False时始终使用maximum
+        """
+        self.maximum = maximum
+        self.minimum = min(minimum, maximum)
+        self.adaptive = adaptive
+        self.answered = False  # 是否收到过该主机的响应
+        self._srtt = None
+        self._rttvar = None
+        self._timeout = maximum
+        if rtt is not None:
+            self._sample(rtt)
+
+    def _sample(self, rtt):
+        if self._srtt is None:
+            self._srtt, self._rttvar = rtt, rtt / 2
+        else:
+            self._rttvar = 0.75 * self._rttvar + 0.25 * abs(self._srtt - rtt)
+            self._srtt = 0.875 * self._srtt + 0.125 * rtt
+        if self.adaptive:
+            self._timeout = min(self.maximum, max(self.minimum, self._srtt + 4 * self._rttvar))
+
+    def add(self, rtt):
+        """记录一个响应时间样本（秒），第一个响应替换连接RTT的估计"""
+        if not self.answered:
+            self.answered = True
+            self._srtt = None
+        self._sample(rtt)
+
+    def backoff(self):
+        """
+        超时时间加倍（不超过上限）
+
+        Returns:
+            bool: 超时时间是否增加了（已经是上限时为False）
+        """
+        if self._timeout >= self.maximum:
+            return False
+        self._timeout = min(self.maximum, self._timeout * 2)
+        return True
+
+    def timeout(self):
+        """当前的超时时间（秒）"""
+        return self._timeout
+
+
+class AimdLimiter:
+    """
+    AIMD并发控制（asyncio，单线程使用）
+
+    每完成“当前并发数”个请求为一轮，按这一轮的结果调整并发数：
+    本机资源不足、超时率比基线突增或RTT中位数明显变长时并发数乘以decrease，
+    否则先成倍增加（慢启动，直到第一次拥塞），之后每轮增加increase；
+    缩减之前发出的请求的结果不再参与判断，一次拥塞只缩减一次
+    """
+
+    def __init__(self, maximum, initial=INITIAL_CONCURRENCY, minimum=1, increase=AIMD_INCREASE,
+                 decrease=AIMD_DECREASE, adaptive=True):
+        """
+        Args:
+            maximum (int): 并发数上限
+            initial (int): 初始并发数
+            minimum (int): 并发数下限
+            increase (int): 拥塞避免阶段每轮增加的并发数
+            decrease (float): 拥塞时的缩减比例
+            adaptive (bool): 为False时并发数固定为maximum
+        """
+        self.maximum = max(1, int(maximum))
+        self.minimum = max(1, min(int(minimum), self.maximum))
+        self.adaptive = adaptive
+        self.limit = float(min(self.maximum, max(self.minimum, initial)) if adaptive else self.maximum)
+        self.increase = increase
+        self.decrease = decrease
+        self.in_flight = 0
+        self.decreases = 0
+        self._slow_start = True
+        self._epoch = 0
+        self._released = asyncio.Event()
+        self._timeout_baseline = None
+        self._rtt_baseline = None
+        self._reset_round()
+
+    def _reset_round(self):
+        self._count = 0
+        self._timeouts = 0
+        self._errors = 0
+        self._rtts = []
+
+    async def acquire(self):
+        """
+        等待直到可以发起新的请求
+
+        Returns:
+            int: 请求所属的调整周期，release时传回
+        """
+        while self.in_flight >= int(self.limit):
+            self._released.clear()
+            await self._released.wait()
+        self.in_flight += 1
+        return self._epoch
+
+    def release(self, epoch, outcome, rtt=None):
+        """
+        请求结束
+
+        Args:
+            epoch (int): acquire返回的调整周期
+            outcome (str): 连接结果 (CONNECT_*)
+            rtt (float): 收到应答（连接成功或被拒绝）时的RTT
+        """
+        self.in_flight -= 1
+        self._released.set()
+        if not self.adaptive or epoch != self._epoch:
+            return
+        self._count += 1
+        if outcome == CONNECT_TIMEOUT:
+            self._timeouts += 1
+        elif outcome == CONNECT_ERROR:
+            self._errors += 1
+        if rtt is not None:
+            self._rtts.append(rtt)
+        if self._count >= max(int(self.limit), 16):
+            self._end_round()
+
+    def _end_round(self):
+        timeout_rate = self._timeouts / self._count
+        rtt = sorted(self._rtts)[len(self._rtts) // 2] if self._rtts else None
+        congested = self._errors > 0
+        if self._timeout_baseline is not None and timeout_rate > self._timeout_baseline + TIMEOUT_SPIKE:
+            congested = True
+        if rtt is not None and self._rtt_baseline is not None and rtt > self._rtt_baseline * RTT_INFLATION \
+                and rtt - self._rtt_baseline > 0.005:
+            congested = True
+
+        if congested:
+            self.limit = max(self.minimum, self.limit * self.decrease)
+            self._slow_start = False
+            self._epoch += 1
+            self.decreases += 1
+            logger.debug(f"扫描并发数降低到 {int(self.limit)} (超时率 {timeout_rate:.0%}, 错误 {self._errors})")
+        elif self._slow_start:
+            self.limit = min(self.maximum, self.limit * 2)
+        else:
+            self.limit = min(self.maximum, self.limit + self.increase)
+
+        # 基线：超时率取指数加权平均，RTT取最小的中位数（无排队时的RTT）
+        if self._timeout_baseline is None:
+            self._timeout_baseline = timeout_rate
+        else:
+            self._timeout_baseline += 0.2 * (timeout_rate - self._timeout_baseline)
+        if rtt is not None and (self._rtt_baseline is None or rtt < self._rtt_baseline):
+            self._rtt_baseline = rtt
+        self._reset_round()
+
+    def to_dict(self):
+        """并发控制状态"""
+        return {
+            'limit': int(self.limit),
+            'in_flight': self.in_flight,
+            'decreases': self.decreases,
+        }
+
+
+async def _recv_exactly(loop, sock, buffer, start, end):
+    view = memoryview(buffer)
+    while start < end:
+        n = await loop.sock_recv_into(sock, view[start:end])
+        if n == 0:
+            raise ConnectionResetError('连接被对端关闭')
+        start += n
+
+
+async def read_probe_response(loop, sock, tid):
+    """
+    接收并校验FC03探测的响应，跳过之前超时的请求迟到的响应
+
+    Returns:
+        tuple: (单元ID, 异常码或None)；响应不是合法的Modbus帧时抛出ValueError
+    """
+    buffer = bytearray(MAX_ADU_SIZE)
+    while True:
+        await _recv_exactly(loop, sock, buffer, 0, MBAP.size)
+        rx_tid, protocol, length, unit = MBAP.unpack_from(buffer, 0)
+        if protocol != 0 or length < 2 or MBAP.size + length - 1 > MAX_ADU_SIZE:
+            raise ValueError(f'不是Modbus响应 (事务ID {rx_tid}, 协议 {protocol}, 长度 {length})')
+        await _recv_exactly(loop, sock, buffer, MBAP.size, MBAP.size + length - 1)
+        if rx_tid == tid:
+            break
+        if rx_tid & 0xFF00 != PROBE_TID_BASE:
+            raise ValueError(f'意外的事务ID {rx_tid}')
+    function_code = buffer[MBAP.size]
+    if function_code == FC_READ_HOLDING_REGISTERS:
+        return unit, None
+    if function_code == FC_READ_HOLDING_REGISTERS | 0x80:
+        return unit, buffer[MBAP.size + 1]
+    raise ValueError(f'意外的功能码 {function_code}')
+
+
+def _resource_exhausted(error):
+    return error.errno in (errno.EMFILE, errno.ENFILE, errno.ENOBUFS)
+
+
+async def connect_port(host, port, timeout):
+    """
+    第一阶段：非阻塞connect判断端口是否开放
+
+    Returns:
+        tuple: (连接结果 CONNECT_*, 端口开放时为已连接的socket否则None, 收到应答时的RTT否则None)；
+        本机资源耗尽（文件描述符不足等）时抛出OSError，不能当作端口关闭
+    """
+    loop = asyncio.get_running_loop()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setblocking(False)
+    started = time.monotonic()
+    try:
+        await asyncio.wait_for(loop.sock_connect(sock, (host, port)), timeout)
+    except ConnectionRefusedError:
+        sock.close()
+        return CONNECT_CLOSED, None, time.monotonic() - started
+    except OSError as e:
+        sock.close()
+        if _resource_exhausted(e):
+            raise
+        return CONNECT_UNREACHABLE, None, None
+    except asyncio.TimeoutError:
+        sock.close()
+        return CONNECT_TIMEOUT, None, None
+    except BaseException:
+        sock.close()
+        raise
+    return CONNECT_OPEN, sock, time.monotonic() - started
+
+
+async def open_port(host, port, timeout):
+    """
+    非阻塞connect
+
+    Returns:
+        tuple or None: 端口开放时返回 (已连接的socket, 连接耗时)，否则None
+    """
+    outcome, sock, rtt = await connect_port(host, port, timeout)
+    return (sock, rtt) if outcome == CONNECT_OPEN else None
+
+
+async def verify_units(sock, host, port, unit_ids, timeout, address=0x0000, response_rtt=None, connect_rtt=None,
+                       adaptive=True):
+    """
+    第二阶段：在已建立的连接上依次用各个单元ID发送FC03读请求
+
+    连接被设备关闭时重新连接并继续探测剩余的单元ID；等待响应的超时时间按该主机的RTT估计（HostRtt）
+
+    Args:
+        timeout (float): 重新连接的超时时间，也是等待响应的超时时间上限（秒）
+        response_rtt (RttEstimator): 提供时记录响应时间样本（只用于统计）
+        connect_rtt (float): 该主机的连接RTT（秒），作为响应时间的初始估计
+        adaptive (bool): 为False时等待响应始终使用timeout
+
+    Returns:
+        tuple: (给出合法响应的单元ID, 最后使用的socket)
+    """
+    loop = asyncio.get_running_loop()
+    host_rtt = HostRtt(timeout, connect_rtt, adaptive=adaptive)
+    units = []
+    reconnects = 0
+    for unit in unit_ids:
+        if sock is None:
+            opened = await open_port(host, port, timeout)
+            if opened is None:
+                break
+            sock = opened[0]
+        tid = PROBE_TID_BASE | unit
+        request = ReadRequestFrame(unit, address, 1).with_tid(tid)
+        started = time.monotonic()
+        try:
+            while True:
+                await loop.sock_sendall(sock, request)
+                try:
+                    _, exception_code = await asyncio.wait_for(read_probe_response(loop, sock, tid),
+                                                               host_rtt.timeout())
+                    break
+                except asyncio.TimeoutError:
+                    # 主机还没有响应过时加倍超时时间重发（事务ID相同，先到的响应有效）；
+                    # 已经响应过的主机超时说明该单元ID不存在
+                    if host_rtt.answered or not host_rtt.backoff():
+                        raise
+            # 从第一次发送开始计时，重发时宁可高估响应时间
+            rtt = time.monotonic() - started
+            host_rtt.add(rtt)
+            if response_rtt is not None:
+                response_rtt.add(rtt)
+        except asyncio.TimeoutError:
+            continue
+        except ValueError:
+            # 不是Modbus服务
+            break
+        except OSError:
+            # 有的设备收到不存在的单元ID后会关闭连接，换一个新连接继续；
+            # 还没有任何单元ID响应时最多重连MAX_RECONNECTS次，避免对非Modbus服务反复连接
+            sock.close()
+            sock = None
+            reconnects += 1
+            if not units and reconnects > MAX_RECONNECTS:
+                break
+            continue
+        if exception_code not in GATEWAY_EXCEPTIONS:
+            units.append(unit)
+    return tuple(units), sock
+
+
+async def probe_modbus(host, port=502, timeout=1.0, unit_ids=DEFAULT_UNIT_IDS, address=0x0000):
+    """
+    探测单个地址（两个阶段依次执行）
+
+    Returns:
+        ScanResult or None: 是Modbus设备时返回结果，否则None
+    """
+    opened = await open_port(host, port, timeout)
+    if opened is None:
+        return None
+    sock, rtt = opened
+    units, sock = await verify_units(sock, host, port, unit_ids, timeout, address, connect_rtt=rtt)
+    if sock is not None:
+        sock.close()
+    return ScanResult(host, port, units, rtt) if units else None
+
+
+class AsyncScanner:
+    """
+    两阶段流水线网络扫描器
+    scan() 在调用线程中运行自己的事件循环直到扫描结束，stop() 可以在任意线程调用
+    """
+
+    def __init__(self, ports=DEFAULT_PORTS, timeout=1.0, concurrency=DEFAULT_CONCURRENCY,
+                 unit_ids=DEFAULT_UNIT_IDS, verify_concurrency=DEFAULT_VERIFY_CONCURRENCY, adaptive=True):
+        """
+        Args:
+            ports (int or list): 扫描的端口
+            timeout (float): 等待每个Modbus响应的超时时间（秒），也是连接超时的上限，测得足够的RTT之前使用该值
+            concurrency (int): 第一阶段最多同时进行的连接数（不超过文件描述符上限）
+            unit_ids (list): 第二阶段探测的单元ID
+            verify_concurrency (int): 第二阶段最多同时验证的连接数
+            adaptive (bool): 是否根据RTT调整连接和响应超时时间并按AIMD调整并发数；为False时使用固定的timeout和concurrency
+        """
+        self.ports = (int(ports),) if isinstance(ports, int) else tuple(dict.fromkeys(int(p) for p in ports))
+        self.timeout = float(timeout)
+        if self.timeout <= 0:
+            raise ValueError(f'超时时间必须大于0: {timeout}')
+        self.adaptive = adaptive
+        self.unit_ids = parse_unit_ids(unit_ids)
+        self.verify_concurrency = max(1, int(verify_concurrency))
+        self.concurrency = max_concurrency(int(concurrency) + self.verify_concurrency) - self.verify_concurrency
+        self.concurrency = max(1, self.concurrency)
+        self.scanned = 0      # 已完成第一阶段的 地址×端口 数
+        self.open_count = 0   # 端口开放的数量（进入第二阶段）
+        self.verified = 0     # 已完成第二阶段的数量
+        self.found = []
+        self.connect_rtt = RttEstimator(self.timeout, adaptive=adaptive)
+        # 所有主机的响应时间分布只做统计，等待响应的超时时间按主机估计
+        self.response_rtt = RttEstimator(self.timeout, adaptive=False)
+        self.limiter = None
+        self._stopped = threading.Event()
+
+    def stop(self):
+        """停止扫描：不再发起新的连接，已开放的端口不再验证"""
+        self._stopped.set()
+
+    @property
+    def stopped(self):
+        """扫描是否被停止"""
+        return self._stopped.is_set()
+
+    def stats(self):
+        """扫描统计"""
+        return {
+            'scanned': self.scanned,
+            'open': self.open_count,
+            'verified': self.verified,
+            'found': len(self.found),
+            'connect_rtt': self.connect_rtt.to_dict(),
+            'response_rtt': self.response_rtt.to_dict(),
+            'concurrency': self.limiter.to_dict() if self.limiter else None,
+        }
+
+    def scan(self, hosts, total=None, on_found=None, on_progress=None):
+        """
+        扫描地址列表（阻塞直到完成或被停止）
+
+        Args:
+            hosts (iterable): IP地址
+            total (int): 地址数（用于进度），默认为len(hosts)
+            on_found (callable): 发现设备时回调 on_found(ScanResult)
+            on_progress (callable): 进度回调 on_progress(已扫描数, 总数, 已发现数)，
+                按 地址×端口 计数，最多每100毫秒一次
+
+        Returns:
+            list: [ScanResult]，按发现顺序
+        """
+        if total is None:
+            total = len(hosts)
+        return asyncio.run(self._scan(hosts, total * len(self.ports), on_found, on_progress))
+
+    async def _scan(self, hosts, total, on_found, on_progress):
+        limiter = self.limiter = AimdLimiter(self.concurrency, adaptive=self.adaptive)
+        # 有界队列：验证跟不上时第一阶段等待，已连接的socket不会无限积压
+        opened = asyncio.Queue(maxsize=self.verify_concurrency * 2)
+        pending = set()
+        last_progress = [0.0]
+        exhausted = [False]
+
+        def report(force=False):
+            now = time.monotonic()
+            if on_progress and (force or now - last_progress[0] >= PROGRESS_INTERVAL):
+                last_progress[0] = now
+                on_progress(self.scanned, total, len(self.found))
+
+        async def sweep(host, port, epoch):
+            outcome, sock, rtt = CONNECT_ERROR, None, None
+            try:
+                outcome, sock, rtt = await connect_port(host, port, self.connect_rtt.timeout())
+            except OSError as e:
+                if not exhausted[0]:
+                    exhausted[0] = True
+                    logger.warning(f"扫描时本机资源不足，降低并发数: {str(e)}")
+            finally:
+                limiter.release(epoch, outcome, rtt)
+            if rtt is not None:
+                self.connect_rtt.add(rtt)
+            self.scanned += 1
+            if sock is not None:
+                self.open_count += 1
+                await opened.put((host, port, sock, rtt))
+            report()
+
+        async def verifier():
+            while True:
+                item = await opened.get()
+                if item is None:
+                    return
+                host, port, sock, rtt = item
+                try:
+                    if self.stopped:
+                        continue
+                    units, sock = await verify_units(sock, host, port, self.unit_ids, self.timeout,
+                                                     response_rtt=self.response_rtt, connect_rtt=rtt,
+                                                     adaptive=self.adaptive)
+                    self.verified += 1
+                    if units:
+                        result = ScanResult(host, port, units, rtt)
+                        self.found.append(result)
+                        if on_found:
+                            on_found(result)
+                except Exception as e:
+                    logger.debug(f"验证 {host}:{port} 时出错: {str(e)}")
+                finally:
+                    if sock is not None:
+                        sock.close()
+
+        started = time.monotonic()
+        report(force=True)
+        verifiers = [asyncio.ensure_future(verifier()) for _ in range(self.verify_concurrency)]
+        try:
+            for host in hosts:
+                for port in self.ports:
+                    epoch = await limiter.acquire()
+                    if self.stopped:
+                        limiter.release(epoch, None)
+                        break
+                    task = asyncio.ensure_future(sweep(host, port, epoch))
+                    pending.add(task)
+                    task.add_done_callback(pending.discard)
+                if self.stopped:
+                    break
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        finally:
+            for _ in verifiers:
+                await opened.put(None)
+            await asyncio.gather(*verifiers, return_exceptions=True)
+        report(force=True)
+        logger.info(f"扫描结束: {self.scanned}/{total} 个地址端口，{self.open_count} 个端口开放，"
+                    f"发现 {len(self.found)} 个设备，耗时 {time.monotonic() - started:.1f} 秒，"
+                    f"并发 {int(limiter.limit)}/{self.concurrency} (降低 {limiter.decreases} 次)，"
+                    f"连接超时 {self.connect_rtt.timeout():.3f} 秒，响应超时上限 {self.timeout:.3f} 秒")
+        return self.found
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+连接健康状态模块
+根据实际通信事务的结果和耗时推断连接状态，只有链路空闲超过阈值时才需要发送保活探测
+"""
+
+import threading
+import time
+from datetime import datetime
+
+# 连接状态
+STATE_DISCONNECTED = 'disconnected'  # 未连接
+STATE_CONNECTED = 'connected'        # 通信正常
+STATE_DEGRADED = 'degraded'          # 出现连续错误，但未达到断开阈值
+STATE_LOST = 'lost'                  # 连续错误达到阈值，视为连接断开
+
+
+class ConnectionHealth:
+    """连接健康状态机"""
+
+    def __init__(self, failure_threshold=3, idle_threshold=10.0, latency_alpha=0.2):
+        """
+        Args:
+            failure_threshold (int): 连续失败多少次视为连接断开，默认3
+            idle_threshold (float): 链路空闲超过多少秒需要保活探测，默认10秒
+            latency_alpha (float): 平均延迟的指数平滑系数，默认0.2
+        """
+        self.failure_threshold = failure_threshold
+        self.idle_threshold = idle_threshold
+        self.latency_alpha = latency_alpha
+        self._lock = threading.Lock()
+        self.mark_disconnected()
+
+    def mark_connected(self):
+        """建立连接后重置统计"""
+        with self._lock:
+            self._reset(STATE_CONNECTED)
+            self.last_success = time.time()
+            self._last_activity = time.monotonic()
+
+    def mark_disconnected(self):
+        """主动断开连接"""
+        with self._lock:
+            self._reset(STATE_DISCONNECTED)
+
+    def _reset(self, state):
+        self.state = state
+        self.success_count = 0
+        self.failure_count = 0
+        self.consecutive_failures = 0
+        self.last_success = None
+        self.last_failure = None
+        self.last_error = None
+        self.last_latency = None
+        self.avg_latency = None
+        self._last_activity = None
+
+    def record_success(self, latency):
+        """记录一次成功的事务及其耗时（秒）"""
+        with self._lock:
+            if self.state == STATE_DISCONNECTED:
+                return
+            self.success_count += 1
+            self.consecutive_failures = 0
+            self.last_success = time.time()
+            self.last_latency = latency
+            if self.avg_latency is None:
+                self.avg_latency = latency
+            else:
+                self.avg_latency += self.latency_alpha * (latency - self.avg_latency)
+            self._last_activity = time.monotonic()
+            self.state = STATE_CONNECTED
+
+    def record_failure(self, error=None):
+        """记录一次失败的事务"""
+        with self._lock:
+            if self.state == STATE_DISCONNECTED:
+                return
+            self.failure_count += 1
+            self.consecutive_failures += 1
+            self.last_failure = time.time()
+            self.last_error = str(error) if error is not None else None
+            self._last_activity = time.monotonic()
+            if self.consecutive_failures >= self.failure_threshold:
+                self.state = STATE_LOST
+            else:
+                self.state = STATE_DEGRADED
+
+    def record(self, ok, latency, error=None):
+        """记录一次事务结果，可直接作为read_blocks的on_transaction回调"""
+        if ok:
+            self.record_success(latency)
+        else:
+            self.record_failure(error)
+
+    def needs_probe(self):
+        """链路空闲时间是否超过阈值，需要发送保活探测"""
+        with self._lock:
+            if self.state == STATE_DISCONNECTED or self._last_activity is None:
+                return False
+            return time.monotonic() - self._last_activity >= self.idle_threshold
+
+    def is_connected(self):
+        """根据最近的事务结果判断连接是否可用"""
+        return self.state in (STATE_CONNECTED, STATE_DEGRADED)
+
+    def last_check(self):
+        """最近一次事务时间的ISO格式字符串"""
+        latest = max(filter(None, (self.last_success, self.last_failure)), default=None)
+        return datetime.fromtimestamp(latest).isoformat() if latest else None
+
+    def to_dict(self):
+        """转换为可JSON序列化的字典"""
+        with self._lock:
+            return {
+                'state': self.state,
+                'success_count': self.success_count,
+                'failure_count': self.failure_count,
+                'consecutive_failures': self.consecutive_failures,
+                'last_success': datetime.fromtimestamp(self.last_success).isoformat() if self.last_success else None,
+                'last_failure': datetime.fromtimestamp(self.last_failure).isoformat() if self.last_failure else None,
+                'last_error': self.last_error,
+                'last_latency_ms': round(self.last_latency * 1000, 2) if self.last_latency is not None else None,
+                'avg_latency_ms': round(self.avg_latency * 1000, 2) if self.avg_latency is not None else None,
+            }
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+曲线降采样模块
+LTTB (Largest-Triangle-Three-Buckets) 在保留曲线形状（峰值、突变）的前提下
+把长序列缩减到指定点数，图表无论记录多长都只需绘制固定数量的点
+"""
+
+try:
+    import numpy as np
+except ImportError:  # 没有numpy时使用纯Python实现
+    np = None
+
+
+def lttb_indices(x, y, threshold):
+    """
+    用LTTB算法选出要保留的点
+
+    缺失值（None或NaN）不参与选点：序列在缺失值处断开，点数预算按各连续段的长度分配，
+    每段分别降采样；每段缺失值的第一个点作为断点保留在结果中，曲线在该处断开而不是连成0值
+
+    Args:
+        x (list): 横坐标（单调递增，如毫秒时间戳）
+        y (list): 纵坐标，None或NaN表示缺失
+        threshold (int): 保留的点数（不含断点；每个连续段至少保留首尾两点）
+
+    Returns:
+        list: 保留点的下标（升序，包含首尾两点）
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return list(range(n)) if threshold >= n else [0, n - 1][:max(threshold, 0)]
+
+    segments, gaps = _split_gaps(y)
+    if not gaps:
+        return _lttb(x, y, threshold)
+    valid = sum(end - start for start, end in segments)
+    if not valid:
+        return [0, n - 1]
+
+    selected = set(gaps)
+    selected.add(n - 1)
+    for start, end in segments:
+        budget = max(2, round(threshold * (end - start) / valid))
+        selected.update(start + i for i in _lttb(x[start:end], y[start:end], budget))
+    return sorted(selected)
+
+
+def _split_gaps(y):
+    """
+    按缺失值把序列分段
+
+    Returns:
+        tuple: (连续有效段 [(起始下标, 结束下标), ...], 每段缺失值的第一个下标列表)
+    """
+    segments = []
+    gaps = []
+    start = None
+    for i, v in enumerate(y):
+        if v is None or v != v:
+            if start is not None or i == 0:
+                gaps.append(i)
+            if start is not None:
+                segments.append((start, i))
+                start = None
+        elif start is None:
+            start = i
+    if start is not None:
+        segments.append((start, len(y)))
+    return segments, gaps
+
+
+def _lttb(x, y, threshold):
+    """对没有缺失值的序列执行LTTB"""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return list(range(n)) if threshold >= n else [0, n - 1][:max(threshold, 0)]
+    if np is not None:
+        return _lttb_numpy(x, y, threshold)
+
+    # 桶边界与numpy实现一致：第i个桶为 [bounds[i], bounds[i + 1])，最后一个点单独成桶
+    every = (n - 2) / (threshold - 2)
+    bounds = [int(i * every) + 1 for i in range(threshold - 1)] + [n]
+    bounds[-2] = n - 1
+    selected = [0]
+    a = 0
+    for i in range(threshold - 2):
+        # 下一个桶的平均点
+        start, end, next_end = bounds[i], bounds[i + 1], bounds[i + 2]
+        span = next_end - end
+        avg_x = sum(x[end:next_end]) / span
+        avg_y = sum(y[end:next_end]) / span
+        # 当前桶中与上一个选中点、下一个桶平均点构成面积最大三角形的点
+        ax, ay = x[a], y[a]
+        best = start
+        best_area = -1.0
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (y[j] - ay) - (ax - x[j]) * (avg_y - ay))
+            if area > best_area:
+                best_area = area
+                best = j
+        selected.append(best)
+        a = best
+    selected.append(n - 1)
+    return selected
+
+
+def _lttb_numpy(x, y, threshold):
+    n = len(x)
+    xs = np.asarray(x, dtype=np.float64)
+    ys = np.asarray(y, dtype=np.float64)
+    every = (n - 2) / (threshold - 2)
+    bounds = (np.arange(threshold - 1) * every).astype(np.int64) + 1
+    bounds[-1] = n - 1
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = bounds[i], bounds[i + 1]
+        next_end = bounds[i + 2] if i + 2 < len(bounds) else n
+        avg_x = xs[end:next_end].mean() if next_end > end else xs[n - 1]
+        avg_y = ys[end:next_end].mean() if next_end > end else ys[n - 1]
+        ax, ay = xs[a], ys[a]
+        areas = np.abs((ax - avg_x) * (ys[start:end] - ay) - (ax - xs[start:end]) * (avg_y - ay))
+        a = start + int(areas.argmax())
+        selected[i + 1] = a
+    return selected.tolist()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+实时事件推送模块
+一个发布者把数据快照、通信日志和状态变化推送给所有订阅者（Server-Sent Events），
+每个事件只编码一次，订阅者共享同一份字节串，浏览器数量增加不会产生额外的设备读取。
+快照和状态作为保留状态发布：只推送与上一次相比发生变化的字段，
+新订阅者先收到一份完整状态，之后按增量更新
+"""
+
+import json
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+# 没有事件时发送注释行的间隔（秒），保持连接并及时发现已断开的客户端
+KEEPALIVE_INTERVAL = 15.0
+
+# 浏览器断线后重新连接的等待时间（毫秒）
+RETRY_MS = 3000
+
+STATE_EVENT = 'state'
+
+
+def format_event(event, data, event_id=None):
+    """
+    编码一个SSE事件
+
+    Args:
+        event (str): 事件名称
+        data: 可JSON序列化的事件数据
+        event_id (int): 事件序号
+
+    Returns:
+        bytes: SSE文本
+    """
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event}')
+    lines.append('data: ' + json.dumps(data, ensure_ascii=False, separators=(',', ':')))
+    return ('\n'.join(lines) + '\n\n').encode('utf-8')
+
+
+def diff_state(previous, current):
+    """
+    计算两份状态之间的增量（嵌套字典逐层比较）
+
+    Returns:
+        dict: 新增或发生变化的字段，没有变化时为空字典；
+        previous中有而current中没有的字段以None表示（已为None的不再重复发送）
+    """
+    delta = {}
+    for key, value in current.items():
+        old = previous.get(key)
+        if isinstance(value, dict) and isinstance(old, dict):
+            changed = diff_state(old, value)
+            if changed:
+                delta[key] = changed
+        elif key not in previous or old != value:
+            delta[key] = value
+    for key, old in previous.items():
+        if key not in current and old is not None:
+            delta[key] = None
+    return delta
+
+
+def merge_state(target, delta):
+    """把增量合并到状态中（就地修改target）"""
+    for key, value in delta.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            merge_state(target[key], value)
+        else:
+            target[key] = dict(value) if isinstance(value, dict) else value
+    return target
+
+
+class Subscription:
+    """一个订阅者（一个浏览器连接）的待发送事件队列"""
+
+    def __init__(self, bus, max_pending):
+        self._bus = bus
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._resync = False
+        self.closed = False
+
+    def _put(self, frame):
+        # 在总线锁内调用；队列已满说明客户端跟不上，丢弃积压事件，之后重新发送完整状态
+        try:
+            self._queue.put_nowait(frame)
+        except queue.Full:
+            self._drain()
+            self._resync = True
+
+    def _drain(self):
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                return
+
+    def get(self, timeout=None):
+        """
+        取出下一个待发送的事件
+
+        Returns:
+            bytes or None: SSE文本，超时返回None
+        """
+        if self._resync:
+            frame = self._bus._resync(self)
+            if frame is not None:
+                return frame
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def frames(self, keepalive=KEEPALIVE_INTERVAL):
+        """
+        SSE响应体生成器，没有事件时定期发送注释行，总线关闭时结束
+
+        Yields:
+            bytes
+        """
+        yield f'retry: {RETRY_MS}\n\n'.encode('utf-8')
+        try:
+            while not self.closed:
+                frame = self.get(timeout=keepalive)
+                if frame is None:
+                    yield b': keepalive\n\n'
+                elif frame:
+                    yield frame
+        finally:
+            self._bus.unsubscribe(self)
+
+
+class EventBus:
+    """事件发布者（多线程安全，发布和订阅共用一把锁保证增量与完整状态一致）"""
+
+    def __init__(self, max_pending=256):
+        """
+        Args:
+            max_pending (int): 每个订阅者最多积压的事件数，超过后丢弃积压事件并重新同步完整状态
+        """
+        self.max_pending = max(1, int(max_pending))
+        self._subscribers = []
+        self._state = {}
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    @property
+    def subscriber_count(self):
+        """当前订阅者数量"""
+        return len(self._subscribers)
+
+    def _next_id(self):
+        self._sequence += 1
+        return self._sequence
+
+    def _state_frame(self):
+        return format_event(STATE_EVENT, self._state, self._next_id())
+
+    def subscribe(self):
+        """
+        新增订阅者，第一个事件为完整状态
+
+        Returns:
+            Subscription
+        """
+        subscription = Subscription(self, self.max_pending)
+        with self._lock:
+            subscription._put(self._state_frame())
+            self._subscribers.append(subscription)
+        logger.debug(f"新增事件订阅者，当前 {len(self._subscribers)} 个")
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """移除订阅者"""
+        with self._lock:
+            subscription.closed = True
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+
+    def _resync(self, subscription):
+        with self._lock:
+            if not subscription._resync:
+                return None
+            subscription._resync = False
+            subscription._drain()
+            logger.warning("事件订阅者处理过慢，已丢弃积压事件并重新发送完整状态")
+            return self._state_frame()
+
+    def _fanout(self, frame):
+        for subscription in self._subscribers:
+            subscription._put(frame)
+
+    def publish(self, event, data):
+        """
+        发布一个事件（日志、扫描进度等不保留的事件）
+
+        Returns:
+            int: 事件序号
+        """
+        with self._lock:
+            event_id = self._next_id()
+            if self._subscribers:
+                self._fanout(format_event(event, data, event_id))
+            return event_id
+
+    def publish_state(self, event, data):
+        """
+        发布保留状态，只推送发生变化的字段
+
+        Args:
+            event (str): 状态名称（同时作为事件名称和完整状态中的键）
+            data (dict): 当前状态，嵌套字典逐层比较
+
+        Returns:
+            dict: 推送的增量，没有变化时为空字典
+        """
+        with self._lock:
+            previous = self._state.get(event)
+            if previous is None:
+                delta = dict(data)
+                self._state[event] = merge_state({}, data)
+            else:
+                delta = diff_state(previous, data)
+                merge_state(previous, delta)
+            if delta and self._subscribers:
+                self._fanout(format_event(event, delta, self._next_id()))
+            return delta
+
+    def clear_state(self, event):
+        """清除保留状态，下一次发布时推送完整数据"""
+        with self._lock:
+            self._state.pop(event, None)
+
+    def close(self):
+        """关闭所有订阅者"""
+        with self._lock:
+            subscribers, self._subscribers = self._subscribers, []
+            for subscription in subscribers:
+                subscription.closed = True
+                subscription._put(b'')
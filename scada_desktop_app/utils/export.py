@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+记录数据流式导出模块
+按固定大小的批次从数据库游标读取样本并逐批生成CSV或NDJSON文本，
+导出任意长度的记录内存占用都保持不变；Web端作为分块HTTP响应输出，桌面端直接写入文件。
+Excel使用openpyxl的只写模式逐行写入，数据摘要由SQL（汇总表）计算
+"""
+
+import csv
+import io
+import json
+import logging
+import os
+from datetime import datetime
+
+from utils.register_map import REGISTER_MAP
+from utils.recordings import iter_recording
+from utils.rollups import recording_summary
+from utils.sqlite_store import connect_read_only
+
+logger = logging.getLogger(__name__)
+
+EXPORT_CSV = 'csv'
+EXPORT_NDJSON = 'ndjson'
+EXPORT_XLSX = 'xlsx'
+EXPORT_FORMATS = (EXPORT_CSV, EXPORT_NDJSON)
+
+# 数据摘要中的平均值项: (参数名, 数据列)
+SUMMARY_AVERAGES = [
+    ('IN1电流(平均)', 'in1_current'),
+    ('IN1电压(平均)', 'in1_voltage'),
+    ('电池总电压(平均)', 'total_voltage'),
+    ('电流(平均)', 'current'),
+    ('温度1(平均)', 'temperature1'),
+    ('温度2(平均)', 'temperature2'),
+    ('电池电量(平均)', 'battery_percentage'),
+]
+
+EXPORT_MIMETYPES = {
+    EXPORT_CSV: 'text/csv',
+    EXPORT_NDJSON: 'application/x-ndjson',
+}
+
+
+def export_format_from_path(file_path):
+    """根据文件扩展名判断导出格式，无法识别时返回None"""
+    ext = os.path.splitext(file_path)[1].lower().lstrip('.')
+    if ext in ('ndjson', 'jsonl'):
+        return EXPORT_NDJSON
+    if ext == 'csv':
+        return EXPORT_CSV
+    if ext == 'xlsx':
+        return EXPORT_XLSX
+    return None
+
+
+def iter_export(conn, recording_id, fmt=EXPORT_CSV, columns=None, start_ms=None, end_ms=None,
+                timestamp_sep=' ', batch_size=5000):
+    """
+    逐批生成导出文本
+
+    Args:
+        conn (sqlite3.Connection): 数据库连接（迭代期间一直使用）
+        recording_id (str): 记录会话ID
+        fmt (str): csv 或 ndjson
+        columns (list): 导出的数据列，None表示全部列
+        start_ms (int): 起始时间（epoch毫秒，包含）
+        end_ms (int): 结束时间（epoch毫秒，包含）
+        timestamp_sep (str): timestamp文本中日期与时间的分隔符
+        batch_size (int): 每批的样本数
+
+    Yields:
+        str: 一批样本的文本（CSV第一段为表头）
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f'不支持的导出格式: {fmt}')
+    columns = list(REGISTER_MAP.columns if columns is None else columns)
+    names = ['timestamp'] + columns
+    batches = iter_recording(conn, recording_id, columns, start_ms, end_ms, timestamp_sep, batch_size)
+
+    if fmt == EXPORT_NDJSON:
+        for batch in batches:
+            yield ''.join(
+                json.dumps(dict(zip(names, row)), ensure_ascii=False, separators=(',', ':')) + '\n'
+                for row in zip(*(batch[name] for name in names))
+            )
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(names)
+    yield buffer.getvalue()
+    for batch in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(zip(*(batch[name] for name in names)))
+        yield buffer.getvalue()
+
+
+def export_recording(conn, recording_id, file_path, fmt=None, **kwargs):
+    """
+    把记录会话流式写入CSV/NDJSON文件
+
+    Args:
+        file_path (str): 目标文件路径
+        fmt (str): csv 或 ndjson，None表示按扩展名判断（默认csv）
+        kwargs: 传给 iter_export 的其他参数
+
+    Returns:
+        int: 写入的字节数
+    """
+    fmt = fmt or export_format_from_path(file_path) or EXPORT_CSV
+    written = 0
+    # CSV带BOM，Excel直接打开时中文不乱码
+    encoding = 'utf-8-sig' if fmt == EXPORT_CSV else 'utf-8'
+    with open(file_path, 'w', encoding=encoding, newline='') as f:
+        for chunk in iter_export(conn, recording_id, fmt, **kwargs):
+            written += f.write(chunk)
+    logger.info(f"记录导出完成: ID {recording_id} -> {file_path} ({fmt})")
+    return written
+
+
+def _format_ms(ts_ms, timestamp_sep=' '):
+    return datetime.fromtimestamp(ts_ms / 1000).isoformat(timestamp_sep)
+
+
+def summary_rows(summary, timestamp_sep=' '):
+    """把 recording_summary 的结果转换为数据摘要表的 (参数, 值) 行"""
+    count = summary['count']
+    duration = round((summary['end_ms'] - summary['start_ms']) / 60000, 2) if count > 1 else 'N/A'
+    rows = [
+        ('记录总数', count),
+        ('开始时间', _format_ms(summary['start_ms'], timestamp_sep)),
+        ('结束时间', _format_ms(summary['end_ms'], timestamp_sep)),
+        ('持续时间(分钟)', duration),
+    ]
+    for name, column in SUMMARY_AVERAGES:
+        value = summary['averages'].get(column)
+        rows.append((name, 'N/A' if value is None else round(value, 2)))
+    return rows
+
+
+def export_recording_xlsx(conn, recording_id, file_path, timestamp_sep=' ', batch_size=5000, progress=None):
+    """
+    把记录会话写入Excel文件（会话信息 / 数据记录 / 数据摘要 三个工作表）
+
+    工作簿使用只写模式，样本逐批写入，不在内存中保存整张表
+
+    Args:
+        conn (sqlite3.Connection): 数据库连接
+        recording_id (str): 记录会话ID
+        file_path (str): 目标文件路径
+        timestamp_sep (str): timestamp文本中日期与时间的分隔符
+        batch_size (int): 每批读取的样本数
+        progress (callable): 进度回调 progress(已写入样本数, 样本总数)
+
+    Returns:
+        int: 写入的样本数
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    session = conn.execute(
+        'SELECT name, start_time, end_time FROM recording_sessions WHERE id = ?', (recording_id,)
+    ).fetchone()
+    if session is None:
+        raise ValueError(f'未找到记录会话: ID {recording_id}')
+    summary = recording_summary(conn, recording_id, [column for _, column in SUMMARY_AVERAGES])
+
+    workbook = Workbook(write_only=True)
+    bold = Font(bold=True)
+
+    def header(sheet, names):
+        cells = []
+        for name in names:
+            cell = WriteOnlyCell(sheet, value=name)
+            cell.font = bold
+            cells.append(cell)
+        sheet.append(cells)
+
+    sheet = workbook.create_sheet('会话信息')
+    header(sheet, ['name', 'start_time', 'end_time'])
+    sheet.append(list(session))
+
+    names = ['timestamp'] + list(REGISTER_MAP.columns)
+    sheet = workbook.create_sheet('数据记录')
+    header(sheet, names)
+    written = 0
+    for batch in iter_recording(conn, recording_id, REGISTER_MAP.columns, timestamp_sep=timestamp_sep,
+                                batch_size=batch_size):
+        for row in zip(*(batch[name] for name in names)):
+            sheet.append(row)
+        written += len(batch['ts_ms'])
+        if progress:
+            progress(written, summary['count'])
+
+    if summary['count']:
+        sheet = workbook.create_sheet('数据摘要')
+        header(sheet, ['参数', '值'])
+        for row in summary_rows(summary, timestamp_sep):
+            sheet.append(row)
+
+    workbook.save(file_path)
+    logger.info(f"记录导出完成: ID {recording_id} -> {file_path} ({written} 条)")
+    return written
+
+
+class QueueProgress:
+    """可以传给进程池的进度回调，把 (记录ID, 已写入样本数, 样本总数) 放入跨进程队列"""
+
+    def __init__(self, progress_queue, recording_id):
+        """
+        Args:
+            progress_queue: multiprocessing.Manager().Queue()
+            recording_id (str): 记录会话ID
+        """
+        self.progress_queue = progress_queue
+        self.recording_id = recording_id
+
+    def __call__(self, written, total):
+        self.progress_queue.put((self.recording_id, written, total))
+
+
+def export_recording_file(db_path, recording_id, file_path, progress=None):
+    """
+    在独立进程中导出一个记录会话（供进程池调用，格式按扩展名判断，默认Excel）
+
+    使用只读连接，导出进程不会打开写连接
+
+    Args:
+        progress (callable): Excel导出的进度回调 progress(已写入样本数, 样本总数)，
+            在进程池中使用QueueProgress
+
+    Returns:
+        tuple: (记录ID, 文件路径, 写入的样本数或字节数)
+    """
+    conn = connect_read_only(db_path)
+    try:
+        fmt = export_format_from_path(file_path)
+        if fmt in EXPORT_FORMATS:
+            written = export_recording(conn, recording_id, file_path, fmt)
+        else:
+            written = export_recording_xlsx(conn, recording_id, file_path, progress=progress)
+        return recording_id, file_path, written
+    finally:
+        conn.close()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+后台导出模块
+在后台线程中导出记录，多个记录交给进程池并行导出（Excel写入受GIL限制，多进程才能利用多核），
+通过信号把进度报告给界面，导出期间窗口保持响应
+"""
+
+import logging
+import multiprocessing
+import os
+import queue
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from utils.export import QueueProgress, export_recording_file
+
+logger = logging.getLogger(__name__)
+
+
+class ExportThread(QThread):
+    """记录导出线程类"""
+
+    # 进度更新信号（已完成数, 总数）
+    export_progress = pyqtSignal(int, int)
+    # 单个记录的写入进度信号（记录ID, 已写入样本数, 样本总数），目前只有Excel导出报告
+    record_progress = pyqtSignal(str, int, int)
+    # 单个记录导出成功信号（记录ID, 文件路径）
+    record_exported = pyqtSignal(str, str)
+    # 单个记录导出失败信号（记录ID, 错误信息）
+    record_failed = pyqtSignal(str, str)
+    # 全部完成信号（成功的记录ID列表, 失败的记录ID列表）
+    export_finished = pyqtSignal(list, list)
+
+    def __init__(self, db_path, tasks, max_workers=None):
+        """
+        Args:
+            db_path (str): 数据库文件路径
+            tasks (list): [(记录ID, 目标文件路径)]，格式按扩展名判断
+            max_workers (int): 最大进程数，默认为CPU核数
+        """
+        super().__init__()
+        self.db_path = db_path
+        self.tasks = list(tasks)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor = None
+
+    def run(self):
+        succeeded, failed = [], []
+        total = len(self.tasks)
+        self.export_progress.emit(0, total)
+
+        if total == 1:
+            # 单个记录直接在本线程导出，省去启动进程的开销
+            recording_id, file_path = self.tasks[0]
+
+            def progress(written, count):
+                self.record_progress.emit(recording_id, written, count)
+
+            try:
+                export_recording_file(self.db_path, recording_id, file_path, progress=progress)
+                succeeded.append(recording_id)
+                self.record_exported.emit(recording_id, file_path)
+            except Exception as e:
+                logger.error(f"导出记录失败: {recording_id}: {str(e)}")
+                failed.append(recording_id)
+                self.record_failed.emit(recording_id, str(e))
+            self.export_progress.emit(1, total)
+            self.export_finished.emit(succeeded, failed)
+            return
+
+        # 导出进程通过Manager队列报告写入进度，本线程等待结果的间隙转发为信号
+        manager = multiprocessing.Manager()
+        progress_queue = manager.Queue()
+        self._executor = ProcessPoolExecutor(max_workers=min(self.max_workers, total))
+        try:
+            futures = {
+                self._executor.submit(export_recording_file, self.db_path, recording_id, file_path,
+                                      QueueProgress(progress_queue, recording_id)): recording_id
+                for recording_id, file_path in self.tasks
+            }
+            pending = set(futures)
+            done_count = 0
+            while pending:
+                done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                self._forward_progress(progress_queue)
+                for future in done:
+                    recording_id = futures[future]
+                    try:
+                        _, file_path, _ = future.result()
+                        succeeded.append(recording_id)
+                        self.record_exported.emit(recording_id, file_path)
+                    except Exception as e:
+                        logger.error(f"导出记录失败: {recording_id}: {str(e)}")
+                        failed.append(recording_id)
+                        self.record_failed.emit(recording_id, str(e))
+                    done_count += 1
+                    self.export_progress.emit(done_count, total)
+        finally:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+            manager.shutdown()
+        self.export_finished.emit(succeeded, failed)
+
+    def _forward_progress(self, progress_queue):
+        """把导出进程报告的写入进度转发为record_progress信号"""
+        while True:
+            try:
+                recording_id, written, count = progress_queue.get_nowait()
+            except queue.Empty:
+                return
+            self.record_progress.emit(recording_id, written, count)
+
+    def stop(self):
+        """取消尚未开始的导出任务"""
+        executor = self._executor
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
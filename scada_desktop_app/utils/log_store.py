@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+通信日志存储模块
+固定容量的环形缓冲区保存最近的日志，每条日志带单调递增的序号、级别和分类，
+客户端按序号增量获取新日志（since），不必每次取回全部日志；
+采集热路径上的日志按时间间隔采样，重复的成功/失败记录合并为一条计数
+"""
+
+import itertools
+import threading
+import time
+from collections import deque, namedtuple
+from datetime import datetime
+
+# 日志级别（从低到高）
+LEVEL_DEBUG = 'debug'
+LEVEL_INFO = 'info'
+LEVEL_WARNING = 'warning'
+LEVEL_ERROR = 'error'
+LEVELS = (LEVEL_DEBUG, LEVEL_INFO, LEVEL_WARNING, LEVEL_ERROR)
+
+# 日志分类
+CATEGORY_GENERAL = 'general'
+CATEGORY_CONNECTION = 'connection'
+CATEGORY_READ = 'read'
+CATEGORY_RECORDING = 'recording'
+CATEGORY_SCAN = 'scan'
+CATEGORY_DEVICE = 'device'
+
+
+class LogEntry(namedtuple('LogEntry', ['seq', 'timestamp', 'level', 'category', 'message'])):
+    """
+    一条通信日志（不可变）
+
+    Attributes:
+        seq (int): 单调递增的序号（清空日志后继续递增）
+        timestamp (float): 记录时间 (time.time())
+        level (str): 级别
+        category (str): 分类
+        message (str): 日志内容
+    """
+
+    __slots__ = ()
+
+    def text(self):
+        """带时间的日志文本（与旧版日志格式一致）"""
+        return f"[{datetime.fromtimestamp(self.timestamp).strftime('%Y-%m-%d %H:%M:%S')}] {self.message}"
+
+    def to_dict(self):
+        """转换为可JSON序列化的字典"""
+        return {
+            'seq': self.seq,
+            'time': datetime.fromtimestamp(self.timestamp).isoformat(),
+            'level': self.level,
+            'category': self.category,
+            'message': self.message,
+            'text': self.text(),
+        }
+
+
+class LogStore:
+    """固定容量的日志环形缓冲区（多线程安全）"""
+
+    def __init__(self, capacity=1000):
+        """
+        Args:
+            capacity (int): 保留的日志条数，超过后丢弃最早的日志
+        """
+        self.capacity = max(1, int(capacity))
+        self._entries = deque(maxlen=self.capacity)
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def latest_seq(self):
+        """最新日志的序号，没有日志时为0"""
+        return self._seq
+
+    @property
+    def first_seq(self):
+        """缓冲区中最早日志的序号，没有日志时为最新序号+1"""
+        with self._lock:
+            return self._entries[0].seq if self._entries else self._seq + 1
+
+    def append(self, message, level=LEVEL_INFO, category=CATEGORY_GENERAL):
+        """
+        追加一条日志
+
+        Returns:
+            LogEntry
+        """
+        with self._lock:
+            self._seq += 1
+            entry = LogEntry(self._seq, time.time(), level, category, message)
+            self._entries.append(entry)
+        return entry
+
+    def since(self, seq=0, limit=None, level=None, category=None):
+        """
+        序号大于seq的日志（按序号从小到大）
+
+        Args:
+            seq (int): 已获取的最新序号，0表示从最早的日志开始
+            limit (int): 最多返回的条数
+            level (str): 最低级别
+            category (str): 只返回该分类
+
+        Returns:
+            list: [LogEntry]
+        """
+        with self._lock:
+            if not self._entries:
+                return []
+            # 序号连续，直接计算起始位置
+            start = max(0, int(seq) - self._entries[0].seq + 1)
+            entries = list(itertools.islice(self._entries, start, None))
+        if level is not None:
+            minimum = LEVELS.index(level)
+            entries = [e for e in entries if LEVELS.index(e.level) >= minimum]
+        if category is not None:
+            entries = [e for e in entries if e.category == category]
+        return entries if limit is None else entries[:max(0, int(limit))]
+
+    def tail(self, n):
+        """最新的n条日志"""
+        with self._lock:
+            n = max(0, min(int(n), len(self._entries)))
+            return list(itertools.islice(self._entries, len(self._entries) - n, None))
+
+    def clear(self):
+        """清空日志（序号不重置，增量获取的客户端不会漏掉之后的日志）"""
+        with self._lock:
+            self._entries.clear()
+
+
+class LogSampler:
+    """
+    热路径日志采样器
+    同一个键在间隔内只记录第一次，其余次数累计，下一次记录时附带被合并的次数
+    """
+
+    def __init__(self, interval=10.0):
+        """
+        Args:
+            interval (float): 同一个键两次记录之间的最小间隔（秒）
+        """
+        self.interval = interval
+        self._last = {}
+        self._suppressed = {}
+        self._lock = threading.Lock()
+
+    def sample(self, key):
+        """
+        判断本次是否需要记录
+
+        Returns:
+            int or None: 需要记录时返回上次记录以来被合并的次数，否则返回None
+        """
+        now = time.monotonic()
+        with self._lock:
+            last = self._last.get(key)
+            if last is not None and now - last < self.interval:
+                self._suppressed[key] = self._suppressed.get(key, 0) + 1
+                return None
+            self._last[key] = now
+            return self._suppressed.pop(key, 0)
+
+    def reset(self, key=None):
+        """重置采样状态（key为None时重置全部），下一次立即记录"""
+        with self._lock:
+            if key is None:
+                self._last.clear()
+                self._suppressed.clear()
+            else:
+                self._last.pop(key, None)
+                self._suppressed.pop(key, None)
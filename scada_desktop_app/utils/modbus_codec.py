@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+精简Modbus TCP编解码模块
+热路径上固定的FC03读取使用预先构造的请求报文，响应通过recv_into读入预分配的缓冲区，
+寄存器数据以大端字节串保留，由struct.unpack_from直接解码；其它功能仍使用pymodbus。
+不符合请求的响应帧（功能码、单元ID或字节数不对）与pymodbus一样抛出ModbusIOException，不会被当作寄存器数据
+"""
+
+import struct
+
+from pymodbus.exceptions import ModbusIOException
+
+FC_READ_HOLDING_REGISTERS = 0x03
+FC_EXCEPTION = 0x80
+
+# Modbus TCP应用数据单元最大长度
+MAX_ADU_SIZE = 260
+
+# MBAP报文头: 事务ID, 协议ID, 长度, 单元ID
+MBAP = struct.Struct('>HHHB')
+# FC03读保持寄存器请求: MBAP + 功能码, 起始地址, 数量
+READ_REQUEST = struct.Struct('>HHHBBHH')
+_TID = struct.Struct('>H')
+
+
+class ReadRequestFrame:
+    """预先构造的FC03请求报文，发送前只需写入事务ID"""
+
+    __slots__ = ('frame',)
+
+    def __init__(self, slave, address, count):
+        self.frame = bytearray(READ_REQUEST.pack(0, 0, 6, slave, FC_READ_HOLDING_REGISTERS, address, count))
+
+    def with_tid(self, tid):
+        """写入事务ID并返回报文（原地修改，不分配新对象）"""
+        _TID.pack_into(self.frame, 0, tid)
+        return self.frame
+
+
+class RegisterResponse:
+    """读寄存器成功的响应，接口与pymodbus响应一致；raw为大端寄存器字节串"""
+
+    __slots__ = ('raw', '_registers')
+
+    def __init__(self, raw):
+        self.raw = raw
+        self._registers = None
+
+    @property
+    def registers(self):
+        if self._registers is None:
+            self._registers = list(struct.unpack(f'>{len(self.raw) // 2}H', self.raw))
+        return self._registers
+
+    def isError(self):
+        return False
+
+    def __repr__(self):
+        return f"RegisterResponse({self.registers})"
+
+
+class ErrorResponse:
+    """读寄存器失败的响应（异常码、超时或连接错误）"""
+
+    __slots__ = ('message', 'exception_code')
+
+    def __init__(self, message, exception_code=None):
+        self.message = message
+        self.exception_code = exception_code
+
+    def isError(self):
+        return True
+
+    def __str__(self):
+        return self.message
+
+    __repr__ = __str__
+
+
+class ResponseReader:
+    """使用预分配缓冲区接收并解析响应报文"""
+
+    def __init__(self):
+        self.buffer = bytearray(MAX_ADU_SIZE)
+        self.view = memoryview(self.buffer)
+
+    def read(self, sock, expected=None):
+        """
+        从socket接收一个完整的FC03响应帧并校验
+
+        Args:
+            sock (socket.socket): 已连接的socket
+            expected (dict): {事务ID: (单元ID, 寄存器数量)}，事务ID在其中时校验单元ID和寄存器数量；
+                不在其中的（迟到的旧响应）只校验帧结构
+
+        Returns:
+            tuple: (事务ID, RegisterResponse或ErrorResponse)
+
+        Raises:
+            ModbusIOException: 报文头或PDU无效，或与请求不符；报文头无效时无法确定帧边界，调用方应关闭连接
+        """
+        self._recv_into(sock, 0, MBAP.size)
+        tid, protocol, length, unit = MBAP.unpack_from(self.buffer, 0)
+        if protocol != 0 or length < 2 or MBAP.size + length - 1 > MAX_ADU_SIZE:
+            raise ModbusIOException(f'无效的MBAP报文头 (协议 {protocol}, 长度 {length})')
+        self._recv_into(sock, MBAP.size, MBAP.size + length - 1)
+
+        request = expected.get(tid) if expected is not None else None
+        if request is not None and unit != request[0]:
+            raise ModbusIOException(f'响应的单元ID {unit} 与请求 {request[0]} 不符', FC_READ_HOLDING_REGISTERS)
+
+        function_code = self.buffer[MBAP.size]
+        if function_code == FC_READ_HOLDING_REGISTERS | FC_EXCEPTION:
+            if length != 3:
+                raise ModbusIOException(f'无效的异常响应 (长度 {length})', FC_READ_HOLDING_REGISTERS)
+            code = self.buffer[MBAP.size + 1]
+            return tid, ErrorResponse(f'设备返回异常码 {code}', exception_code=code)
+        if function_code != FC_READ_HOLDING_REGISTERS:
+            raise ModbusIOException(f'响应的功能码 0x{function_code:02X} 与请求不符', FC_READ_HOLDING_REGISTERS)
+        if length < 3:
+            raise ModbusIOException('响应缺少字节数', FC_READ_HOLDING_REGISTERS)
+        byte_count = self.buffer[MBAP.size + 1]
+        if byte_count > length - 3 or byte_count % 2:
+            raise ModbusIOException(f'无效的字节数 {byte_count} (长度 {length})', FC_READ_HOLDING_REGISTERS)
+        if request is not None and byte_count != 2 * request[1]:
+            raise ModbusIOException(f'响应字节数 {byte_count} 与请求的 {request[1]} 个寄存器不符',
+                                    FC_READ_HOLDING_REGISTERS)
+        start = MBAP.size + 2
+        return tid, RegisterResponse(bytes(self.view[start:start + byte_count]))
+
+    def _recv_into(self, sock, start, end):
+        view = self.view
+        while start < end:
+            n = sock.recv_into(view[start:end], end - start)
+            if n == 0:
+                raise ConnectionResetError('连接被对端关闭')
+            start += n
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+流水线Modbus TCP传输模块
+在同一连接上连续发送多个带不同事务ID的请求，按事务ID匹配响应，
+高延迟链路上多个读取只需约一个往返时间；设备不支持流水线时自动退回串行模式
+"""
+
+import logging
+import socket
+import time
+
+from pymodbus.exceptions import ModbusIOException
+
+from utils.modbus_codec import ReadRequestFrame, ResponseReader, ErrorResponse
+
+logger = logging.getLogger(__name__)
+
+
+class PipelinedModbusTransport:
+    """支持多个未完成事务的Modbus TCP客户端（仅实现FC03读取）"""
+
+    def __init__(self, host, port=502, timeout=3.0, window=4, pipelining=True):
+        """
+        Args:
+            host (str): 设备地址
+            port (int): 端口号，默认502
+            timeout (float): 等待响应的超时时间（秒），默认3.0
+            window (int): 每个连接允许同时未完成的请求数量，默认4
+            pipelining (bool): 是否启用流水线；为False时始终串行
+        """
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.window = max(1, window)
+        self.pipelining = pipelining
+        self._sock = None
+        self._tid = 0
+        self._frames = {}  # {(从站, 地址, 数量): ReadRequestFrame}
+        self._reader = ResponseReader()
+
+    def connect(self):
+        """建立TCP连接"""
+        self.close()
+        try:
+            self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            return True
+        except OSError as e:
+            logger.error(f"连接 {self.host}:{self.port} 失败: {str(e)}")
+            self._sock = None
+            return False
+
+    def close(self):
+        """关闭连接"""
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+    def is_socket_open(self):
+        return self._sock is not None
+
+    def read_holding_registers(self, address, count=1, slave=1):
+        """读取一个寄存器块（串行）"""
+        return self.read_holding_registers_many([(address, count)], slave=slave)[0][0]
+
+    def read_holding_registers_many(self, requests, slave=1):
+        """
+        读取多个寄存器块，流水线模式下最多同时发送window个请求
+
+        Args:
+            requests (list): [(起始地址, 数量), ...]
+            slave (int): 从站地址
+
+        Returns:
+            list: 与requests一一对应的 [(响应, 耗时秒数), ...]
+        """
+        if self._sock is None and not self.connect():
+            return [(ErrorResponse('未连接'), 0.0)] * len(requests)
+
+        window = self.window if self.pipelining else 1
+        results = self._transact(requests, slave, window)
+
+        if window > 1 and len(requests) > 1:
+            answered = sum(1 for rr, _ in results if not isinstance(rr, ErrorResponse) or rr.exception_code)
+            if 0 < answered < len(results):
+                # 只有部分请求得到响应：设备可能不支持流水线，重连后以串行方式重试
+                logger.warning(f"设备 {self.host}:{self.port} 未响应全部流水线请求，切换为串行模式")
+                self.pipelining = False
+                retry = [i for i, (rr, _) in enumerate(results)
+                         if isinstance(rr, ErrorResponse) and rr.exception_code is None]
+                if self.connect():
+                    for index, result in zip(retry, self._transact([requests[i] for i in retry], slave, 1)):
+                        results[index] = result
+        return results
+
+    def _next_tid(self):
+        self._tid = self._tid % 0xFFFF + 1
+        return self._tid
+
+    def _transact(self, requests, slave, window):
+        """
+        在当前连接上发送请求并按事务ID收集响应，同时未完成的请求不超过window个
+
+        收到畸形响应帧（ModbusIOException）、超时或连接错误时不再尝试与后续帧重新同步：
+        已发送未响应和尚未发送的请求都以ErrorResponse返回，连接被关闭，
+        下一次读取时重新连接（read_holding_registers_many在部分响应时会立即重连并串行重试）
+
+        Returns:
+            list: 与requests一一对应的 [(响应, 耗时秒数), ...]
+        """
+        results = [(ErrorResponse('未发送'), 0.0)] * len(requests)
+        pending = {}  # {事务ID: (请求序号, 发送时间)}
+        expected = {}  # {事务ID: (单元ID, 寄存器数量)}，用于校验响应
+        next_index = 0
+        try:
+            while next_index < len(requests) or pending:
+                # 填满发送窗口
+                while next_index < len(requests) and len(pending) < window:
+                    tid = self._next_tid()
+                    self._sock.sendall(self._frame(slave, *requests[next_index]).with_tid(tid))
+                    pending[tid] = (next_index, time.monotonic())
+                    expected[tid] = (slave, requests[next_index][1])
+                    next_index += 1
+
+                tid, response = self._reader.read(self._sock, expected)
+                if tid not in pending:
+                    # 迟到的旧响应，丢弃
+                    continue
+                index, sent = pending.pop(tid)
+                del expected[tid]
+                results[index] = (response, time.monotonic() - sent)
+        except (OSError, ModbusIOException) as e:
+            message = '响应超时' if isinstance(e, socket.timeout) else f'通信错误: {str(e)}'
+            for index, _ in pending.values():
+                results[index] = (ErrorResponse(message), self.timeout)
+            for index in range(next_index, len(requests)):
+                results[index] = (ErrorResponse(message), 0.0)
+            self.close()
+        return results
+
+    def _frame(self, slave, address, count):
+        key = (slave, address, count)
+        frame = self._frames.get(key)
+        if frame is None:
+            frame = self._frames[key] = ReadRequestFrame(slave, address, count)
+        return frame
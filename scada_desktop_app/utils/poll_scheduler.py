@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+分组轮询调度模块
+每个寄存器分组按自己的周期轮询（如电流200ms、温湿度10s），
+调度器交错安排各分组的读取时间，并维护各分组的最新解码值。
+采集线程调度读取的同时，配置接口可能在请求线程中修改周期，内部状态由一把锁保护
+"""
+
+import threading
+import time
+
+from utils.read_planner import plan_reads
+from utils.register_map import REGISTER_MAP, BOARD_RECORD, BMS_RECORD
+
+
+class GroupScheduler:
+    """寄存器分组轮询调度器（多线程安全）"""
+
+    def __init__(self, register_map=REGISTER_MAP, periods=None, gap_tolerance=0):
+        """
+        Args:
+            register_map: 编译后的寄存器地址表
+            periods (dict): 覆盖默认周期 {分组名: 周期秒数}
+            gap_tolerance (int): 合并读取时允许跨越的空洞寄存器数量
+        """
+        self.register_map = register_map
+        self.gap_tolerance = gap_tolerance
+        self.periods = {g.name: g.period for g in register_map.groups}
+        self._values = {g.name: None for g in register_map.groups}
+        self._plans = {}
+        self._force = False
+        self._next_due = {}
+        self._lock = threading.RLock()
+        if periods:
+            for name, period in periods.items():
+                self.set_period(name, period)
+        self.reset()
+
+    def reset(self):
+        """清除缓存值，所有分组立即到期；各分组首次读取后按周期错开"""
+        now = time.monotonic()
+        with self._lock:
+            self._values = dict.fromkeys(self._values)
+            self._next_due = {g.name: now for g in self.register_map.groups}
+
+    def set_period(self, name, period):
+        """修改分组周期，缩短周期时下一次读取时间相应提前"""
+        if name not in self.periods:
+            raise KeyError(f'未知的寄存器分组: {name}')
+        period = max(0.01, float(period))
+        with self._lock:
+            self.periods[name] = period
+            next_due = self._next_due.get(name)
+            if next_due is not None:
+                self._next_due[name] = min(next_due, time.monotonic() + period)
+
+    def set_gap_tolerance(self, gap_tolerance):
+        with self._lock:
+            self.gap_tolerance = gap_tolerance
+            self._plans.clear()
+
+    def request_all(self):
+        """下一次调度时读取全部分组（手动刷新）"""
+        with self._lock:
+            self._force = True
+
+    def due_groups(self, now=None):
+        """
+        取出已到期的分组，并安排它们的下一次读取时间
+
+        Returns:
+            list: 到期的CompiledGroup列表
+        """
+        now = time.monotonic() if now is None else now
+        due = []
+        with self._lock:
+            force, self._force = self._force, False
+            for group in self.register_map.groups:
+                next_due = self._next_due[group.name]
+                if force or next_due <= now:
+                    period = self.periods[group.name]
+                    # 按固定节拍推进；落后超过一个周期时从当前时间重新对齐
+                    next_due += period
+                    if next_due <= now:
+                        next_due = now + period
+                    self._next_due[group.name] = next_due
+                    due.append(group)
+        return due
+
+    def time_until_due(self, now=None):
+        """距离下一个分组到期的秒数"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self._force:
+                return 0.0
+            return max(0.0, min(self._next_due.values()) - now)
+
+    def plan(self, groups):
+        """为一组分组生成合并读取规划（结果会被缓存）"""
+        key = tuple(g.name for g in groups)
+        with self._lock:
+            blocks = self._plans.get(key)
+            if blocks is None:
+                blocks = plan_reads([(g.address, g.count) for g in groups], gap_tolerance=self.gap_tolerance)
+                self._plans[key] = blocks
+        return blocks
+
+    def update(self, image, groups):
+        """用读取到的寄存器映像更新分组的最新值，读取失败的分组值被清除"""
+        values = {group.name: group.decode_from(image) for group in groups}
+        with self._lock:
+            self._values.update(values)
+
+    def records(self):
+        """
+        由各分组最新值组装数据记录
+
+        Returns:
+            tuple: (board_data, bms_data)，必需分组缺失时对应记录为None
+        """
+        with self._lock:
+            return self._record(BOARD_RECORD), self._record(BMS_RECORD)
+
+    def _record(self, record):
+        data = {}
+        for group in self.register_map.groups_for(record):
+            values = self._values[group.name]
+            if values is None:
+                if group.group.required:
+                    return None
+                values = group.empty
+            data.update(values)
+        return data
+
+    def poll(self, read_image):
+        """
+        同步读取所有到期分组
+
+        Args:
+            read_image (callable): 读取函数，参数为寄存器区间列表，返回寄存器映像或None
+
+        Returns:
+            tuple or None: (board_data, bms_data)；没有到期分组时返回None
+        """
+        groups = self.due_groups()
+        if not groups:
+            return None
+        # 传入分组区间而不是合并后的块，读取函数合并读取，合并块异常时按分组重试
+        image = read_image([(g.address, g.count) for g in groups])
+        if image is None:
+            with self._lock:
+                for group in groups:
+                    self._values[group.name] = None
+        else:
+            self.update(image, groups)
+        return self.records()
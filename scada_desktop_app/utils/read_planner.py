@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Modbus读取规划模块
+将需要读取的寄存器区间合并为尽量少的FC03请求，并提供按绝对地址取值的寄存器映像
+"""
+
+import struct
+import time
+
+# 单次FC03请求允许读取的最大寄存器数量（Modbus协议规定）
+MAX_REGISTERS_PER_READ = 125
+
+
+class RegisterBlock:
+    """一次FC03读取覆盖的连续寄存器块"""
+
+    __slots__ = ('address', 'count', 'parts')
+
+    def __init__(self, address, count, parts=None):
+        """
+        Args:
+            address (int): 起始地址
+            count (int): 寄存器数量
+            parts (tuple): 合并进本块的原始区间 ((起始地址, 数量), ...)，默认为块本身
+        """
+        self.address = address
+        self.count = count
+        self.parts = tuple(parts) if parts else ((address, count),)
+
+    @property
+    def end(self):
+        """块结束地址（不包含）"""
+        return self.address + self.count
+
+    def __eq__(self, other):
+        return (isinstance(other, RegisterBlock)
+                and self.address == other.address and self.count == other.count)
+
+    def __hash__(self):
+        return hash((self.address, self.count))
+
+    def __repr__(self):
+        return f"RegisterBlock(0x{self.address:04X}, {self.count})"
+
+
+def plan_reads(ranges, gap_tolerance=0, max_count=MAX_REGISTERS_PER_READ):
+    """
+    将寄存器区间合并为最少的读取块
+
+    相邻或间隔不超过gap_tolerance个寄存器的区间会被合并，
+    合并后的块长度不会超过max_count；超长区间会被拆分。
+    合并块在parts中保留原始区间，设备对合并块返回异常响应时read_blocks按原始区间重试。
+
+    Args:
+        ranges (iterable): 寄存器区间列表 [(起始地址, 数量), ...]
+        gap_tolerance (int): 允许一并读取的空洞寄存器数量，默认0（仅合并相邻区间）
+        max_count (int): 单个块的最大寄存器数量，默认125
+
+    Returns:
+        list: RegisterBlock列表，按地址升序排列
+    """
+    if max_count <= 0:
+        raise ValueError('max_count必须大于0')
+
+    blocks = []
+    start = end = None
+    parts = []
+    for address, count in sorted(ranges):
+        if count <= 0:
+            continue
+        range_end = address + count
+        if start is not None and address - end <= gap_tolerance and max(end, range_end) - start <= max_count:
+            end = max(end, range_end)
+            parts.append((address, count))
+            continue
+        if start is not None:
+            blocks.extend(_split_block(start, end, max_count, parts))
+        start, end = address, range_end
+        parts = [(address, count)]
+
+    if start is not None:
+        blocks.extend(_split_block(start, end, max_count, parts))
+    return blocks
+
+
+def _split_block(start, end, max_count, parts):
+    """将超过最大长度的区间拆分为多个块（只有单个超长区间会被拆分）"""
+    if end - start <= max_count:
+        return [RegisterBlock(start, end - start, parts)]
+    blocks = []
+    while start < end:
+        count = min(max_count, end - start)
+        blocks.append(RegisterBlock(start, count))
+        start += count
+    return blocks
+
+
+class RegisterImage:
+    """合并读取得到的寄存器映像，可按绝对地址取值"""
+
+    def __init__(self):
+        self._blocks = []  # [(起始地址, 寄存器数量, 寄存器列表或大端字节串), ...]
+
+    def add(self, address, registers):
+        """添加一个已读取的寄存器块（寄存器值列表）"""
+        registers = list(registers)
+        self._blocks.append((address, len(registers), registers))
+
+    def add_raw(self, address, data):
+        """添加一个已读取的寄存器块（响应报文中的大端字节串）"""
+        self._blocks.append((address, len(data) // 2, data))
+
+    def covers(self, address, count=1):
+        """判断指定区间是否已全部读取"""
+        return self._find(address, count) is not None
+
+    def _find(self, address, count):
+        for block_address, block_count, data in self._blocks:
+            offset = address - block_address
+            if offset >= 0 and offset + count <= block_count:
+                return offset, data
+        return None
+
+    def get(self, address, count=1):
+        """
+        获取指定区间的寄存器值
+
+        Returns:
+            list or None: 寄存器值列表，区间未被完整读取时返回None
+        """
+        found = self._find(address, count)
+        if found is None:
+            return None
+        offset, data = found
+        if isinstance(data, list):
+            return data[offset:offset + count]
+        return list(struct.unpack_from(f'>{count}H', data, offset * 2))
+
+    def buffer(self, address, count=1):
+        """
+        获取指定区间的大端字节缓冲区，供struct.unpack_from直接解码
+
+        Returns:
+            tuple or None: (缓冲区, 字节偏移)，区间未被完整读取时返回None
+        """
+        found = self._find(address, count)
+        if found is None:
+            return None
+        offset, data = found
+        if isinstance(data, list):
+            return struct.pack(f'>{count}H', *data[offset:offset + count]), 0
+        return data, offset * 2
+
+
+def read_blocks(client, blocks, slave=1, on_transaction=None):
+    """
+    按规划读取寄存器块
+
+    客户端提供read_holding_registers_many方法时（如流水线传输），所有块一次提交；
+    否则逐块串行读取。设备对合并块返回异常响应时（如其中某个可选分组的寄存器不存在），
+    按合并前的原始区间重新读取，一个区间的异常不会导致同一块中其它区间的数据丢失。
+
+    Args:
+        client: pymodbus同步客户端或兼容的传输对象
+        blocks (list): RegisterBlock列表
+        slave (int): 从站地址，默认1
+        on_transaction (callable): 每次事务完成后的回调 (是否成功, 耗时秒数, 错误)
+
+    Returns:
+        tuple: (RegisterImage, 失败列表[(RegisterBlock, 响应或异常), ...])
+    """
+    image = RegisterImage()
+    failures = []
+
+    def handle(results, retry=None):
+        for block, rr, latency in results:
+            ok = not isinstance(rr, Exception) and not rr.isError()
+            if on_transaction:
+                on_transaction(ok, latency, None if ok else rr)
+            if ok:
+                _add_response(image, block, rr)
+            elif retry is not None and len(block.parts) > 1 and getattr(rr, 'exception_code', None):
+                retry.extend(RegisterBlock(address, count) for address, count in block.parts)
+            else:
+                failures.append((block, rr))
+
+    retry = []
+    handle(_transact_blocks(client, blocks, slave), retry)
+    if retry:
+        handle(_transact_blocks(client, retry, slave))
+    return image, failures
+
+
+def _add_response(image, block, rr):
+    """把成功的响应加入寄存器映像"""
+    raw = getattr(rr, 'raw', None)
+    if raw is not None:
+        image.add_raw(block.address, raw[:block.count * 2])
+    else:
+        image.add(block.address, rr.registers[:block.count])
+
+
+def _transact_blocks(client, blocks, slave):
+    """
+    读取一组寄存器块，通信异常不会抛出
+
+    Returns:
+        list: [(RegisterBlock, 响应或异常, 耗时秒数), ...]
+    """
+    read_many = getattr(client, 'read_holding_registers_many', None)
+    if read_many is not None and len(blocks) > 1:
+        results = read_many([(block.address, block.count) for block in blocks], slave=slave)
+        return [(block, rr, latency) for block, (rr, latency) in zip(blocks, results)]
+
+    results = []
+    for block in blocks:
+        started = time.monotonic()
+        try:
+            rr = client.read_holding_registers(block.address, block.count, slave=slave)
+        except Exception as e:
+            rr = e
+        results.append((block, rr, time.monotonic() - started))
+    return results
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+批量数据记录模块
+采集到的样本先进入内存队列，由写入线程每积累N行或每隔T毫秒
+在一个事务中用executemany批量写入，避免每行一次提交和fsync；
+样本可按列写入data_records，或打包为原始寄存器写入raw_records，
+同一事务中增量更新1秒/1分钟/1小时汇总表。
+分组调度下采集快照的频率由最快的分组决定（如200ms），记录器按记录间隔（默认1秒）抽取快照，
+记录频率不随分组周期变化
+"""
+
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from itertools import groupby
+
+from utils.recordings import STORAGE_COLUMNS, STORAGE_RAW, STORAGE_FORMATS
+from utils.register_map import REGISTER_MAP, REGISTER_MAP_VERSION
+from utils.rollups import RollupAccumulator
+
+logger = logging.getLogger(__name__)
+
+RECORD_COLUMNS = ('recording_id', 'timestamp', 'ts_ms') + REGISTER_MAP.columns
+
+INSERT_RECORD_SQL = (f"INSERT INTO data_records ({', '.join(RECORD_COLUMNS)}) "
+                     f"VALUES ({', '.join('?' * len(RECORD_COLUMNS))})")
+
+# 同一毫秒内的重复样本只保留第一个
+INSERT_RAW_SQL = ('INSERT OR IGNORE INTO raw_records (recording_id, ts_ms, map_version, registers) '
+                  'VALUES (?, ?, ?, ?)')
+
+_INSERT_SQL = {STORAGE_COLUMNS: INSERT_RECORD_SQL, STORAGE_RAW: INSERT_RAW_SQL}
+
+
+class BatchRecorder:
+    """批量写入data_records的后台记录器"""
+
+    def __init__(self, store, batch_size=200, flush_interval=0.5, timestamp_sep='T', storage=STORAGE_COLUMNS,
+                 record_interval=1.0):
+        """
+        Args:
+            store (SQLiteStore): 数据库连接管理器
+            batch_size (int): 积累到该行数立即写入，默认200
+            flush_interval (float): 最长写入间隔（秒），默认0.5
+            timestamp_sep (str): timestamp文本列中日期与时间的分隔符，默认'T'
+            storage (str): 默认存储格式 columns(每个数据项一列) 或 raw(打包的原始寄存器)
+            record_interval (float): 采集快照的记录间隔（秒），默认1.0；0表示记录每个快照
+        """
+        if storage not in STORAGE_FORMATS:
+            raise ValueError(f'未知的存储格式: {storage}')
+        self.store = store
+        self.timestamp_sep = timestamp_sep
+        self.storage = storage
+        self.recording_storage = storage
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.record_interval = max(0.0, float(record_interval))
+        self.recording_id = None
+        self.last_sequence = None  # 最近一次入队的快照序号，避免重复记录同一快照
+        self._next_record = None  # 下一次记录快照的时间 (time.time())
+        self.rows_written = 0
+        self.batches_written = 0
+        self.last_error = None
+        self._queue = queue.Queue()
+        self._rollups = RollupAccumulator()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def is_recording(self):
+        return self.recording_id is not None
+
+    def start(self, recording_id, storage=None):
+        """
+        开始把样本记录到指定的记录会话
+
+        Args:
+            recording_id (str): 记录会话ID
+            storage (str): 本次记录的存储格式，None表示使用默认格式
+        """
+        storage = storage or self.storage
+        if storage not in STORAGE_FORMATS:
+            raise ValueError(f'未知的存储格式: {storage}')
+        with self._lock:
+            self.recording_id = recording_id
+            self.recording_storage = storage
+            self.last_sequence = None
+            self._next_record = None
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='batch-recorder', daemon=True)
+                self._thread.start()
+        logger.info(f"批量记录已开始: ID {recording_id}")
+
+    def stop(self, timeout=5.0):
+        """停止记录，等待已入队的样本全部写入后返回"""
+        with self._lock:
+            recording_id, self.recording_id = self.recording_id, None
+        if recording_id is not None:
+            self.flush(timeout)
+            logger.info(f"批量记录已停止: ID {recording_id}，累计写入 {self.rows_written} 行")
+        return recording_id
+
+    def flush(self, timeout=5.0):
+        """等待队列中已有的样本写入数据库"""
+        if self._thread is None or not self._thread.is_alive():
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def pending(self):
+        """尚未写入的样本数量（近似值）"""
+        return self._queue.qsize()
+
+    def record_snapshot(self, snapshot):
+        """
+        采集循环监听器：按记录间隔记录数据快照
+
+        Returns:
+            bool: 是否入队
+        """
+        if snapshot.board_data is None or snapshot.bms_data is None:
+            return False
+        with self._lock:
+            if self.recording_id is None or snapshot.sequence == self.last_sequence:
+                return False
+            if not self._record_due(snapshot.timestamp):
+                return False
+            self.last_sequence = snapshot.sequence
+            recording_id, storage = self.recording_id, self.recording_storage
+        self._queue.put(self._row(recording_id, storage, snapshot.timestamp, snapshot.board_data, snapshot.bms_data))
+        return True
+
+    def _record_due(self, timestamp):
+        """按固定节拍判断快照是否需要记录（持有锁时调用）"""
+        interval = self.record_interval
+        if interval <= 0:
+            return True
+        # 允许快照时间比节拍提前十分之一个间隔，避免采集抖动把记录推迟一个快照周期
+        if self._next_record is not None and timestamp < self._next_record - interval * 0.1:
+            return False
+        next_record = timestamp + interval if self._next_record is None else self._next_record + interval
+        # 落后超过一个间隔（如采集中断）时从当前快照重新对齐
+        self._next_record = next_record if next_record > timestamp else timestamp + interval
+        return True
+
+    def record(self, board_data, bms_data, timestamp=None):
+        """
+        记录一组数据
+
+        Args:
+            timestamp (float): 采集时间 (time.time())，默认为当前时间
+
+        Returns:
+            bool: 是否入队
+        """
+        with self._lock:
+            recording_id, storage = self.recording_id, self.recording_storage
+        if recording_id is None:
+            return False
+        timestamp = time.time() if timestamp is None else timestamp
+        self._queue.put(self._row(recording_id, storage, timestamp, board_data, bms_data))
+        return True
+
+    def _row(self, recording_id, storage, timestamp, board_data, bms_data):
+        """生成队列项 (存储格式, 插入参数, 记录ID, 毫秒时间戳, 汇总用的数据值)"""
+        ts_ms = int(round(timestamp * 1000))
+        values = REGISTER_MAP.column_values(board_data, bms_data)
+        if storage == STORAGE_RAW:
+            row = (recording_id, ts_ms, REGISTER_MAP_VERSION, REGISTER_MAP.pack_sample(board_data, bms_data))
+        else:
+            # timestamp文本列供界面显示，ts_ms用于排序和时间范围查询
+            row = [recording_id, datetime.fromtimestamp(timestamp).isoformat(self.timestamp_sep), ts_ms] + values
+        return storage, row, recording_id, ts_ms, values
+
+    def to_dict(self):
+        return {
+            'recording_id': self.recording_id,
+            'storage': self.recording_storage,
+            'record_interval': self.record_interval,
+            'rows_written': self.rows_written,
+            'batches_written': self.batches_written,
+            'pending': self.pending(),
+            'last_error': self.last_error,
+        }
+
+    def _run(self):
+        while True:
+            rows, waiters = self._collect()
+            if rows:
+                self._write(rows)
+            for done in waiters:
+                done.set()
+
+    def _collect(self):
+        """阻塞等待第一行，然后收集到batch_size行或flush_interval超时为止"""
+        rows = []
+        waiters = []
+        item = self._queue.get()
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            if isinstance(item, threading.Event):
+                # flush请求：立即写入已收集的行
+                waiters.append(item)
+                return rows, waiters
+            rows.append(item)
+            if len(rows) >= self.batch_size:
+                return rows, waiters
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return rows, waiters
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                return rows, waiters
+
+    def _write(self, rows):
+        try:
+            written = 0
+            with self.store.write() as conn:
+                for storage, batch in groupby(rows, key=lambda item: item[0]):
+                    batch = list(batch)
+                    if storage == STORAGE_RAW:
+                        # 被INSERT OR IGNORE忽略的重复样本不计入汇总
+                        batch = [item for item in batch if conn.execute(INSERT_RAW_SQL, item[1]).rowcount]
+                    else:
+                        conn.executemany(_INSERT_SQL[storage], [item[1] for item in batch])
+                    for _, _, recording_id, ts_ms, values in batch:
+                        self._rollups.add(recording_id, ts_ms, values)
+                    written += len(batch)
+                self._rollups.flush(conn)
+            self.rows_written += written
+            self.batches_written += 1
+            self.last_error = None
+        except sqlite3.Error as e:
+            self.last_error = str(e)
+            logger.error(f"批量写入 {len(rows)} 行数据失败: {str(e)}")
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+记录数据读取模块
+记录会话的样本有两种存储格式：data_records 每个数据项一列（columns），
+或 raw_records 每行保存打包的原始寄存器（raw，分组存在位图+86字节）；会话结束后可归档为Parquet文件（parquet）。
+读取时统一返回按列组织的数据，raw格式只在读取时按需批量解码请求的列
+"""
+
+import logging
+import os
+from datetime import datetime
+from itertools import groupby
+
+from utils.register_map import REGISTER_MAP, REGISTER_MAPS
+
+logger = logging.getLogger(__name__)
+
+# 样本存储格式
+STORAGE_COLUMNS = 'columns'
+STORAGE_RAW = 'raw'
+STORAGE_FORMATS = (STORAGE_COLUMNS, STORAGE_RAW)
+# 已归档会话的存储格式（只能由归档产生，不能用于新记录）
+STORAGE_PARQUET = 'parquet'
+
+# 各存储格式的样本表
+DATA_TABLES = {STORAGE_COLUMNS: 'data_records', STORAGE_RAW: 'raw_records'}
+
+
+def recording_storage(conn, recording_id):
+    """获取记录会话的存储格式，会话不存在时按columns处理"""
+    row = conn.execute('SELECT storage FROM recording_sessions WHERE id = ?', (recording_id,)).fetchone()
+    return row[0] if row else STORAGE_COLUMNS
+
+
+def database_dir(conn):
+    """数据库文件所在目录（归档路径相对于该目录保存，数据库和归档可以一起移动）"""
+    for _, name, path in conn.execute('PRAGMA database_list'):
+        if name == 'main' and path:
+            return os.path.dirname(path)
+    return os.getcwd()
+
+
+def archive_location(conn, recording_id):
+    """已归档会话的归档文件绝对路径，未归档时返回None"""
+    row = conn.execute('SELECT archive_path FROM recording_sessions WHERE id = ?', (recording_id,)).fetchone()
+    if row is None or not row[0]:
+        return None
+    return os.path.join(database_dir(conn), row[0])
+
+
+def _timestamps(ts_ms, timestamp_sep):
+    return [datetime.fromtimestamp(ts / 1000).isoformat(timestamp_sep) for ts in ts_ms]
+
+
+def _check_columns(columns):
+    columns = list(REGISTER_MAP.columns if columns is None else columns)
+    unknown = [c for c in columns if c not in REGISTER_MAP.columns]
+    if unknown:
+        raise ValueError(f"未知的数据列: {', '.join(unknown)}")
+    return columns
+
+
+def range_clause(recording_id, start_ms=None, end_ms=None, after_ms=None):
+    """生成按记录ID和时间范围过滤的WHERE条件及参数"""
+    clause = 'recording_id = ?'
+    params = [recording_id]
+    if start_ms is not None:
+        clause += ' AND ts_ms >= ?'
+        params.append(int(start_ms))
+    if end_ms is not None:
+        clause += ' AND ts_ms <= ?'
+        params.append(int(end_ms))
+    if after_ms is not None:
+        clause += ' AND ts_ms > ?'
+        params.append(int(after_ms))
+    return clause, params
+
+
+def _query(conn, recording_id, columns, start_ms, end_ms, after_ms=None, limit=None):
+    """执行样本查询，返回 (存储格式, 游标)"""
+    clause, params = range_clause(recording_id, start_ms, end_ms, after_ms)
+    clause += ' ORDER BY ts_ms'
+    if limit is not None:
+        clause += ' LIMIT ?'
+        params.append(int(limit))
+    storage = recording_storage(conn, recording_id)
+    if storage == STORAGE_RAW:
+        sql = f'SELECT ts_ms, map_version, registers FROM raw_records WHERE {clause}'
+    else:
+        sql = f"SELECT ts_ms, timestamp, {', '.join(columns)} FROM data_records WHERE {clause}"
+    return storage, conn.execute(sql, params)
+
+
+def _decode_raw(rows, recording_id, columns, timestamp_sep):
+    """批量解码raw格式的样本行"""
+    result = {'ts_ms': [], 'timestamp': []}
+    result.update((column, []) for column in columns)
+    # 相同地址表版本的连续样本一次解码
+    for version, run in groupby(rows, key=lambda row: row[1]):
+        run = list(run)
+        register_map = REGISTER_MAPS.get(version)
+        if register_map is None:
+            logger.warning(f"记录 {recording_id} 中有 {len(run)} 个样本使用未知的地址表版本 {version}，已跳过")
+            continue
+        decoded = register_map.unpack_samples(b''.join(row[2] for row in run), columns)
+        for column in columns:
+            result[column].extend(decoded[column])
+        result['ts_ms'].extend(row[0] for row in run)
+    result['timestamp'] = _timestamps(result['ts_ms'], timestamp_sep)
+    return result
+
+
+def _from_archive(data, timestamp_sep):
+    result = {'ts_ms': data.pop('ts_ms')}
+    result['timestamp'] = _timestamps(result['ts_ms'], timestamp_sep)
+    result.update(data)
+    return result
+
+
+def _columnar(rows, names):
+    if not rows:
+        return {name: [] for name in names}
+    return {name: list(values) for name, values in zip(names, zip(*rows))}
+
+
+def read_recording(conn, recording_id, columns=None, start_ms=None, end_ms=None, timestamp_sep='T',
+                   after_ms=None, limit=None):
+    """
+    读取记录会话的样本，按时间排序
+
+    Args:
+        conn (sqlite3.Connection): 数据库连接
+        recording_id (str): 记录会话ID
+        columns (list): 需要的数据列，None表示全部列
+        start_ms (int): 起始时间（epoch毫秒，包含）
+        end_ms (int): 结束时间（epoch毫秒，包含）
+        timestamp_sep (str): raw/parquet格式生成timestamp文本时日期与时间的分隔符
+        after_ms (int): 只返回晚于该时间的样本（分页游标，不包含）
+        limit (int): 最多返回的样本数
+
+    Returns:
+        dict: {'ts_ms': [...], 'timestamp': [...], 列名: [...]}
+    """
+    columns = _check_columns(columns)
+    if recording_storage(conn, recording_id) == STORAGE_PARQUET:
+        # 按需导入，没有归档记录时不加载pyarrow
+        from utils.archive import read_archive
+        data = read_archive(archive_location(conn, recording_id), columns, start_ms, end_ms, after_ms, limit)
+        return _from_archive(data, timestamp_sep)
+    storage, cursor = _query(conn, recording_id, columns, start_ms, end_ms, after_ms, limit)
+    if storage == STORAGE_RAW:
+        return _decode_raw(cursor.fetchall(), recording_id, columns, timestamp_sep)
+    return _columnar(cursor.fetchall(), ['ts_ms', 'timestamp'] + columns)
+
+
+def iter_recording(conn, recording_id, columns=None, start_ms=None, end_ms=None, timestamp_sep='T',
+                   batch_size=5000):
+    """
+    按固定大小的批次逐批读取记录会话的样本（游标fetchmany），内存占用与记录长度无关
+
+    参数同 read_recording，batch_size 为每批的样本数
+
+    Yields:
+        dict: 一批样本，格式同 read_recording 的返回值
+    """
+    columns = _check_columns(columns)
+    if recording_storage(conn, recording_id) == STORAGE_PARQUET:
+        from utils.archive import iter_archive
+        for data in iter_archive(archive_location(conn, recording_id), columns, start_ms, end_ms, batch_size):
+            yield _from_archive(data, timestamp_sep)
+        return
+    storage, cursor = _query(conn, recording_id, columns, start_ms, end_ms)
+    names = ['ts_ms', 'timestamp'] + columns
+    try:
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            if storage == STORAGE_RAW:
+                yield _decode_raw(rows, recording_id, columns, timestamp_sep)
+            else:
+                yield _columnar(rows, names)
+    finally:
+        cursor.close()
+
+
+def to_records(data):
+    """把按列组织的数据转换为字典列表（兼容旧版接口）"""
+    names = list(data)
+    return [dict(zip(names, values)) for values in zip(*data.values())]
+
+
+def delete_recording_data(conn, recording_id):
+    """删除记录会话的全部样本（各存储格式，包括归档文件）及其汇总"""
+    path = archive_location(conn, recording_id)
+    if path and os.path.exists(path):
+        os.remove(path)
+    conn.execute('DELETE FROM data_records WHERE recording_id = ?', (recording_id,))
+    conn.execute('DELETE FROM raw_records WHERE recording_id = ?', (recording_id,))
+    conn.execute('DELETE FROM rollup_records WHERE recording_id = ?', (recording_id,))
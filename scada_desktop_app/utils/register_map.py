@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Modbus寄存器地址表
+以声明方式描述二号板和BMS保护板的寄存器布局（参见Modbus_Register_Manual.txt），
+启动时编译为基于struct的解码器，一次调用即可将原始寄存器转换为数据记录
+"""
+
+import struct
+
+try:
+    import numpy as np
+except ImportError:  # 没有numpy时按行解码
+    np = None
+
+# 寄存器数据类型
+UINT16 = 'uint16'
+INT16 = 'int16'
+SIGN_MAGNITUDE = 'sign_magnitude'  # 符号寄存器(0=正, 1=负) + 绝对值寄存器
+
+# 数据记录类型
+BOARD_RECORD = 'board'
+BMS_RECORD = 'bms'
+
+_STRUCT_CODES = {
+    UINT16: 'H',
+    INT16: 'h',
+    SIGN_MAGNITUDE: 'H',
+}
+
+
+class RegisterField:
+    """单个寄存器字段定义"""
+
+    __slots__ = ('name', 'address', 'type', 'scale', 'unit', 'column', 'sign_address')
+
+    def __init__(self, name, address, type=UINT16, scale=None, unit='', column=None, sign_address=None):
+        """
+        Args:
+            name (str): 数据字段名，与read_board_data/read_bms_data返回的键一致
+            address (int): 寄存器地址
+            type (str): 数据类型 UINT16/INT16/SIGN_MAGNITUDE
+            scale (float): 缩放除数，实际值 = 原始值 / scale；None表示不缩放
+            unit (str): 单位
+            column (str): data_records表中的列名，None表示不入库
+            sign_address (int): SIGN_MAGNITUDE类型对应的符号寄存器地址
+        """
+        if type not in _STRUCT_CODES:
+            raise ValueError(f'未知的寄存器类型: {type}')
+        if type == SIGN_MAGNITUDE and sign_address is None:
+            raise ValueError(f'{name} 缺少符号寄存器地址')
+        self.name = name
+        self.address = address
+        self.type = type
+        self.scale = scale
+        self.unit = unit
+        self.column = column
+        self.sign_address = sign_address
+
+
+class RegisterGroup:
+    """连续读取的一组寄存器"""
+
+    def __init__(self, name, record, fields, required=True, period=1.0):
+        """
+        Args:
+            name (str): 分组名称
+            record (str): 所属数据记录 BOARD_RECORD/BMS_RECORD
+            fields (list): RegisterField列表
+            required (bool): 分组读取失败时是否整条记录无效；否则相关字段置为None
+            period (float): 分组的轮询周期（秒），默认1.0
+        """
+        self.name = name
+        self.record = record
+        self.fields = list(fields)
+        self.required = required
+        self.period = period
+        self.address = min(f.address for f in self.fields)
+        self.count = max(f.address for f in self.fields) - self.address + 1
+
+    @property
+    def end(self):
+        return self.address + self.count
+
+
+class CompiledGroup:
+    """编译后的分组解码器：struct格式 + 缩放向量"""
+
+    def __init__(self, group):
+        self.group = group
+        self.name = group.name
+        self.period = group.period
+        self.address = group.address
+        self.count = group.count
+
+        by_address = {f.address: f for f in group.fields}
+        codes = []
+        names = []
+        positions = {}
+        for address in range(group.address, group.end):
+            field = by_address.get(address)
+            if field is None:
+                codes.append('2x')
+                continue
+            codes.append(_STRUCT_CODES[field.type])
+            positions[address] = len(names)
+            names.append(field.name)
+
+        self.struct = struct.Struct('>' + ''.join(codes))
+        self._raw_struct = struct.Struct(f'>{group.count}H')
+        self.names = tuple(names)
+        self.empty = dict.fromkeys(self.names)
+        # 需要缩放的字段 (值序号, 字段名, 除数)
+        self.scaled = tuple(
+            (positions[f.address], f.name, float(f.scale))
+            for f in group.fields if f.scale not in (None, 1)
+        )
+        # 符号+绝对值字段 (符号值序号, 字段名)
+        self.signed = tuple(
+            (positions[f.sign_address], f.name)
+            for f in group.fields if f.type == SIGN_MAGNITUDE
+        )
+        self._magnitudes = tuple(positions[f.address] for f in group.fields if f.type == SIGN_MAGNITUDE)
+
+    def decode_bytes(self, buffer, offset=0):
+        """从大端字节缓冲区解码分组数据"""
+        values = self.struct.unpack_from(buffer, offset)
+        data = dict(zip(self.names, values))
+        for index, name, scale in self.scaled:
+            data[name] = values[index] / scale
+        for sign_index, name in self.signed:
+            if values[sign_index]:
+                data[name] = -data[name]
+        return data
+
+    def decode(self, registers):
+        """从寄存器值列表解码分组数据"""
+        return self.decode_bytes(self._raw_struct.pack(*registers))
+
+    def decode_from(self, image):
+        """从寄存器映像解码分组数据，分组未被完整读取时返回None"""
+        found = image.buffer(self.address, self.count)
+        if found is None:
+            return None
+        return self.decode_bytes(*found)
+
+    def present_in(self, data):
+        """数据记录中是否有该分组的完整数据（未读取的可选分组各字段为None）"""
+        return data is not None and all(data.get(name) is not None for name in self.names)
+
+    def encode(self, data):
+        """把分组数据还原为大端寄存器字节串（decode_bytes的逆操作），分组数据必须完整（见present_in）"""
+        values = [data[name] for name in self.names]
+        for index, name, scale in self.scaled:
+            values[index] = values[index] * scale
+        for index in self._magnitudes:
+            values[index] = abs(values[index])
+        return self.struct.pack(*(int(round(v)) for v in values))
+
+
+class CompiledRegisterMap:
+    """编译后的寄存器地址表"""
+
+    def __init__(self, groups):
+        self.groups = tuple(CompiledGroup(g) for g in groups)
+        self.fields = tuple(f for g in groups for f in g.fields)
+        self.columns = tuple(f.column for f in self.fields if f.column)
+        self._column_fields = tuple((f.column, g.record, f.name)
+                                    for g in groups for f in g.fields if f.column)
+
+        # 打包样本：分组存在位图 + 所有分组的寄存器按分组顺序首尾相连；
+        # 位图第i位为0表示第i个分组本次没有读取到，其寄存器位置填0，解码时对应列为None
+        if len(self.groups) > 16:
+            raise ValueError('分组存在位图最多支持16个分组')
+        offset = 1  # 位图占第0个寄存器
+        self.sample_registers = offset + sum(g.count for g in groups)
+        self.sample_size = self.sample_registers * 2
+        self._sample_struct = struct.Struct(f'>{self.sample_registers}H')
+        # {列名: (样本内寄存器序号, 类型, 除数, 符号寄存器序号, 分组位)}
+        self._column_layout = {}
+        for bit, g in enumerate(groups):
+            for f in g.fields:
+                if f.column:
+                    sign_index = offset + f.sign_address - g.address if f.type == SIGN_MAGNITUDE else None
+                    self._column_layout[f.column] = (offset + f.address - g.address, f.type,
+                                                     f.scale if f.scale not in (None, 1) else None, sign_index,
+                                                     1 << bit)
+            offset += g.count
+
+    def groups_for(self, record=None):
+        """获取指定记录的分组，record为None时返回全部分组"""
+        return [g for g in self.groups if record is None or g.group.record == record]
+
+    def ranges(self, record=None):
+        """获取指定记录需要读取的寄存器区间 [(起始地址, 数量), ...]"""
+        return [(g.address, g.count) for g in self.groups_for(record)]
+
+    def decode_record(self, image, record):
+        """
+        从寄存器映像解码一条数据记录
+
+        Args:
+            image: 寄存器映像 (read_planner.RegisterImage)
+            record (str): BOARD_RECORD/BMS_RECORD
+
+        Returns:
+            tuple: (数据字典或None, 读取失败的分组名列表)
+        """
+        data = {}
+        missing = []
+        for group in self.groups_for(record):
+            values = group.decode_from(image)
+            if values is None:
+                if group.group.required:
+                    return None, [group.group.name]
+                missing.append(group.group.name)
+                data.update(group.empty)
+            else:
+                data.update(values)
+        return data, missing
+
+    def column_values(self, board_data, bms_data, default=0):
+        """按data_records列顺序取出记录值"""
+        sources = {BOARD_RECORD: board_data or {}, BMS_RECORD: bms_data or {}}
+        return [sources[record].get(name, default) for _, record, name in self._column_fields]
+
+    def pack_sample(self, board_data, bms_data):
+        """
+        把一条数据记录打包为原始寄存器字节串（sample_size字节）
+        没有读取到的分组在位图中标记为缺失，不会被当作0值保存
+
+        Returns:
+            bytes: 大端寄存器数据
+        """
+        sources = {BOARD_RECORD: board_data, BMS_RECORD: bms_data}
+        mask = 0
+        parts = []
+        for bit, g in enumerate(self.groups):
+            data = sources[g.group.record]
+            if g.present_in(data):
+                mask |= 1 << bit
+                parts.append(g.encode(data))
+            else:
+                parts.append(bytes(g.count * 2))
+        return struct.pack('>H', mask) + b''.join(parts)
+
+    def unpack_samples(self, data, columns=None):
+        """
+        批量解码首尾相连的打包样本，只解码请求的列
+
+        Args:
+            data (bytes): 若干个pack_sample结果拼接而成的字节串
+            columns (list): 需要的列名，None表示全部列
+
+        Returns:
+            dict: {列名: 值列表}，样本中缺失的分组对应的值为None
+        """
+        columns = self.columns if columns is None else columns
+        count = len(data) // self.sample_size
+        layout = [(column,) + self._column_layout[column] for column in columns]
+        result = {}
+        if np is not None:
+            registers = np.frombuffer(data, dtype='>u2', count=count * self.sample_registers)
+            registers = registers.reshape(count, self.sample_registers)
+            masks = registers[:, 0]
+            for column, index, type, scale, sign_index, bit in layout:
+                values = registers[:, index].astype(np.int16 if type == INT16 else np.int32)
+                if scale is not None:
+                    values = values / scale
+                if sign_index is not None:
+                    values = np.where(registers[:, sign_index] != 0, -values, values)
+                values = values.tolist()
+                present = (masks & bit) != 0
+                if not present.all():
+                    values = [v if p else None for v, p in zip(values, present.tolist())]
+                result[column] = values
+            return result
+
+        rows = list(self._sample_struct.iter_unpack(data[:count * self.sample_size]))
+        for column, index, type, scale, sign_index, bit in layout:
+            values = [row[index] for row in rows]
+            if type == INT16:
+                values = [v - 0x10000 if v & 0x8000 else v for v in values]
+            if scale is not None:
+                values = [v / scale for v in values]
+            if sign_index is not None:
+                values = [-v if row[sign_index] else v for v, row in zip(values, rows)]
+            values = [v if row[0] & bit else None for v, row in zip(values, rows)]
+            result[column] = values
+        return result
+
+
+# 二号板寄存器定义 (地址 0x0000 - 0x001B)
+BOARD_GROUPS = [
+    RegisterGroup('board_power', BOARD_RECORD, [
+        RegisterField('IN1_current', 0x0000, unit='mA', column='in1_current'),
+        RegisterField('IN1_voltage', 0x0001, scale=100, unit='V', column='in1_voltage'),
+        RegisterField('IN2_current', 0x0002, unit='mA', column='in2_current'),
+        RegisterField('IN2_voltage', 0x0003, scale=100, unit='V', column='in2_voltage'),
+        RegisterField('IN3_current', 0x0004, unit='mA', column='in3_current'),
+        RegisterField('IN3_voltage', 0x0005, scale=100, unit='V', column='in3_voltage'),
+        RegisterField('IN4_current', 0x0006, unit='mA', column='in4_current'),
+        RegisterField('IN4_voltage', 0x0007, scale=100, unit='V', column='in4_voltage'),
+        RegisterField('IN5_current', 0x0008, unit='mA', column='in5_current'),
+        RegisterField('IN5_voltage', 0x0009, scale=100, unit='V', column='in5_voltage'),
+        RegisterField('IN6_current', 0x000A, unit='mA', column='in6_current'),
+        RegisterField('IN6_voltage', 0x000B, scale=100, unit='V', column='in6_voltage'),
+        RegisterField('IN7_current', 0x000C, unit='mA', column='in7_current'),
+        RegisterField('IN7_voltage', 0x000D, scale=100, unit='V', column='in7_voltage'),
+        RegisterField('IN8_current', 0x000E, unit='mA', column='in8_current'),
+        RegisterField('IN8_voltage', 0x000F, scale=100, unit='V', column='in8_voltage'),
+        RegisterField('IN9_current', 0x0010, unit='mA', column='in9_current'),
+        RegisterField('IN9_voltage', 0x0011, scale=100, unit='V', column='in9_voltage'),
+        RegisterField('IN10_current', 0x0012, unit='mA', column='in10_current'),
+        RegisterField('IN10_voltage', 0x0013, scale=100, unit='V', column='in10_voltage'),
+        RegisterField('AC_current', 0x0014, unit='A', column='ac_current'),
+        RegisterField('VBAT_voltage', 0x0015, scale=100, unit='V', column='vbat_voltage'),
+    ], period=0.2),
+    RegisterGroup('board_environment', BOARD_RECORD, [
+        RegisterField('temperature_sign', 0x0016),  # 0=正数, 1=负数
+        RegisterField('temperature_value', 0x0017, SIGN_MAGNITUDE, unit='℃',
+                      column='temperature', sign_address=0x0016),
+        RegisterField('humidity', 0x0018, unit='%RH', column='humidity'),
+    ], required=False, period=10.0),
+    RegisterGroup('board_status', BOARD_RECORD, [
+        RegisterField('door_status', 0x0019, column='door_status'),  # 1=打开, 0=关闭
+        RegisterField('water_status', 0x001A, column='water_status'),  # 1=有水, 0=没水
+        RegisterField('ac_status', 0x001B, column='ac_status'),  # 0=主电源, 1=备用电源
+    ], required=False, period=5.0),
+]
+
+# BMS保护板寄存器定义 (地址 0x0100 - 0x010E)
+BMS_GROUPS = [
+    RegisterGroup('bms_cells', BMS_RECORD, [
+        RegisterField(f'battery{i + 1}_voltage', 0x0100 + i, scale=1000, unit='V',
+                      column=f'battery{i + 1}_voltage')
+        for i in range(8)
+    ], period=1.0),
+    RegisterGroup('bms_system', BMS_RECORD, [
+        RegisterField('total_voltage', 0x0108, scale=1000, unit='V', column='total_voltage'),
+        RegisterField('current', 0x0109, INT16, scale=100, unit='A', column='current'),
+        RegisterField('temperature1', 0x010A, scale=10, unit='℃', column='temperature1'),
+        RegisterField('temperature2', 0x010B, scale=10, unit='℃', column='temperature2'),
+    ], period=0.2),
+    RegisterGroup('bms_status', BMS_RECORD, [
+        RegisterField('balance_status', 0x010C, column='balance_status'),  # 1=正在平衡, 0=没有平衡
+        RegisterField('charge_discharge_status', 0x010D, column='charge_discharge_status'),  # 1=充电, 2=放电, 3=空闲
+        RegisterField('battery_percentage', 0x010E, unit='%', column='battery_percentage'),
+    ], period=10.0),
+]
+
+# 启动时编译一次的寄存器地址表
+REGISTER_MAP = CompiledRegisterMap(BOARD_GROUPS + BMS_GROUPS)
+
+# 寄存器地址表版本，随打包样本一起保存；修改寄存器布局时递增版本号并保留旧版本的地址表
+REGISTER_MAP_VERSION = 1
+REGISTER_MAPS = {REGISTER_MAP_VERSION: REGISTER_MAP}
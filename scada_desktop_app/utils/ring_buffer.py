@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+近期样本环形缓冲区模块
+预分配固定容量的NumPy数组 [容量, 通道数] 和时间戳数组，采集循环每次采集追加一行；
+实时曲线和报警判断直接读取内存中的近期历史，不需要查询SQLite。
+每个样本同时写入位置 i 和 i + 容量（镜像环形缓冲区），
+任意不超过容量的最近窗口在内存中都是连续的，持有锁时一次切片复制即可取出，
+读取方拿到的窗口不会再被之后追加的样本修改
+"""
+
+import logging
+import threading
+import time
+from collections import namedtuple
+
+try:
+    import numpy as np
+except ImportError:  # 没有numpy时不提供环形缓冲区
+    np = None
+
+from utils.register_map import REGISTER_MAP
+
+logger = logging.getLogger(__name__)
+
+
+def ring_buffer_available():
+    """是否可以使用环形缓冲区（已安装numpy）"""
+    return np is not None
+
+
+class Window(namedtuple('Window', ['timestamps', 'values', 'channels'])):
+    """
+    环形缓冲区中的一段连续样本（复制）
+
+    Attributes:
+        timestamps (numpy.ndarray): 采集时间 (epoch秒)，形状 [n]
+        values (numpy.ndarray): 样本值，形状 [n, 通道数]，缺失值为NaN
+        channels (tuple): 通道名称
+    """
+
+    __slots__ = ()
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def channel(self, name):
+        """单个通道的值"""
+        return self.values[:, self.channels.index(name)]
+
+    def series(self, name):
+        """
+        趋势图使用的单个通道曲线数据
+
+        Returns:
+            tuple: (采集时间列表 (epoch秒), 数据值列表)，缺失值为NaN
+        """
+        return self.timestamps.tolist(), self.channel(name).tolist()
+
+    def to_columns(self, columns=None):
+        """
+        转换为按列组织的数据（复制），缺失值转换为None
+
+        Returns:
+            dict: {'ts_ms': [...], 列名: [...]}
+        """
+        columns = self.channels if columns is None else columns
+        result = {'ts_ms': (self.timestamps * 1000).round().astype(np.int64).tolist()}
+        for column in columns:
+            values = self.channel(column)
+            result[column] = [None if v != v else v for v in values.tolist()]
+        return result
+
+
+class SampleRingBuffer:
+    """固定容量的近期样本环形缓冲区（单写多读）"""
+
+    def __init__(self, capacity=3600, channels=None, dtype='float64'):
+        """
+        Args:
+            capacity (int): 保存的样本数，默认3600（1秒周期为1小时）
+            channels (list): 通道名称，默认为数据记录的全部列
+            dtype (str): 样本值的数据类型，默认float64
+        """
+        if np is None:
+            raise RuntimeError('环形缓冲区需要安装numpy')
+        self.capacity = max(1, int(capacity))
+        self.channels = tuple(REGISTER_MAP.columns if channels is None else channels)
+        # 通道在数据记录列中的位置，通道与数据记录列完全一致时为None
+        positions = [REGISTER_MAP.columns.index(name) for name in self.channels]
+        self._positions = None if positions == list(range(len(REGISTER_MAP.columns))) else positions
+        # 镜像存储：每个样本写两份，窗口永远是一段连续内存
+        self._values = np.full((2 * self.capacity, len(self.channels)), np.nan, dtype=dtype)
+        self._timestamps = np.full(2 * self.capacity, np.nan, dtype='float64')
+        self._count = 0  # 累计追加的样本数
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return min(self._count, self.capacity)
+
+    @property
+    def total(self):
+        """累计追加的样本数"""
+        return self._count
+
+    def append(self, timestamp, values):
+        """
+        追加一个样本
+
+        Args:
+            timestamp (float): 采集时间 (epoch秒)
+            values (list): 按channels顺序的样本值，None表示缺失
+        """
+        row = [np.nan if v is None else v for v in values]
+        with self._lock:
+            slot = self._count % self.capacity
+            self._values[slot] = row
+            self._values[slot + self.capacity] = row
+            self._timestamps[slot] = timestamp
+            self._timestamps[slot + self.capacity] = timestamp
+            self._count += 1
+
+    def append_data(self, board_data, bms_data, timestamp=None):
+        """按数据记录的列追加二号板和BMS数据，未读取到的数据记为缺失"""
+        if board_data is None and bms_data is None:
+            return
+        values = REGISTER_MAP.column_values(board_data, bms_data, default=None)
+        if self._positions is not None:
+            values = [values[i] for i in self._positions]
+        self.append(time.time() if timestamp is None else timestamp, values)
+
+    def append_snapshot(self, snapshot):
+        """采集循环的快照回调"""
+        self.append_data(snapshot.board_data, snapshot.bms_data, snapshot.timestamp)
+
+    def _bounds(self, n=None):
+        """最近n个样本在镜像存储中的位置 [start, end)，调用方需持有锁"""
+        count = self._count
+        size = min(count, self.capacity) if n is None else max(0, min(int(n), count, self.capacity))
+        # count之前的size个样本在镜像存储中是连续的 [end - size, end)
+        end = count % self.capacity + (self.capacity if count >= self.capacity else 0)
+        return end - size, end
+
+    def _copy(self, start, end):
+        """复制一段样本，调用方需持有锁"""
+        return Window(self._timestamps[start:end].copy(), self._values[start:end].copy(), self.channels)
+
+    def last(self, n=None):
+        """
+        最近n个样本（持有锁时复制，时间戳和样本值来自同一时刻）
+
+        Args:
+            n (int): 样本数，None或超过已有样本数时返回全部
+
+        Returns:
+            Window: 按时间顺序的样本
+        """
+        with self._lock:
+            return self._copy(*self._bounds(n))
+
+    def window(self, seconds, now=None):
+        """
+        最近seconds秒内的样本（持有锁时复制）
+
+        Args:
+            seconds (float): 时间窗口长度（秒）
+            now (float): 窗口结束时间 (epoch秒)，默认为当前时间
+
+        Returns:
+            Window
+        """
+        cutoff = (time.time() if now is None else now) - seconds
+        with self._lock:
+            start, end = self._bounds()
+            start += int(np.searchsorted(self._timestamps[start:end], cutoff, side='left'))
+            return self._copy(start, end)
+
+    def latest(self):
+        """
+        最新样本
+
+        Returns:
+            tuple or None: (时间戳, {通道: 值})
+        """
+        window = self.last(1)
+        if not len(window):
+            return None
+        return float(window.timestamps[0]), dict(zip(self.channels, window.values[0].tolist()))
+
+    def clear(self):
+        """清空缓冲区"""
+        with self._lock:
+            self._values.fill(np.nan)
+            self._timestamps.fill(np.nan)
+            self._count = 0
+
+    def to_dict(self):
+        """缓冲区状态"""
+        return {
+            'capacity': self.capacity,
+            'size': len(self),
+            'total': self._count,
+            'channels': len(self.channels),
+            'memory_bytes': int(self._values.nbytes + self._timestamps.nbytes),
+        }
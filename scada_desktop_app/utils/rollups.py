@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+数据汇总模块
+记录器写入样本时同步更新 1秒/1分钟/1小时 三级汇总表 (rollup_records)，
+每个时间桶保存样本数以及每个数据项的最小值、最大值、累加和与有效样本数
+（可选分组没有读取到时该数据项为空，平均值按有效样本数计算）；
+浏览长时间记录时按点数预算自动选择合适的分辨率，不必读取全部原始样本
+"""
+
+import logging
+
+from utils.register_map import REGISTER_MAP
+from utils.recordings import (STORAGE_COLUMNS, STORAGE_PARQUET, DATA_TABLES, recording_storage, read_recording,
+                              range_clause, archive_location)
+
+logger = logging.getLogger(__name__)
+
+# 汇总分辨率（毫秒），从细到粗
+RESOLUTIONS = (1000, 60 * 1000, 3600 * 1000)
+
+ROLLUP_CHANNELS = REGISTER_MAP.columns
+
+_STAT_COLUMNS = [f'{c}_{stat}' for c in ROLLUP_CHANNELS for stat in ('min', 'max', 'sum')]
+# 每个数据项的有效（非空）样本数，平均值 = 累加和 / 有效样本数
+COUNT_COLUMNS = [f'{c}_n' for c in ROLLUP_CHANNELS]
+
+_INSERT_COLUMNS = ', '.join(_STAT_COLUMNS + COUNT_COLUMNS)
+
+_UPSERT_SQL = (
+    f"INSERT INTO rollup_records (recording_id, resolution_ms, bucket_ms, count, {_INSERT_COLUMNS}) "
+    f"VALUES ({', '.join('?' * (4 + len(_STAT_COLUMNS) + len(COUNT_COLUMNS)))}) "
+    "ON CONFLICT (recording_id, resolution_ms, bucket_ms) DO UPDATE SET count = count + excluded.count, "
+    + ', '.join(
+        f"{c}_min = COALESCE(MIN({c}_min, excluded.{c}_min), {c}_min, excluded.{c}_min), "
+        f"{c}_max = COALESCE(MAX({c}_max, excluded.{c}_max), {c}_max, excluded.{c}_max), "
+        f"{c}_sum = COALESCE({c}_sum + excluded.{c}_sum, {c}_sum, excluded.{c}_sum), "
+        f"{c}_n = {c}_n + excluded.{c}_n"
+        for c in ROLLUP_CHANNELS
+    )
+)
+
+
+def rollup_table_sql():
+    """汇总表的建表语句（由数据库结构迁移使用）"""
+    stats = ',\n'.join([f'            {name} REAL' for name in _STAT_COLUMNS] +
+                       [f'            {name} INTEGER NOT NULL DEFAULT 0' for name in COUNT_COLUMNS])
+    return f'''
+        CREATE TABLE IF NOT EXISTS rollup_records (
+            recording_id TEXT NOT NULL,
+            resolution_ms INTEGER NOT NULL,
+            bucket_ms INTEGER NOT NULL,
+            count INTEGER NOT NULL,
+{stats},
+            PRIMARY KEY (recording_id, resolution_ms, bucket_ms)
+        ) WITHOUT ROWID
+    '''
+
+
+class RollupAccumulator:
+    """在内存中累积一批样本的汇总值，然后一次性合并到汇总表"""
+
+    def __init__(self):
+        # {(记录ID, 分辨率, 桶起始毫秒): [样本数, 最小值列表, 最大值列表, 累加和列表, 有效样本数列表]}
+        self._buckets = {}
+
+    def add(self, recording_id, ts_ms, values):
+        """
+        加入一个样本
+
+        Args:
+            recording_id (str): 记录会话ID
+            ts_ms (int): 采集时间（epoch毫秒）
+            values (list): 按ROLLUP_CHANNELS顺序的数据值，None表示缺失（不参与统计）
+        """
+        for resolution in RESOLUTIONS:
+            key = (recording_id, resolution, ts_ms - ts_ms % resolution)
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                self._buckets[key] = [1, list(values), list(values), list(values),
+                                      [0 if value is None else 1 for value in values]]
+                continue
+            bucket[0] += 1
+            mins, maxs, sums, counts = bucket[1], bucket[2], bucket[3], bucket[4]
+            for i, value in enumerate(values):
+                if value is None:
+                    continue
+                counts[i] += 1
+                if mins[i] is None:
+                    mins[i] = maxs[i] = sums[i] = value
+                    continue
+                if value < mins[i]:
+                    mins[i] = value
+                elif value > maxs[i]:
+                    maxs[i] = value
+                sums[i] += value
+
+    def flush(self, conn):
+        """把累积的汇总值合并到汇总表（在调用者的事务中执行）"""
+        rows = []
+        for (recording_id, resolution, bucket_ms), (count, mins, maxs, sums, counts) in self._buckets.items():
+            stats = [v for triple in zip(mins, maxs, sums) for v in triple]
+            rows.append([recording_id, resolution, bucket_ms, count] + stats + counts)
+        # 无论成功与否都清空：写入失败时事务回滚，样本本身也没有写入
+        self._buckets.clear()
+        if rows:
+            conn.executemany(_UPSERT_SQL, rows)
+
+
+def rebuild_rollups(conn, recording_id=None):
+    """
+    根据已保存的样本重新生成汇总（用于升级前的记录）
+
+    Args:
+        recording_id (str): 记录会话ID，None表示全部记录
+    """
+    if recording_id is None:
+        ids = [row[0] for row in conn.execute(
+            'SELECT DISTINCT recording_id FROM data_records UNION SELECT DISTINCT recording_id FROM raw_records '
+            'UNION SELECT id FROM recording_sessions WHERE storage = ?', (STORAGE_PARQUET,))]
+        for rid in ids:
+            rebuild_rollups(conn, rid)
+        return
+
+    storage = recording_storage(conn, recording_id)
+    if storage != STORAGE_COLUMNS:
+        try:
+            data = read_recording(conn, recording_id)
+        except Exception as e:
+            if storage != STORAGE_PARQUET:
+                raise
+            # 没有pyarrow或归档文件丢失时保留原有汇总，不影响数据库结构迁移
+            logger.warning(f"无法读取归档记录 {recording_id}，跳过重新生成汇总: {str(e)}")
+            return
+        conn.execute('DELETE FROM rollup_records WHERE recording_id = ?', (recording_id,))
+        accumulator = RollupAccumulator()
+        for ts_ms, values in zip(data['ts_ms'], zip(*(data[c] for c in ROLLUP_CHANNELS))):
+            accumulator.add(recording_id, ts_ms, values)
+        accumulator.flush(conn)
+        return
+
+    conn.execute('DELETE FROM rollup_records WHERE recording_id = ?', (recording_id,))
+    # columns格式直接在SQL中分组统计
+    # COUNT(列)只统计非空值，作为各数据项的有效样本数
+    stats = ', '.join([f'MIN({c}), MAX({c}), SUM({c})' for c in ROLLUP_CHANNELS] +
+                      [f'COUNT({c})' for c in ROLLUP_CHANNELS])
+    for resolution in RESOLUTIONS:
+        conn.execute(
+            f"INSERT INTO rollup_records (recording_id, resolution_ms, bucket_ms, count, {_INSERT_COLUMNS}) "
+            f"SELECT recording_id, ?, ts_ms - ts_ms % ?, COUNT(*), {stats} FROM data_records "
+            f"WHERE recording_id = ? AND ts_ms IS NOT NULL GROUP BY ts_ms - ts_ms % ?",
+            (resolution, resolution, recording_id, resolution)
+        )
+
+
+def sample_count(conn, recording_id, start_ms=None, end_ms=None):
+    """统计时间范围内的原始样本数"""
+    storage = recording_storage(conn, recording_id)
+    if storage == STORAGE_PARQUET:
+        from utils.archive import archive_stats
+        return archive_stats(archive_location(conn, recording_id), start_ms, end_ms)[0]
+    table = DATA_TABLES[storage]
+    clause, params = range_clause(recording_id, start_ms, end_ms)
+    return conn.execute(f'SELECT COUNT(*) FROM {table} WHERE {clause}', params).fetchone()[0]
+
+
+def _bucket_count(conn, recording_id, resolution, start_ms, end_ms):
+    clause, params = 'recording_id = ? AND resolution_ms = ?', [recording_id, resolution]
+    if start_ms is not None:
+        clause += ' AND bucket_ms >= ?'
+        params.append(int(start_ms) - int(start_ms) % resolution)
+    if end_ms is not None:
+        clause += ' AND bucket_ms <= ?'
+        params.append(int(end_ms))
+    return conn.execute(f'SELECT COUNT(*) FROM rollup_records WHERE {clause}', params).fetchone()[0]
+
+
+def choose_resolution(conn, recording_id, max_points, start_ms=None, end_ms=None):
+    """
+    按点数预算选择分辨率：原始样本数不超过预算时直接使用原始数据，
+    否则使用不超过预算的最细汇总级别；都超过时使用最粗的1小时汇总
+
+    Returns:
+        int or None: 分辨率（毫秒），None表示使用原始样本
+    """
+    if sample_count(conn, recording_id, start_ms, end_ms) <= max_points:
+        return None
+    for resolution in RESOLUTIONS:
+        if _bucket_count(conn, recording_id, resolution, start_ms, end_ms) <= max_points:
+            return resolution
+    return RESOLUTIONS[-1]
+
+
+def read_rollups(conn, recording_id, resolution, columns=None, start_ms=None, end_ms=None):
+    """
+    读取汇总数据
+
+    Args:
+        resolution (int): 分辨率（毫秒），必须是RESOLUTIONS之一
+        columns (list): 需要的数据项，None表示全部
+
+    Returns:
+        dict: {'ts_ms': [桶起始毫秒], 'count': [...], '列名_min'/'列名_max'/'列名_avg': [...]}，
+        桶内某数据项没有有效样本时其统计值为None
+    """
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f'不支持的汇总分辨率: {resolution}')
+    columns = list(ROLLUP_CHANNELS if columns is None else columns)
+    unknown = [c for c in columns if c not in ROLLUP_CHANNELS]
+    if unknown:
+        raise ValueError(f"未知的数据列: {', '.join(unknown)}")
+
+    clause, params = 'recording_id = ? AND resolution_ms = ?', [recording_id, resolution]
+    if start_ms is not None:
+        clause += ' AND bucket_ms >= ?'
+        params.append(int(start_ms) - int(start_ms) % resolution)
+    if end_ms is not None:
+        clause += ' AND bucket_ms <= ?'
+        params.append(int(end_ms))
+    selected = ', '.join(f'{c}_min, {c}_max, {c}_sum * 1.0 / NULLIF({c}_n, 0)' for c in columns)
+    rows = conn.execute(
+        f'SELECT bucket_ms, count, {selected} FROM rollup_records WHERE {clause} ORDER BY bucket_ms', params
+    ).fetchall()
+    names = ['ts_ms', 'count'] + [f'{c}_{stat}' for c in columns for stat in ('min', 'max', 'avg')]
+    if not rows:
+        return {name: [] for name in names}
+    return {name: list(values) for name, values in zip(names, zip(*rows))}
+
+
+def recording_summary(conn, recording_id, columns=None):
+    """
+    在SQL中计算记录会话的摘要：样本数、起止时间和各数据项的平均值
+
+    平均值优先由1小时汇总计算（每小时一行）；汇总样本数与原始样本数不一致时
+    （如汇总缺失），columns格式改为直接在SQL中聚合
+
+    Returns:
+        dict: {'count', 'start_ms', 'end_ms', 'averages': {列名: 平均值}}，无样本时count为0
+    """
+    columns = list(ROLLUP_CHANNELS if columns is None else columns)
+    storage = recording_storage(conn, recording_id)
+    if storage == STORAGE_PARQUET:
+        # 归档文件的样本数和起止时间直接取自文件元数据
+        from utils.archive import archive_stats
+        count, start_ms, end_ms = archive_stats(archive_location(conn, recording_id))
+    else:
+        # (recording_id, ts_ms) 上有索引，MIN/MAX只需查找索引两端
+        count, start_ms, end_ms = conn.execute(
+            f'SELECT COUNT(*), MIN(ts_ms), MAX(ts_ms) FROM {DATA_TABLES[storage]} WHERE recording_id = ?',
+            (recording_id,)
+        ).fetchone()
+    summary = {'count': count, 'start_ms': start_ms, 'end_ms': end_ms, 'averages': {}}
+    if not count:
+        return summary
+
+    averages = ', '.join(f'SUM({c}_sum) * 1.0 / NULLIF(SUM({c}_n), 0)' for c in columns)
+    row = conn.execute(
+        f'SELECT SUM(count), {averages} FROM rollup_records WHERE recording_id = ? AND resolution_ms = ?',
+        (recording_id, RESOLUTIONS[-1])
+    ).fetchone()
+    if row[0] != count:
+        if storage != STORAGE_COLUMNS:
+            # raw格式的汇总由记录器在同一事务中维护（归档时保留），不一致时仍使用汇总值
+            logger.warning(f"记录 {recording_id} 的汇总样本数 {row[0]} 与原始样本数 {count} 不一致")
+        else:
+            row = conn.execute(
+                f"SELECT COUNT(*), {', '.join(f'AVG({c})' for c in columns)} FROM data_records WHERE recording_id = ?",
+                (recording_id,)
+            ).fetchone()
+    summary['averages'] = dict(zip(columns, row[1:]))
+    return summary
@@ -1,14 +1,14 @@
 """
 Modbus设备扫描模块
-提供网络扫描功能，用于发现Modbus TCP设备
+提供网络扫描功能，用于发现Modbus TCP设备（并发探测由 async_scanner 完成）
 """
 
 import sys
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from pymodbus.client import ModbusTcpClient
 from PyQt5.QtCore import QObject, pyqtSignal, QThread
 
+from utils.async_scanner import AsyncScanner, DEFAULT_CONCURRENCY, DEFAULT_UNIT_IDS
+
 
 class DeviceScanner(QObject):
     """设备扫描器类"""
@@ -25,17 +25,20 @@ class DeviceScanner(QObject):
         self.is_scanning = False
         self.found_devices = []
         self.found_devices_set = set()  # 用于过滤重复设备
+        self._async_scanner = None
         
-    def scan_network(self, base_ip, port=502, timeout=1.0, ip_range=(1, 255), max_workers=50):
+    def scan_network(self, base_ip, port=502, timeout=1.0, ip_range=(1, 255), max_workers=DEFAULT_CONCURRENCY,
+                     unit_ids=DEFAULT_UNIT_IDS):
         """
-        扫描网络中的Modbus设备（使用多线程并发扫描）
+        扫描网络中的Modbus设备（asyncio非阻塞并发探测）
         
         Args:
             base_ip (str): 基础IP地址 (如: 192.168.1.1)
-            port (int): 端口号，默认502
+            port (int or list): 端口号，默认502，可以是多个端口
             timeout (float): 连接超时时间，默认1.0秒
             ip_range (tuple): IP范围 (start, end)，默认(1, 255)
-            max_workers (int): 最大并发线程数，默认50
+            max_workers (int): 最多同时进行的TCP连接数
+            unit_ids (list): 在开放端口上探测的单元ID
         """
         if self.is_scanning:
             self.log_message.emit("扫描已在进行中...")
@@ -56,97 +59,72 @@ class DeviceScanner(QObject):
             base_ip_prefix = '.'.join(ip_parts[:3])
             
             start_ip, end_ip = ip_range
-            total_ips = end_ip - start_ip + 1
-            scanned_count = 0
-            
-            self.log_message.emit(f'开始扫描网络 {base_ip_prefix}.{start_ip}-{end_ip}:{port}，使用 {max_workers} 个并发线程')
             
             # 生成IP地址列表
             ip_list = [f"{base_ip_prefix}.{i}" for i in range(start_ip, end_ip + 1)]
-            
-            # 使用线程池并发扫描
-            with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                # 提交所有扫描任务
-                future_to_ip = {executor.submit(self._scan_single_device, ip, port, timeout): ip for ip in ip_list}
-                
-                # 处理完成的任务
-                for future in as_completed(future_to_ip):
-                    if not self.is_scanning:  # 检查是否被中断
-                        break
-                        
-                    ip = future_to_ip[future]
-                    scanned_count += 1
-                    
-                    # 发出进度信号
-                    self.scan_progress.emit(scanned_count, total_ips)
-                    
-                    try:
-                        result = future.result()
-                        if result:
-                            device_key = f"{result[0]}:{result[1]}"
-                            # 检查是否已经发现过该设备
-                            if device_key not in self.found_devices_set:
-                                self.found_devices_set.add(device_key)
-                                device_info = result
-                                self.found_devices.append(device_info)
-                                self.device_found.emit(result[0], result[1])
-                                self.log_message.emit(f'发现Modbus设备: {result[0]}:{result[1]}')
-                    except Exception as e:
-                        # 记录单个IP扫描的错误
-                        self.log_message.emit(f'扫描 {ip} 时出错: {str(e)}')
-            
-            self.is_scanning = False
-            self.scan_finished.emit(self.found_devices)
-            self.log_message.emit(f'设备扫描完成，共发现 {len(self.found_devices)} 个设备')
-            
+            self.scan_hosts(ip_list, port, timeout, max_workers, unit_ids,
+                            description=f'{base_ip_prefix}.{start_ip}-{end_ip}:{port}')
         except Exception as e:
             self.is_scanning = False
             error_msg = f'设备扫描出错: {str(e)}'
             self.log_message.emit(error_msg)
             self.scan_error.emit(error_msg)
-    
-    def _scan_single_device(self, ip, port, timeout):
+
+    def scan_hosts(self, hosts, port=502, timeout=1.0, max_workers=DEFAULT_CONCURRENCY, unit_ids=DEFAULT_UNIT_IDS,
+                   description=None):
         """
-        扫描单个设备
+        扫描任意地址列表（可以是/16等大网段），在调用线程中运行事件循环直到扫描结束
+        先扫描开放的端口，再只对开放的端口验证Modbus并探测单元ID
         
         Args:
-            ip (str): IP地址
-            port (int): 端口号
-            timeout (float): 连接超时时间
-            
-        Returns:
-            tuple or None: (ip, port) 如果是Modbus设备，否则None
+            hosts (list): IP地址列表
+            port (int or list): 端口号
+            timeout (float): 连接和等待响应的超时时间
+            max_workers (int): 最多同时进行的TCP连接数
+            unit_ids (list): 在开放端口上探测的单元ID
+            description (str): 日志中显示的扫描范围
         """
+        self.is_scanning = True
+        self._async_scanner = AsyncScanner(ports=port, timeout=timeout, concurrency=max_workers, unit_ids=unit_ids)
+        self.log_message.emit(f'开始扫描网络 {description or f"{len(hosts)} 个地址"}，'
+                              f'最多 {self._async_scanner.concurrency} 个并发连接，'
+                              f'单元ID {", ".join(map(str, self._async_scanner.unit_ids))}')
+        
+        def on_found(result):
+            device_key = f"{result.host}:{result.port}"
+            # 检查是否已经发现过该设备
+            if device_key not in self.found_devices_set:
+                self.found_devices_set.add(device_key)
+                self.found_devices.append((result.host, result.port))
+                self.device_found.emit(result.host, result.port)
+                self.log_message.emit(f'发现Modbus设备: {result.host}:{result.port} '
+                                      f'(单元ID {", ".join(map(str, result.units))})')
+        
+        def on_progress(scanned, total, found):
+            # 发出进度信号
+            self.scan_progress.emit(scanned, total)
+        
         try:
-            # 尝试连接到设备
-            client = ModbusTcpClient(ip, port, timeout=timeout)
-            if client.connect():
-                # 尝试读取一些寄存器来验证是否为Modbus设备
-                try:
-                    rr = client.read_holding_registers(0x0000, 1, slave=1)
-                    if not rr.isError():
-                        client.close()
-                        return (ip, port)
-                except Exception:
-                    client.close()
-                    return None
-                client.close()
-            return None
-        except Exception:
-            if 'client' in locals():
-                client.close()
-            return None
+            self._async_scanner.scan(hosts, on_found=on_found, on_progress=on_progress)
+        finally:
+            self.is_scanning = False
+        stats = self._async_scanner.stats()
+        self.scan_finished.emit(self.found_devices)
+        self.log_message.emit(f'设备扫描完成，{stats["open"]} 个端口开放，共发现 {len(self.found_devices)} 个设备')
     
     def stop_scan(self):
         """停止扫描"""
         self.is_scanning = False
+        if self._async_scanner is not None:
+            self._async_scanner.stop()
         self.log_message.emit('扫描已停止')
 
 
 class ScannerThread(QThread):
     """扫描线程类"""
     
-    def __init__(self, scanner, base_ip, port=502, timeout=1.0, ip_range=(1, 255), max_workers=50):
+    def __init__(self, scanner, base_ip, port=502, timeout=1.0, ip_range=(1, 255), max_workers=DEFAULT_CONCURRENCY,
+                 unit_ids=DEFAULT_UNIT_IDS):
         super().__init__()
         self.scanner = scanner
         self.base_ip = base_ip
@@ -154,9 +132,11 @@ class ScannerThread(QThread):
         self.timeout = timeout
         self.ip_range = ip_range
         self.max_workers = max_workers
+        self.unit_ids = unit_ids
         
     def run(self):
-        self.scanner.scan_network(self.base_ip, self.port, self.timeout, self.ip_range, self.max_workers)
+        self.scanner.scan_network(self.base_ip, self.port, self.timeout, self.ip_range, self.max_workers,
+                                  self.unit_ids)
         
     def stop(self):
         self.scanner.stop_scan()
\ No newline at end of file
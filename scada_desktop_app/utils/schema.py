@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+数据库结构迁移模块
+数据库结构版本保存在 PRAGMA user_version 中，启动时按顺序执行尚未应用的迁移，
+网页版 (app.py) 和桌面版 (DatabaseManager) 共用同一套迁移，已有数据库原地升级
+"""
+
+import logging
+
+from utils.rollups import rollup_table_sql, rebuild_rollups
+
+logger = logging.getLogger(__name__)
+
+
+def _create_base_tables(conn):
+    """版本1: 基础表结构（与升级前的数据库一致）"""
+    # 创建数据记录表
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS data_records (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            recording_id TEXT,
+            timestamp DATETIME,
+            in1_current REAL,
+            in1_voltage REAL,
+            in2_current REAL,
+            in2_voltage REAL,
+            in3_current REAL,
+            in3_voltage REAL,
+            in4_current REAL,
+            in4_voltage REAL,
+            in5_current REAL,
+            in5_voltage REAL,
+            in6_current REAL,
+            in6_voltage REAL,
+            in7_current REAL,
+            in7_voltage REAL,
+            in8_current REAL,
+            in8_voltage REAL,
+            in9_current REAL,
+            in9_voltage REAL,
+            in10_current REAL,
+            in10_voltage REAL,
+            ac_current REAL,
+            vbat_voltage REAL,
+            temperature REAL,
+            humidity REAL,
+            door_status INTEGER,
+            water_status INTEGER,
+            ac_status INTEGER,
+            battery1_voltage REAL,
+            battery2_voltage REAL,
+            battery3_voltage REAL,
+            battery4_voltage REAL,
+            battery5_voltage REAL,
+            battery6_voltage REAL,
+            battery7_voltage REAL,
+            battery8_voltage REAL,
+            total_voltage REAL,
+            current REAL,
+            temperature1 REAL,
+            temperature2 REAL,
+            balance_status INTEGER,
+            charge_discharge_status INTEGER,
+            battery_percentage INTEGER
+        )
+    ''')
+
+    # 创建记录会话表
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS recording_sessions (
+            id TEXT PRIMARY KEY,
+            name TEXT,
+            start_time DATETIME,
+            end_time DATETIME
+        )
+    ''')
+
+    # 创建通信日志表
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS communication_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp DATETIME,
+            message TEXT
+        )
+    ''')
+
+
+def _add_epoch_ms_index(conn):
+    """版本2: 增加整数毫秒时间戳列 ts_ms，并建立 (recording_id, ts_ms) 复合索引"""
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(data_records)')}
+    if 'ts_ms' not in columns:
+        conn.execute('ALTER TABLE data_records ADD COLUMN ts_ms INTEGER')
+    # 旧数据的timestamp为本地时间文本，换算为UTC毫秒
+    conn.execute('''
+        UPDATE data_records
+        SET ts_ms = CAST(ROUND((julianday(timestamp, 'utc') - 2440587.5) * 86400000) AS INTEGER)
+        WHERE ts_ms IS NULL
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_data_records_recording_ts
+        ON data_records (recording_id, ts_ms)
+    ''')
+
+
+def _add_raw_records(conn):
+    """版本3: 原始寄存器样本表 raw_records，记录会话增加存储格式列"""
+    # 按 (recording_id, ts_ms) 聚簇存储，不需要额外的索引
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS raw_records (
+            recording_id TEXT NOT NULL,
+            ts_ms INTEGER NOT NULL,
+            map_version INTEGER NOT NULL,
+            registers BLOB NOT NULL,
+            PRIMARY KEY (recording_id, ts_ms)
+        ) WITHOUT ROWID
+    ''')
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(recording_sessions)')}
+    if 'storage' not in columns:
+        conn.execute("ALTER TABLE recording_sessions ADD COLUMN storage TEXT NOT NULL DEFAULT 'columns'")
+
+
+def _add_rollup_records(conn):
+    """版本4: 1秒/1分钟/1小时汇总表 rollup_records（含各数据项的有效样本数），并为已有记录生成汇总"""
+    conn.execute(rollup_table_sql())
+    rebuild_rollups(conn)
+
+
+def _add_archive_path(conn):
+    """版本5: 记录会话增加归档文件路径列（相对于数据库所在目录）"""
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(recording_sessions)')}
+    if 'archive_path' not in columns:
+        conn.execute('ALTER TABLE recording_sessions ADD COLUMN archive_path TEXT')
+
+
+# (版本号, 迁移函数)，只能在末尾追加
+MIGRATIONS = [
+    (1, _create_base_tables),
+    (2, _add_epoch_ms_index),
+    (3, _add_raw_records),
+    (4, _add_rollup_records),
+    (5, _add_archive_path),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(conn):
+    """读取数据库当前结构版本"""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn):
+    """
+    把数据库升级到最新结构版本，每个迁移在单独的事务中执行
+
+    Args:
+        conn (sqlite3.Connection): 写连接（不能处于未提交的事务中）
+
+    Returns:
+        int: 升级后的结构版本
+    """
+    if conn.in_transaction:
+        conn.commit()
+    current = schema_version(conn)
+    for version, migration in MIGRATIONS:
+        if version <= current:
+            continue
+        try:
+            conn.execute('BEGIN')
+            migration(conn)
+            conn.execute(f'PRAGMA user_version = {int(version)}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            logger.error(f"数据库结构迁移到版本 {version} 失败")
+            raise
+        logger.info(f"数据库结构已升级到版本 {version}")
+        current = version
+    return current
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+SQLite连接管理模块
+一个长期保持的写连接（WAL模式）加一个小的只读连接池：
+WAL模式下读取不会阻塞写入，导出或浏览历史记录时实时记录不再停顿；
+连接不再每次打开关闭，重复执行的SQL由sqlite3的语句缓存复用预编译结果
+"""
+
+import logging
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+def connect_read_only(db_path, timeout=5.0, cached_statements=256):
+    """
+    打开只读URI连接 (mode=ro)，不会创建写连接或修改数据库，
+    供只需要读取的独立进程使用（如导出进程）
+
+    Args:
+        db_path (str): 数据库文件路径（必须已存在）
+        timeout (float): 等待数据库锁的超时时间（秒）
+        cached_statements (int): 缓存的预编译语句数量
+
+    Returns:
+        sqlite3.Connection
+    """
+    uri = f"file:{os.path.abspath(db_path)}?mode=ro"
+    return sqlite3.connect(uri, uri=True, timeout=timeout, check_same_thread=False,
+                           cached_statements=cached_statements)
+
+
+class SQLiteStore:
+    """SQLite数据库连接管理器"""
+
+    def __init__(self, db_path, readers=4, cache_size_kb=16384, mmap_size=256 * 1024 * 1024,
+                 busy_timeout=5.0, cached_statements=256):
+        """
+        Args:
+            db_path (str): 数据库文件路径
+            readers (int): 只读连接池大小，默认4
+            cache_size_kb (int): 每个连接的页缓存大小（KB），默认16MB
+            mmap_size (int): 内存映射读取的字节数，默认256MB
+            busy_timeout (float): 等待数据库锁和空闲只读连接的超时时间（秒），默认5.0
+            cached_statements (int): 每个连接缓存的预编译语句数量，默认256
+        """
+        self.db_path = db_path
+        self.readers = max(1, readers)
+        self.cache_size_kb = cache_size_kb
+        self.mmap_size = mmap_size
+        self.busy_timeout = busy_timeout
+        self.cached_statements = cached_statements
+        self._writer = None
+        self._write_lock = threading.RLock()
+        self._pool = queue.LifoQueue()
+        self._reader_count = 0
+        self._pool_lock = threading.Lock()
+
+    def _connect(self, read_only=False):
+        if read_only:
+            conn = connect_read_only(self.db_path, self.busy_timeout, self.cached_statements)
+        else:
+            conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout, check_same_thread=False,
+                                   cached_statements=self.cached_statements)
+            conn.execute('PRAGMA journal_mode=WAL')
+            # WAL模式下NORMAL只在检查点时同步，掉电最多丢失最近的事务，不会损坏数据库
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA temp_store=MEMORY')
+        conn.execute(f'PRAGMA cache_size=-{int(self.cache_size_kb)}')
+        conn.execute(f'PRAGMA mmap_size={int(self.mmap_size)}')
+        return conn
+
+    @contextmanager
+    def write(self):
+        """
+        获取写连接并在一个事务中执行，正常退出时提交，异常时回滚
+
+        Yields:
+            sqlite3.Connection
+        """
+        with self._write_lock:
+            if self._writer is None:
+                self._writer = self._connect()
+            conn = self._writer
+            try:
+                yield conn
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+
+    @contextmanager
+    def read(self):
+        """
+        从连接池借用一个只读连接
+
+        Yields:
+            sqlite3.Connection
+        """
+        conn = self._acquire_reader()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._pool.put(conn)
+
+    def _acquire_reader(self):
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            pass
+        with self._pool_lock:
+            create = self._reader_count < self.readers
+            if create:
+                self._reader_count += 1
+        if create:
+            try:
+                if self._writer is None:
+                    # 确保数据库文件和WAL模式已由写连接创建
+                    with self.write():
+                        pass
+                return self._connect(read_only=True)
+            except Exception:
+                with self._pool_lock:
+                    self._reader_count -= 1
+                raise
+        try:
+            return self._pool.get(timeout=self.busy_timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError('等待只读数据库连接超时')
+
+    def checkpoint(self):
+        """把WAL内容合并回主数据库文件"""
+        with self.write() as conn:
+            conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+    def close(self):
+        """关闭所有连接"""
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        with self._pool_lock:
+            while True:
+                try:
+                    self._pool.get_nowait().close()
+                except queue.Empty:
+                    break
+                self._reader_count -= 1
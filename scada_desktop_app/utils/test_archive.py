@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+记录归档模块测试
+归档文件读回核对无误后才删除数据库中的样本；归档文件无法读取时重新生成汇总会跳过该记录
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import archive
+from utils.archive import archive_available, archive_recording, verify_archive
+from utils.recorder import BatchRecorder
+from utils.recordings import STORAGE_COLUMNS, STORAGE_PARQUET, STORAGE_RAW, read_recording, recording_storage
+from utils.register_map import REGISTER_MAP
+from utils.rollups import read_rollups, rebuild_rollups
+from utils.schema import migrate
+from utils.sqlite_store import SQLiteStore
+
+BOARD_DATA = dict(
+    {f'IN{i}_current': 100 + i for i in range(1, 11)},
+    **{f'IN{i}_voltage': 12.0 + i / 100 for i in range(1, 11)},
+    AC_current=3, VBAT_voltage=13.5,
+    temperature_sign=1, temperature_value=-5, humidity=40,
+    door_status=0, water_status=1, ac_status=0,
+)
+BMS_DATA = dict(
+    {f'battery{i}_voltage': 3.3 + i / 1000 for i in range(1, 9)},
+    total_voltage=26.5, current=-1.25, temperature1=25.5, temperature2=26.0,
+    balance_status=0, charge_discharge_status=2, battery_percentage=80,
+)
+START = 1_700_000_000
+
+
+@unittest.skipUnless(archive_available(), '没有安装pyarrow')
+class ArchiveTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = SQLiteStore(os.path.join(self.directory.name, 'test.db'))
+        with self.store.write() as conn:
+            migrate(conn)
+
+    def tearDown(self):
+        self.store.close()
+        self.directory.cleanup()
+
+    def record(self, recording_id, storage, samples=20):
+        with self.store.write() as conn:
+            conn.execute('INSERT INTO recording_sessions (id, name, start_time, end_time, storage) '
+                         'VALUES (?, ?, ?, ?, ?)',
+                         (recording_id, recording_id, '2023-11-14T22:13:20', '2023-11-14T22:14:00', storage))
+        recorder = BatchRecorder(self.store, storage=storage, record_interval=0)
+        recorder.start(recording_id)
+        for i in range(samples):
+            board_data = dict(BOARD_DATA, humidity=40 + i)
+            if i % 5 == 0:
+                board_data.update(next(g for g in REGISTER_MAP.groups if g.name == 'board_environment').empty)
+            recorder.record(board_data, BMS_DATA, timestamp=START + i)
+        recorder.stop()
+
+    def test_archive_round_trip(self):
+        for recording_id, storage in (('c', STORAGE_COLUMNS), ('r', STORAGE_RAW)):
+            self.record(recording_id, storage)
+            with self.store.read() as conn:
+                before = read_recording(conn, recording_id)
+            path = archive_recording(self.store, recording_id)
+            self.assertTrue(os.path.exists(path))
+            with self.store.read() as conn:
+                self.assertEqual(recording_storage(conn, recording_id), STORAGE_PARQUET)
+                after = read_recording(conn, recording_id)
+                table = 'data_records' if storage == STORAGE_COLUMNS else 'raw_records'
+                self.assertEqual(conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0], 0)
+            for column in ('ts_ms', 'humidity', 'temperature', 'current'):
+                self.assertEqual(after[column], before[column], column)
+
+    def test_failed_verification_keeps_rows(self):
+        self.record('c', STORAGE_COLUMNS)
+        write_archive = archive.write_archive
+
+        def drop_last_row(conn, path, batches, columns):
+            # 模拟写入不完整：少写最后一个样本
+            batches = list(batches)
+            last = batches[-1]
+            batches[-1] = {name: values[:-1] for name, values in last.items()}
+            return write_archive(conn, path, batches, columns) + 1
+
+        archive.write_archive = drop_last_row
+        try:
+            with self.assertRaises(RuntimeError):
+                archive_recording(self.store, 'c')
+        finally:
+            archive.write_archive = write_archive
+        with self.store.read() as conn:
+            self.assertEqual(recording_storage(conn, 'c'), STORAGE_COLUMNS)
+            self.assertEqual(conn.execute('SELECT COUNT(*) FROM data_records').fetchone()[0], 20)
+        self.assertEqual(os.listdir(os.path.join(self.directory.name, 'archive')), [])
+
+    def test_verify_detects_missing_row(self):
+        self.record('c', STORAGE_COLUMNS)
+        path = archive_recording(self.store, 'c')
+        self.record('d', STORAGE_COLUMNS, samples=21)
+        with self.store.read() as conn:
+            with self.assertRaises(RuntimeError):
+                # 数据库中多出一个归档文件没有的样本
+                verify_archive(conn, path, 'd', list(REGISTER_MAP.columns))
+
+    def test_rebuild_skips_unreadable_archive(self):
+        self.record('r', STORAGE_RAW)
+        os.remove(archive_recording(self.store, 'r'))
+        with self.store.read() as conn:
+            expected = read_rollups(conn, 'r', 1000, ['humidity'])
+        with self.store.write() as conn:
+            with self.assertLogs('utils.rollups', 'WARNING'):
+                rebuild_rollups(conn)
+        with self.store.read() as conn:
+            self.assertEqual(read_rollups(conn, 'r', 1000, ['humidity']), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
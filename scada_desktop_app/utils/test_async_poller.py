@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+多设备异步轮询模块测试
+用asyncio实现的模拟Modbus TCP服务器验证200台设备按1秒周期并发轮询，以及断线后不再提供旧数据
+"""
+
+import asyncio
+import os
+import struct
+import sys
+import threading
+import time
+import unittest
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.async_poller import MultiDevicePoller
+
+
+class FakeModbusServer:
+    """模拟Modbus TCP设备，对任意单元ID的FC03请求返回全0寄存器"""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.server = None
+        self.writers = set()
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+        self.port = self._call(self._start())
+
+    def _call(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(5)
+
+    async def _start(self):
+        self.server = await asyncio.start_server(self._handle, '127.0.0.1', 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def _handle(self, reader, writer):
+        self.writers.add(writer)
+        try:
+            while True:
+                tid, _, _, unit, function, _, count = struct.unpack('>HHHBBHH', await reader.readexactly(12))
+                pdu = struct.pack('>BB', function, count * 2) + bytes(count * 2)
+                writer.write(struct.pack('>HHHB', tid, 0, len(pdu) + 1, unit) + pdu)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.writers.discard(writer)
+            writer.close()
+
+    async def _stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+        for writer in list(self.writers):
+            writer.close()
+
+    def stop(self):
+        if self.loop.is_running():
+            self._call(self._stop())
+            self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+class MultiDevicePollerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeModbusServer()
+        self.poller = None
+
+    def tearDown(self):
+        if self.poller is not None:
+            self.poller.stop()
+        self.server.stop()
+
+    def wait_for(self, condition, timeout):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if condition():
+                return True
+            time.sleep(0.05)
+        return condition()
+
+    def test_poll_200_devices_at_1hz(self):
+        self.poller = MultiDevicePoller(interval=1.0, timeout=1.0)
+        device_ids = [self.poller.add_device('127.0.0.1', self.server.port, slave)
+                      for slave in range(1, 201)]
+        threads = threading.active_count()
+        self.poller.start()
+        # 首次轮询在一个周期内随机错开，之后每秒一次
+        self.assertTrue(self.wait_for(lambda: all(self.poller.snapshot(d) is not None for d in device_ids), 3.0))
+        first = {d: self.poller.snapshot(d).sequence for d in device_ids}
+        time.sleep(3.0)
+
+        for device_id in device_ids:
+            snapshot = self.poller.snapshot(device_id)
+            self.assertTrue(snapshot.ok, device_id)
+            # 3秒内至少完成2次轮询，每台设备都跟得上1秒的周期
+            self.assertGreaterEqual(snapshot.sequence - first[device_id], 2, device_id)
+            self.assertLess(time.time() - snapshot.timestamp, 1.5, device_id)
+        # 不为每台设备创建线程
+        self.assertLess(threading.active_count() - threads, 5)
+
+    def test_snapshot_cleared_on_disconnect(self):
+        self.poller = MultiDevicePoller(interval=0.1, timeout=0.2, reconnect_delay=0.2)
+        device_id = self.poller.add_device('127.0.0.1', self.server.port, 1)
+        self.poller.start()
+        self.assertTrue(self.wait_for(lambda: self.poller.snapshot(device_id) is not None, 2.0))
+        info = self.poller.devices()[0]
+        self.assertTrue(info['connected'])
+        self.assertLess(info['age'], 1.0)
+
+        self.server.stop()
+        self.assertTrue(self.wait_for(lambda: self.poller.snapshot(device_id) is None, 3.0))
+        info = self.poller.devices()[0]
+        self.assertFalse(info['connected'])
+        self.assertIsNone(info['sequence'])
+        self.assertIsNone(info['age'])
+
+
+if __name__ == '__main__':
+    unittest.main()
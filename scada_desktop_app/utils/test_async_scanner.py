@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+异步网络扫描模块测试
+用模拟的Modbus TCP网关验证按主机估计的响应超时：握手很快但响应较慢的网关不会被漏掉，
+响应很快的网关上不存在的单元ID不必等待配置的超时时间
+"""
+
+import asyncio
+import os
+import struct
+import sys
+import time
+import unittest
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.async_scanner import MIN_TIMEOUT, AsyncScanner, HostRtt, open_port, verify_units
+
+
+class FakeGateway:
+    """模拟Modbus TCP网关：对units中的单元ID延迟delay秒后响应FC03请求，其它单元ID不响应"""
+
+    def __init__(self, delay, units=(1,)):
+        self.delay = delay
+        self.units = set(units)
+        self.requests = []
+        self.server = None
+        self.responses = set()
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, '127.0.0.1', 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        for response in list(self.responses):
+            response.cancel()
+        await self.server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                tid, _, _, unit, function, _, count = struct.unpack('>HHHBBHH', await reader.readexactly(12))
+                self.requests.append(unit)
+                if unit in self.units:
+                    response = asyncio.ensure_future(self._respond(writer, tid, unit, function, count))
+                    self.responses.add(response)
+                    response.add_done_callback(self.responses.discard)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, tid, unit, function, count):
+        await asyncio.sleep(self.delay)
+        pdu = struct.pack('>BB', function, count * 2) + bytes(count * 2)
+        writer.write(struct.pack('>HHHB', tid, 0, len(pdu) + 1, unit) + pdu)
+
+
+class HostRttTest(unittest.TestCase):
+
+    def test_clamped_to_limits(self):
+        self.assertEqual(HostRtt(2.0).timeout(), 2.0)
+        self.assertEqual(HostRtt(2.0, rtt=0.001).timeout(), MIN_TIMEOUT)
+        self.assertEqual(HostRtt(2.0, rtt=1.5).timeout(), 2.0)
+        self.assertAlmostEqual(HostRtt(2.0, rtt=0.2).timeout(), 0.6)
+        self.assertEqual(HostRtt(2.0, rtt=0.001, adaptive=False).timeout(), 2.0)
+
+    def test_first_response_replaces_connect_rtt(self):
+        host_rtt = HostRtt(2.0, rtt=0.001)
+        host_rtt.add(0.4)
+        self.assertTrue(host_rtt.answered)
+        self.assertAlmostEqual(host_rtt.timeout(), 1.2)
+
+    def test_backoff(self):
+        host_rtt = HostRtt(1.0, rtt=0.001)
+        self.assertTrue(host_rtt.backoff())
+        self.assertAlmostEqual(host_rtt.timeout(), 2 * MIN_TIMEOUT)
+        self.assertTrue(host_rtt.backoff())
+        self.assertEqual(host_rtt.timeout(), 1.0)
+        self.assertFalse(host_rtt.backoff())
+
+
+class VerifyTimeoutTest(unittest.TestCase):
+
+    def verify(self, gateway, unit_ids, timeout, adaptive=True):
+        async def run():
+            port = await gateway.start()
+            try:
+                sock, rtt = await open_port('127.0.0.1', port, timeout)
+                started = time.monotonic()
+                units, sock = await verify_units(sock, '127.0.0.1', port, unit_ids, timeout,
+                                                 connect_rtt=rtt, adaptive=adaptive)
+                elapsed = time.monotonic() - started
+                if sock is not None:
+                    sock.close()
+                return units, elapsed
+            finally:
+                await gateway.stop()
+        return asyncio.run(run())
+
+    def test_slow_responder_found_despite_fast_handshake(self):
+        # 本机握手不到1毫秒，初始超时为下限0.3秒，响应需要0.5秒
+        gateway = FakeGateway(delay=0.5, units=(1, 3))
+        units, elapsed = self.verify(gateway, (1, 2, 3), timeout=2.0)
+        self.assertEqual(units, (1, 3))
+        # 单元2按估计的超时 (0.5 × 3 = 1.5秒左右) 放弃，不等待配置的2秒
+        self.assertLess(elapsed, 0.5 + 1.8 + 0.5 + 0.5)
+        # 没有响应过时超时后重发了单元1的请求
+        self.assertEqual(gateway.requests[:2], [1, 1])
+
+    def test_fast_responder_skips_missing_units_quickly(self):
+        gateway = FakeGateway(delay=0.01)
+        units, elapsed = self.verify(gateway, tuple(range(1, 7)), timeout=2.0)
+        self.assertEqual(units, (1,))
+        # 5个不存在的单元ID每个等待下限0.3秒，固定超时需要10秒
+        self.assertLess(elapsed, 5 * MIN_TIMEOUT + 1.0)
+
+    def test_fixed_timeout_without_adaptive(self):
+        gateway = FakeGateway(delay=0.01)
+        units, elapsed = self.verify(gateway, (1, 2), timeout=0.8, adaptive=False)
+        self.assertEqual(units, (1,))
+        self.assertGreaterEqual(elapsed, 0.8)
+
+    def test_scanner_finds_slow_gateway(self):
+        gateway = FakeGateway(delay=0.5)
+        loop = asyncio.new_event_loop()
+        try:
+            port = loop.run_until_complete(gateway.start())
+            scanner = AsyncScanner(ports=port, timeout=2.0, unit_ids=(1,))
+            scan = loop.run_in_executor(None, scanner.scan, ['127.0.0.1'])
+            results = loop.run_until_complete(scan)
+            loop.run_until_complete(gateway.stop())
+        finally:
+            loop.close()
+        self.assertEqual([(r.host, r.port, r.units) for r in results], [('127.0.0.1', port, (1,))])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+曲线降采样模块测试
+缺失值不会被当作0值选为极值点，每段缺失值保留一个断点，numpy和纯Python实现结果一致
+"""
+
+import math
+import os
+import random
+import sys
+import unittest
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import downsample
+from utils.downsample import lttb_indices
+
+
+def both_ways(x, y, threshold):
+    """分别用numpy（已安装时）和纯Python实现选点"""
+    results = [lttb_indices(x, y, threshold)] if downsample.np is not None else []
+    saved, downsample.np = downsample.np, None
+    try:
+        results.append(lttb_indices(x, y, threshold))
+    finally:
+        downsample.np = saved
+    return results
+
+
+class LttbTest(unittest.TestCase):
+
+    def setUp(self):
+        self.x = [i * 1000 for i in range(200)]
+
+    def test_without_gaps(self):
+        y = [math.sin(i / 10) for i in range(200)]
+        for keep in both_ways(self.x, y, 20):
+            self.assertEqual(len(keep), 20)
+            self.assertEqual((keep[0], keep[-1]), (0, 199))
+
+    def test_gap_kept_as_single_marker(self):
+        y = [10.0 + (i % 7) for i in range(200)]
+        y[20:25] = [None] * 5
+        for keep in both_ways(self.x, y, 20):
+            self.assertIn(20, keep)
+            self.assertFalse(set(range(21, 25)) & set(keep))
+
+    def test_missing_values_not_selected_as_extremes(self):
+        # 缺失值按0处理时，每个缺失点都会成为面积最大的点
+        y = [10.0] * 200
+        for i in range(5, 200, 10):
+            y[i] = None
+        for keep in both_ways(self.x, y, 20):
+            values = [y[i] for i in keep]
+            self.assertEqual([i for i in keep if y[i] is None], list(range(5, 200, 10)))
+            self.assertEqual(set(v for v in values if v is not None), {10.0})
+
+    def test_nan_treated_as_missing(self):
+        y = [float(i % 5) for i in range(200)]
+        y[100] = float('nan')
+        with_none = list(y)
+        with_none[100] = None
+        for keep, expected in zip(both_ways(self.x, y, 30), both_ways(self.x, with_none, 30)):
+            self.assertEqual(keep, expected)
+            self.assertIn(100, keep)
+
+    def test_numpy_and_python_agree(self):
+        if downsample.np is None:
+            self.skipTest('没有安装numpy')
+        rng = random.Random(1)
+        for _ in range(50):
+            n = rng.randint(10, 500)
+            x = list(range(n))
+            y = [rng.gauss(0, 5) if rng.random() > 0.1 else None for _ in range(n)]
+            threshold = rng.randint(3, n - 1)
+            with_numpy, without_numpy = both_ways(x, y, threshold)
+            self.assertEqual(with_numpy, without_numpy)
+
+    def test_all_missing(self):
+        for keep in both_ways(self.x, [None] * 200, 20):
+            self.assertEqual(keep, [0, 199])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+实时事件推送模块测试
+保留状态中消失的字段以None推送，订阅者不会继续显示旧值
+"""
+
+import json
+import os
+import sys
+import unittest
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.event_bus import EventBus, diff_state, merge_state
+
+
+def parse(frame):
+    """解析SSE文本，返回 (事件名称, 数据)"""
+    fields = dict(line.split(': ', 1) for line in frame.decode('utf-8').strip().split('\n'))
+    return fields['event'], json.loads(fields['data'])
+
+
+class DiffStateTest(unittest.TestCase):
+
+    def test_removed_key_becomes_none(self):
+        self.assertEqual(diff_state({'a': 1, 'b': 2}, {'a': 1}), {'b': None})
+
+    def test_removed_nested_key_becomes_none(self):
+        previous = {'board_data': {'humidity': 50, 'door_status': 0}}
+        self.assertEqual(diff_state(previous, {'board_data': {'door_status': 0}}),
+                         {'board_data': {'humidity': None}})
+
+    def test_removed_key_sent_once(self):
+        state = {'a': 1, 'b': 2}
+        merge_state(state, diff_state(state, {'a': 1}))
+        self.assertEqual(state, {'a': 1, 'b': None})
+        self.assertEqual(diff_state(state, {'a': 1}), {})
+
+    def test_record_replaced_by_none(self):
+        self.assertEqual(diff_state({'bms_data': {'current': 1.0}}, {'bms_data': None}), {'bms_data': None})
+
+
+class EventBusRemovalTest(unittest.TestCase):
+
+    def setUp(self):
+        self.bus = EventBus()
+        self.subscription = self.bus.subscribe()
+        self.subscription.get(timeout=0)  # 完整状态
+
+    def next_event(self):
+        frame = self.subscription.get(timeout=0)
+        self.assertIsNotNone(frame)
+        return parse(frame)
+
+    def test_group_removal_is_published(self):
+        self.bus.publish_state('data', {'sequence': 1, 'board_data': {'IN1_current': 100}, 'bms_data': {'current': 1.0}})
+        self.next_event()
+        self.bus.publish_state('data', {'sequence': 2, 'board_data': {'IN1_current': 100}, 'bms_data': None})
+        self.assertEqual(self.next_event(), ('data', {'sequence': 2, 'bms_data': None}))
+
+    def test_missing_key_is_published(self):
+        self.bus.publish_state('data', {'sequence': 1, 'board_data': {'IN1_current': 100}})
+        self.next_event()
+        self.bus.publish_state('data', {'sequence': 2})
+        self.assertEqual(self.next_event(), ('data', {'sequence': 2, 'board_data': None}))
+
+    def test_new_subscriber_sees_removal(self):
+        self.bus.publish_state('data', {'sequence': 1, 'board_data': {'IN1_current': 100}})
+        self.bus.publish_state('data', {'sequence': 2, 'board_data': None})
+        subscription = self.bus.subscribe()
+        event, state = parse(subscription.get(timeout=0))
+        self.assertEqual((event, state['data']), ('state', {'sequence': 2, 'board_data': None}))
+
+
+if __name__ == '__main__':
+    unittest.main()
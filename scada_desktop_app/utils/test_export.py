@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+记录导出模块测试
+导出进程使用只读连接，Excel导出的写入进度可以从进程池中报告回来
+"""
+
+import csv
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.export import QueueProgress, export_recording_file
+from utils.recorder import BatchRecorder
+from utils.schema import migrate
+from utils.sqlite_store import SQLiteStore, connect_read_only
+
+BOARD_DATA = dict(
+    {f'IN{i}_current': 100 for i in range(1, 11)},
+    **{f'IN{i}_voltage': 12.0 for i in range(1, 11)},
+    AC_current=3, VBAT_voltage=13.5,
+    temperature_sign=0, temperature_value=20, humidity=50,
+    door_status=1, water_status=0, ac_status=0,
+)
+BMS_DATA = dict(
+    {f'battery{i}_voltage': 3.3 for i in range(1, 9)},
+    total_voltage=26.4, current=1.0, temperature1=25.0, temperature2=25.0,
+    balance_status=0, charge_discharge_status=1, battery_percentage=80,
+)
+SAMPLES = 12
+
+
+class ExportFileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.directory.name, 'test.db')
+        self.store = SQLiteStore(self.db_path)
+        with self.store.write() as conn:
+            migrate(conn)
+            conn.execute('INSERT INTO recording_sessions (id, name, start_time) VALUES (?, ?, ?)',
+                         ('r1', 'test', '2023-11-14T22:13:20'))
+        recorder = BatchRecorder(self.store, record_interval=0)
+        recorder.start('r1')
+        for i in range(SAMPLES):
+            recorder.record(BOARD_DATA, BMS_DATA, timestamp=1_700_000_000 + i)
+        recorder.stop()
+
+    def tearDown(self):
+        self.store.close()
+        self.directory.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def test_read_only_connection(self):
+        conn = connect_read_only(self.db_path)
+        try:
+            with self.assertRaises(sqlite3.OperationalError):
+                conn.execute('DELETE FROM recording_sessions')
+        finally:
+            conn.close()
+
+    def test_csv_export(self):
+        recording_id, file_path, written = export_recording_file(self.db_path, 'r1', self.path('r1.csv'))
+        self.assertEqual((recording_id, file_path), ('r1', self.path('r1.csv')))
+        with open(file_path, encoding='utf-8-sig') as f:
+            self.assertEqual(len(list(csv.reader(f))), SAMPLES + 1)
+
+    def test_xlsx_progress(self):
+        progress = []
+        _, _, written = export_recording_file(self.db_path, 'r1', self.path('r1.xlsx'),
+                                              progress=lambda done, total: progress.append((done, total)))
+        self.assertEqual(written, SAMPLES)
+        self.assertEqual(progress[-1], (SAMPLES, SAMPLES))
+
+    def test_progress_from_process_pool(self):
+        with multiprocessing.Manager() as manager:
+            progress_queue = manager.Queue()
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                future = executor.submit(export_recording_file, self.db_path, 'r1', self.path('r1.xlsx'),
+                                         QueueProgress(progress_queue, 'r1'))
+                self.assertEqual(future.result(timeout=60)[2], SAMPLES)
+            self.assertEqual(progress_queue.get(timeout=5), ('r1', SAMPLES, SAMPLES))
+
+
+if __name__ == '__main__':
+    unittest.main()
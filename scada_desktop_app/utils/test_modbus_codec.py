@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+精简Modbus TCP编解码模块测试
+用socketpair模拟设备，验证正常响应的解码和畸形响应帧的拒绝
+"""
+
+import os
+import socket
+import struct
+import sys
+import unittest
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymodbus.exceptions import ModbusIOException
+
+from utils.modbus_codec import ResponseReader, RegisterResponse, ErrorResponse
+
+
+def frame(tid, unit, pdu, length=None):
+    """构造响应帧，length默认为单元ID加PDU的长度"""
+    return struct.pack('>HHHB', tid, 0, len(pdu) + 1 if length is None else length, unit) + pdu
+
+
+class ResponseReaderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.device, self.client = socket.socketpair()
+        self.client.settimeout(1.0)
+        self.reader = ResponseReader()
+        # 事务ID 7：单元ID 1，读取2个寄存器
+        self.expected = {7: (1, 2)}
+
+    def tearDown(self):
+        self.device.close()
+        self.client.close()
+
+    def read(self, data, expected=None):
+        self.device.sendall(data)
+        return self.reader.read(self.client, self.expected if expected is None else expected)
+
+    def test_registers(self):
+        tid, response = self.read(frame(7, 1, struct.pack('>BBHH', 0x03, 4, 1234, 5678)))
+        self.assertEqual(tid, 7)
+        self.assertIsInstance(response, RegisterResponse)
+        self.assertEqual(response.registers, [1234, 5678])
+
+    def test_exception_response(self):
+        tid, response = self.read(frame(7, 1, struct.pack('>BB', 0x83, 2)))
+        self.assertIsInstance(response, ErrorResponse)
+        self.assertEqual(response.exception_code, 2)
+
+    def test_late_response_checks_structure_only(self):
+        # 不在expected中的事务ID不校验单元ID和寄存器数量
+        tid, response = self.read(frame(9, 5, struct.pack('>BBH', 0x03, 2, 42)))
+        self.assertEqual((tid, response.registers), (9, [42]))
+
+    def test_wrong_function_code(self):
+        with self.assertRaises(ModbusIOException):
+            self.read(frame(7, 1, struct.pack('>BBHH', 0x04, 4, 1, 2)))
+
+    def test_wrong_exception_function_code(self):
+        with self.assertRaises(ModbusIOException):
+            self.read(frame(7, 1, struct.pack('>BB', 0x84, 2)))
+
+    def test_wrong_unit(self):
+        with self.assertRaises(ModbusIOException):
+            self.read(frame(7, 2, struct.pack('>BBHH', 0x03, 4, 1, 2)))
+
+    def test_byte_count_mismatch(self):
+        # 请求2个寄存器，响应只有1个
+        with self.assertRaises(ModbusIOException):
+            self.read(frame(7, 1, struct.pack('>BBH', 0x03, 2, 1)))
+
+    def test_byte_count_exceeds_frame(self):
+        # 字节数声称4个字节，帧中只有2个
+        with self.assertRaises(ModbusIOException):
+            self.read(frame(7, 1, struct.pack('>BBH', 0x03, 4, 1)))
+
+    def test_odd_byte_count(self):
+        with self.assertRaises(ModbusIOException):
+            self.read(frame(9, 1, struct.pack('>BBBB', 0x03, 3, 1, 2)))
+
+    def test_missing_byte_count(self):
+        with self.assertRaises(ModbusIOException):
+            self.read(frame(7, 1, b'\x03'))
+
+    def test_invalid_header(self):
+        with self.assertRaises(ModbusIOException):
+            self.read(struct.pack('>HHHB', 7, 1, 5, 1) + struct.pack('>BBH', 0x03, 2, 1))
+
+    def test_stream_stays_in_sync_after_rejected_frame(self):
+        self.device.sendall(frame(7, 2, struct.pack('>BBHH', 0x03, 4, 1, 2)) +
+                            frame(7, 1, struct.pack('>BBHH', 0x03, 4, 3, 4)))
+        with self.assertRaises(ModbusIOException):
+            self.reader.read(self.client, self.expected)
+        self.assertEqual(self.reader.read(self.client, self.expected)[1].registers, [3, 4])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+流水线Modbus TCP传输模块测试
+用模拟设备验证：不支持流水线的设备只响应部分请求时切换为串行重试，收到畸形响应帧时关闭连接并在下次读取时重连
+"""
+
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+import unittest
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.modbus_codec import ErrorResponse
+from utils.pipelined_transport import PipelinedModbusTransport
+
+
+class FakeDevice:
+    """
+    模拟Modbus TCP设备，寄存器值等于地址
+
+    pipelining为False时模拟不支持流水线的设备：处理一个请求期间收到的其它请求被丢弃。
+    malformed_responses次数内的响应以错误的功能码返回。
+    """
+
+    def __init__(self, pipelining=True, malformed_responses=0):
+        self.pipelining = pipelining
+        self.malformed_responses = malformed_responses
+        self.connections = 0
+        self.requests = []
+        self.listener = socket.create_server(('127.0.0.1', 0))
+        self.port = self.listener.getsockname()[1]
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self.listener.accept()
+            except OSError:
+                return
+            self.connections += 1
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        with conn:
+            try:
+                while True:
+                    request = self._recv_exact(conn, 12)
+                    if request is None:
+                        return
+                    tid, _, _, unit, function, address, count = struct.unpack('>HHHBBHH', request)
+                    self.requests.append((address, count))
+                    if not self.pipelining:
+                        time.sleep(0.05)
+                        self._discard(conn)
+                    if self.malformed_responses > 0:
+                        self.malformed_responses -= 1
+                        function = 0x04
+                    pdu = struct.pack('>BB', function, count * 2) + struct.pack(
+                        f'>{count}H', *range(address, address + count))
+                    conn.sendall(struct.pack('>HHHB', tid, 0, len(pdu) + 1, unit) + pdu)
+            except OSError:
+                return
+
+    @staticmethod
+    def _recv_exact(conn, size):
+        data = b''
+        while len(data) < size:
+            chunk = conn.recv(size - len(data))
+            if not chunk:
+                return None
+            data += chunk
+        return data
+
+    @staticmethod
+    def _discard(conn):
+        conn.setblocking(False)
+        try:
+            while conn.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+        finally:
+            conn.setblocking(True)
+
+    def close(self):
+        self.listener.close()
+
+
+class PipelinedTransportTest(unittest.TestCase):
+
+    REQUESTS = [(0x0000, 22), (0x0016, 6), (0x0100, 8), (0x0108, 7)]
+
+    def make(self, device):
+        self.addCleanup(device.close)
+        transport = PipelinedModbusTransport('127.0.0.1', device.port, timeout=0.3)
+        self.addCleanup(transport.close)
+        return transport
+
+    def assertRegisters(self, results):
+        for (address, count), (rr, _) in zip(self.REQUESTS, results):
+            self.assertFalse(rr.isError(), rr)
+            self.assertEqual(rr.registers, list(range(address, address + count)))
+
+    def test_pipelined_reads(self):
+        device = FakeDevice()
+        transport = self.make(device)
+        self.assertRegisters(transport.read_holding_registers_many(self.REQUESTS))
+        self.assertTrue(transport.pipelining)
+        self.assertEqual(device.connections, 1)
+
+    def test_partial_batch_falls_back_to_serial(self):
+        device = FakeDevice(pipelining=False)
+        transport = self.make(device)
+        results = transport.read_holding_registers_many(self.REQUESTS)
+        # 第一个请求得到响应，其余的在重连后串行重试
+        self.assertRegisters(results)
+        self.assertFalse(transport.pipelining)
+        self.assertEqual(device.connections, 2)
+        self.assertEqual(device.requests[0], self.REQUESTS[0])
+        self.assertEqual(device.requests[-3:], self.REQUESTS[1:])
+
+        # 之后的读取保持串行模式
+        self.assertRegisters(transport.read_holding_registers_many(self.REQUESTS))
+        self.assertEqual(device.connections, 2)
+
+    def test_malformed_frame_closes_and_reconnects(self):
+        device = FakeDevice(malformed_responses=1)
+        transport = self.make(device)
+        results = transport.read_holding_registers_many(self.REQUESTS[:1])
+        self.assertIsInstance(results[0][0], ErrorResponse)
+        self.assertFalse(transport.is_socket_open())
+
+        self.assertRegisters(transport.read_holding_registers_many(self.REQUESTS))
+        self.assertEqual(device.connections, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Modbus读取规划模块测试
+合并块中某个可选分组返回异常响应时，同一块中的其它分组仍能读取到数据
+"""
+
+import os
+import sys
+import unittest
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymodbus.pdu import ExceptionResponse
+from pymodbus.register_read_message import ReadHoldingRegistersResponse
+
+from utils.read_planner import RegisterBlock, plan_reads, read_blocks
+from utils.register_map import REGISTER_MAP, BOARD_RECORD
+
+
+class FakeClient:
+    """模拟设备：地址等于寄存器值，读取区间包含bad_addresses中的地址时返回异常码2"""
+
+    def __init__(self, bad_addresses=()):
+        self.bad_addresses = set(bad_addresses)
+        self.requests = []
+
+    def read_holding_registers(self, address, count=1, slave=1):
+        self.requests.append((address, count))
+        if self.bad_addresses.intersection(range(address, address + count)):
+            return ExceptionResponse(0x03, 2)
+        return ReadHoldingRegistersResponse(list(range(address, address + count)))
+
+
+class PlanReadsTest(unittest.TestCase):
+
+    def test_adjacent_ranges_merged_with_parts(self):
+        self.assertEqual(plan_reads([(0x0016, 3), (0x0000, 22), (0x0019, 3)]), [RegisterBlock(0x0000, 28)])
+        block = plan_reads([(0x0000, 22), (0x0016, 3)])[0]
+        self.assertEqual(block.parts, ((0x0000, 22), (0x0016, 3)))
+
+    def test_long_range_split(self):
+        blocks = plan_reads([(0, 200)])
+        self.assertEqual(blocks, [RegisterBlock(0, 125), RegisterBlock(125, 75)])
+        self.assertEqual(blocks[1].parts, ((125, 75),))
+
+
+class ReadBlocksTest(unittest.TestCase):
+
+    def test_single_read_when_all_succeed(self):
+        client = FakeClient()
+        image, failures = read_blocks(client, plan_reads(REGISTER_MAP.ranges(BOARD_RECORD)))
+        self.assertEqual(failures, [])
+        self.assertEqual(client.requests, [(0x0000, 28)])
+
+    def test_optional_group_exception_keeps_required_group(self):
+        # 状态分组（0x0019起，可选）的寄存器不存在
+        client = FakeClient(bad_addresses={0x001A})
+        transactions = []
+        image, failures = read_blocks(client, plan_reads(REGISTER_MAP.ranges(BOARD_RECORD)),
+                                      on_transaction=lambda ok, latency, error: transactions.append(ok))
+        self.assertEqual(client.requests, [(0x0000, 28), (0x0000, 22), (0x0016, 3), (0x0019, 3)])
+        self.assertEqual(transactions, [False, True, True, False])
+        self.assertEqual([(b.address, b.count) for b, _ in failures], [(0x0019, 3)])
+
+        data, missing = REGISTER_MAP.decode_record(image, BOARD_RECORD)
+        self.assertIsNotNone(data)
+        self.assertEqual(missing, ['board_status'])
+        self.assertIsNotNone(data['humidity'])
+        self.assertIsNone(data['door_status'])
+
+    def test_required_group_exception_fails_record(self):
+        client = FakeClient(bad_addresses={0x0005})
+        image, failures = read_blocks(client, plan_reads(REGISTER_MAP.ranges(BOARD_RECORD)))
+        data, missing = REGISTER_MAP.decode_record(image, BOARD_RECORD)
+        self.assertIsNone(data)
+        self.assertEqual(missing, ['board_power'])
+
+    def test_connection_error_not_retried(self):
+        class BrokenClient(FakeClient):
+            def read_holding_registers(self, address, count=1, slave=1):
+                self.requests.append((address, count))
+                raise ConnectionError('连接已断开')
+
+        client = BrokenClient()
+        image, failures = read_blocks(client, plan_reads(REGISTER_MAP.ranges(BOARD_RECORD)))
+        self.assertEqual(client.requests, [(0x0000, 28)])
+        self.assertEqual(len(failures), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
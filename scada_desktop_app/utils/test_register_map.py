@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+寄存器地址表打包样本测试
+验证完整记录的往返，以及缺失的可选分组在raw格式中读回为None
+"""
+
+import os
+import sqlite3
+import sys
+import unittest
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import register_map
+from utils.recordings import STORAGE_RAW, read_recording
+from utils.register_map import REGISTER_MAP, REGISTER_MAP_VERSION
+from utils.schema import migrate
+
+BOARD_DATA = dict(
+    {f'IN{i}_current': 100 + i for i in range(1, 11)},
+    **{f'IN{i}_voltage': 12.0 + i / 100 for i in range(1, 11)},
+    AC_current=3, VBAT_voltage=13.5,
+    temperature_sign=1, temperature_value=-5, humidity=0,
+    door_status=0, water_status=1, ac_status=0,
+)
+BMS_DATA = dict(
+    {f'battery{i}_voltage': 3.3 + i / 1000 for i in range(1, 9)},
+    total_voltage=26.5, current=-1.25, temperature1=25.5, temperature2=26.0,
+    balance_status=0, charge_discharge_status=2, battery_percentage=80,
+)
+MISSING_COLUMNS = ('temperature', 'humidity', 'door_status', 'water_status', 'ac_status')
+
+
+def board_without_optional_groups():
+    """可选的环境和状态分组没有读取到时的二号板记录"""
+    data = dict(BOARD_DATA)
+    for group in REGISTER_MAP.groups:
+        if group.name in ('board_environment', 'board_status'):
+            data.update(group.empty)
+    return data
+
+
+class PackedSampleTest(unittest.TestCase):
+
+    def assertColumns(self, decoded, board_data, bms_data):
+        expected = REGISTER_MAP.column_values(board_data, bms_data, default=None)
+        for column, value in zip(REGISTER_MAP.columns, expected):
+            if value is None:
+                self.assertIsNone(decoded[column][0], column)
+            else:
+                self.assertAlmostEqual(decoded[column][0], value, places=6, msg=column)
+
+    def unpack_both_ways(self, sample):
+        """分别用numpy（已安装时）和逐行方式解码"""
+        results = [REGISTER_MAP.unpack_samples(sample)] if register_map.np is not None else []
+        saved, register_map.np = register_map.np, None
+        try:
+            results.append(REGISTER_MAP.unpack_samples(sample))
+        finally:
+            register_map.np = saved
+        return results
+
+    def test_full_record_round_trip(self):
+        sample = REGISTER_MAP.pack_sample(BOARD_DATA, BMS_DATA)
+        self.assertEqual(len(sample), REGISTER_MAP.sample_size)
+        for decoded in self.unpack_both_ways(sample):
+            self.assertColumns(decoded, BOARD_DATA, BMS_DATA)
+            # 合法的0值不会被当作缺失
+            self.assertEqual(decoded['humidity'], [0])
+            self.assertEqual(decoded['door_status'], [0])
+
+    def test_missing_optional_groups_decode_as_none(self):
+        board_data = board_without_optional_groups()
+        sample = REGISTER_MAP.pack_sample(board_data, BMS_DATA)
+        for decoded in self.unpack_both_ways(sample):
+            for column in MISSING_COLUMNS:
+                self.assertEqual(decoded[column], [None], column)
+            self.assertColumns(decoded, board_data, BMS_DATA)
+
+    def test_raw_records_round_trip(self):
+        conn = sqlite3.connect(':memory:')
+        migrate(conn)
+        conn.execute('INSERT INTO recording_sessions (id, name, start_time, storage) VALUES (?, ?, ?, ?)',
+                     ('r1', 'test', '2026-01-01T00:00:00', STORAGE_RAW))
+        samples = [(1000, BOARD_DATA), (2000, board_without_optional_groups())]
+        conn.executemany('INSERT INTO raw_records (recording_id, ts_ms, map_version, registers) VALUES (?, ?, ?, ?)',
+                         [('r1', ts, REGISTER_MAP_VERSION, REGISTER_MAP.pack_sample(board, BMS_DATA))
+                          for ts, board in samples])
+        data = read_recording(conn, 'r1', columns=['temperature', 'humidity', 'door_status', 'in1_current'])
+        self.assertEqual(data['ts_ms'], [1000, 2000])
+        self.assertEqual(data['temperature'], [-5, None])
+        self.assertEqual(data['humidity'], [0, None])
+        self.assertEqual(data['door_status'], [0, None])
+        self.assertEqual(data['in1_current'], [101, 101])
+
+
+if __name__ == '__main__':
+    unittest.main()
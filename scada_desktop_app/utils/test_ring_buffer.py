@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+近期样本环形缓冲区模块测试
+读取的窗口在持有锁时复制，采集线程继续追加也不会混入新样本；趋势图使用的曲线数据转换不依赖PyQt5
+"""
+
+import math
+import os
+import sys
+import threading
+import unittest
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.ring_buffer import SampleRingBuffer, ring_buffer_available
+
+CHANNELS = ['humidity', 'temperature', 'current']
+
+
+@unittest.skipUnless(ring_buffer_available(), '没有安装numpy')
+class SampleRingBufferTest(unittest.TestCase):
+
+    def test_window_not_changed_by_later_appends(self):
+        buffer = SampleRingBuffer(10, CHANNELS)
+        for i in range(10):
+            buffer.append(i, [i, i, i])
+        window = buffer.last()
+        for i in range(10, 25):
+            buffer.append(i, [i, i, i])
+        self.assertEqual(window.timestamps.tolist(), list(range(10)))
+        self.assertEqual(window.channel('current').tolist(), list(range(10)))
+
+    def test_concurrent_reads_are_consistent(self):
+        # 每个样本的所有值都等于时间戳，读到的窗口中任何一行不一致都说明混入了新旧样本
+        buffer = SampleRingBuffer(50, CHANNELS)
+        done = threading.Event()
+
+        def writer():
+            for i in range(20000):
+                buffer.append(float(i), [float(i)] * len(CHANNELS))
+            done.set()
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        reads = 0
+        while not done.is_set() or reads == 0:
+            window = buffer.window(20, now=float(buffer.total))
+            timestamps = window.timestamps.tolist()
+            self.assertEqual(timestamps, sorted(timestamps))
+            for column in range(len(CHANNELS)):
+                self.assertEqual(window.values[:, column].tolist(), timestamps)
+            reads += 1
+        thread.join()
+
+    def test_chart_series(self):
+        buffer = SampleRingBuffer(4, CHANNELS)
+        for i in range(6):
+            buffer.append(100.0 + i, [40 + i, None if i == 4 else 20.5, -1])
+        timestamps, values = buffer.last().series('temperature')
+        self.assertEqual(timestamps, [102.0, 103.0, 104.0, 105.0])
+        self.assertIsInstance(values, list)
+        self.assertEqual(values[:2], [20.5, 20.5])
+        self.assertTrue(math.isnan(values[2]))
+
+        timestamps, values = buffer.window(1.5, now=105.0).series('humidity')
+        self.assertEqual((timestamps, values), ([104.0, 105.0], [44.0, 45.0]))
+
+    def test_empty_series(self):
+        buffer = SampleRingBuffer(4, CHANNELS)
+        self.assertEqual(buffer.last().series('current'), ([], []))
+        self.assertEqual(buffer.window(60).series('current'), ([], []))
+        self.assertIsNone(buffer.latest())
+
+
+if __name__ == '__main__':
+    unittest.main()
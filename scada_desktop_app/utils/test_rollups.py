@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+数据汇总模块测试
+可选分组没有读取到的样本（数据项为None）不计入该数据项的平均值
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.recorder import BatchRecorder
+from utils.recordings import STORAGE_COLUMNS, STORAGE_RAW
+from utils.register_map import REGISTER_MAP
+from utils.rollups import read_rollups, rebuild_rollups, recording_summary
+from utils.schema import migrate
+from utils.sqlite_store import SQLiteStore
+
+BOARD_DATA = dict(
+    {f'IN{i}_current': 100 for i in range(1, 11)},
+    **{f'IN{i}_voltage': 12.0 for i in range(1, 11)},
+    AC_current=3, VBAT_voltage=13.5,
+    temperature_sign=0, temperature_value=20, humidity=50,
+    door_status=1, water_status=0, ac_status=0,
+)
+BMS_DATA = dict(
+    {f'battery{i}_voltage': 3.3 for i in range(1, 9)},
+    total_voltage=26.4, current=1.0, temperature1=25.0, temperature2=25.0,
+    balance_status=0, charge_discharge_status=1, battery_percentage=80,
+)
+START = 1_700_000_000  # 整小时，两个样本落在同一个1秒/1分钟/1小时桶中
+
+
+def board_without_environment():
+    data = dict(BOARD_DATA)
+    data.update(next(g for g in REGISTER_MAP.groups if g.name == 'board_environment').empty)
+    return data
+
+
+class RollupAverageTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = SQLiteStore(os.path.join(self.directory.name, 'test.db'))
+        with self.store.write() as conn:
+            migrate(conn)
+
+    def tearDown(self):
+        self.store.close()
+        self.directory.cleanup()
+
+    def record(self, storage):
+        """记录一个完整样本和一个没有环境分组的样本"""
+        with self.store.write() as conn:
+            conn.execute('INSERT INTO recording_sessions (id, name, start_time, storage) VALUES (?, ?, ?, ?)',
+                         (storage, storage, '2023-11-14T22:13:20', storage))
+        recorder = BatchRecorder(self.store, storage=storage)
+        recorder.start(storage)
+        recorder.record(BOARD_DATA, BMS_DATA, timestamp=START)
+        recorder.record(board_without_environment(), BMS_DATA, timestamp=START + 0.5)
+        recorder.stop()
+        return storage
+
+    def assertAverages(self, recording_id):
+        with self.store.read() as conn:
+            for resolution in (1000, 60 * 1000, 3600 * 1000):
+                rollup = read_rollups(conn, recording_id, resolution, ['temperature', 'humidity', 'door_status'])
+                self.assertEqual(rollup['count'], [2])
+                self.assertEqual(rollup['temperature_avg'], [20.0])
+                self.assertEqual(rollup['temperature_min'], [20.0])
+                self.assertEqual(rollup['humidity_avg'], [50.0])
+                # 状态分组两个样本都有值
+                self.assertEqual(rollup['door_status_avg'], [1.0])
+            summary = recording_summary(conn, recording_id, ['temperature', 'humidity', 'door_status'])
+        self.assertEqual(summary['count'], 2)
+        self.assertEqual(summary['averages'], {'temperature': 20.0, 'humidity': 50.0, 'door_status': 1.0})
+
+    def test_incremental_columns(self):
+        self.assertAverages(self.record(STORAGE_COLUMNS))
+
+    def test_incremental_raw(self):
+        self.assertAverages(self.record(STORAGE_RAW))
+
+    def test_rebuild_columns(self):
+        recording_id = self.record(STORAGE_COLUMNS)
+        with self.store.write() as conn:
+            rebuild_rollups(conn, recording_id)
+        self.assertAverages(recording_id)
+
+    def test_rebuild_raw(self):
+        recording_id = self.record(STORAGE_RAW)
+        with self.store.write() as conn:
+            rebuild_rollups(conn, recording_id)
+        self.assertAverages(recording_id)
+
+    def test_channel_without_samples_has_no_average(self):
+        with self.store.write() as conn:
+            conn.execute('INSERT INTO recording_sessions (id, name, start_time, storage) VALUES (?, ?, ?, ?)',
+                         ('empty', 'empty', '2023-11-14T22:13:20', STORAGE_COLUMNS))
+        recorder = BatchRecorder(self.store)
+        recorder.start('empty')
+        recorder.record(board_without_environment(), BMS_DATA, timestamp=START)
+        recorder.stop()
+        with self.store.read() as conn:
+            rollup = read_rollups(conn, 'empty', 1000, ['temperature', 'in1_current'])
+        self.assertEqual(rollup['temperature_avg'], [None])
+        self.assertEqual(rollup['in1_current_avg'], [100.0])
+
+    def test_duplicate_raw_sample_counted_once(self):
+        with self.store.write() as conn:
+            conn.execute('INSERT INTO recording_sessions (id, name, start_time, storage) VALUES (?, ?, ?, ?)',
+                         ('dup', 'dup', '2023-11-14T22:13:20', STORAGE_RAW))
+        recorder = BatchRecorder(self.store, storage=STORAGE_RAW, record_interval=0)
+        recorder.start('dup')
+        recorder.record(BOARD_DATA, BMS_DATA, timestamp=START)
+        # 同一毫秒的第二个样本被raw_records忽略，也不能计入汇总
+        hotter = dict(BOARD_DATA, temperature_value=40)
+        recorder.record(hotter, BMS_DATA, timestamp=START)
+        recorder.stop()
+        self.assertEqual(recorder.rows_written, 1)
+        with self.store.read() as conn:
+            rollup = read_rollups(conn, 'dup', 1000, ['temperature'])
+            summary = recording_summary(conn, 'dup', ['temperature'])
+        self.assertEqual(rollup['count'], [1])
+        self.assertEqual(rollup['temperature_avg'], [20.0])
+        self.assertEqual(rollup['temperature_max'], [20.0])
+        self.assertEqual(summary['count'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Modbus事务队列模块
+共享客户端上的所有设备I/O由一个工作线程串行执行，避免多个线程交错使用同一个socket；
+相同key的并发请求合并为一次执行（single-flight），所有调用者共享同一结果
+"""
+
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+class TransactionQueue:
+    """串行事务队列"""
+
+    def __init__(self, name='modbus-io'):
+        """
+        Args:
+            name (str): 工作线程名称
+        """
+        self.name = name
+        self._queue = queue.Queue()
+        self._in_flight = {}  # {key: Future}
+        self._lock = threading.Lock()
+        self._thread = None
+        self.coalesced_count = 0  # 被合并的请求数量
+
+    def start(self):
+        """启动工作线程"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """处理完已提交的事务后停止工作线程"""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is None:
+            return
+        self._queue.put(None)
+        if thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def in_worker(self):
+        """当前线程是否为工作线程"""
+        return self._thread is threading.current_thread()
+
+    def submit(self, func, *args, key=None, **kwargs):
+        """
+        提交事务
+
+        Args:
+            func (callable): 在工作线程中执行的函数
+            key (hashable): 合并键，相同key且尚未完成的事务只执行一次；为None时不合并
+
+        Returns:
+            concurrent.futures.Future
+        """
+        with self._lock:
+            if key is not None:
+                future = self._in_flight.get(key)
+                if future is not None:
+                    self.coalesced_count += 1
+                    return future
+            future = Future()
+            if key is not None:
+                self._in_flight[key] = future
+        self.start()
+        self._queue.put((key, func, args, kwargs, future))
+        return future
+
+    def call(self, func, *args, key=None, timeout=None, **kwargs):
+        """提交事务并等待结果；在工作线程中调用时直接执行，避免死锁"""
+        if self.in_worker():
+            return func(*args, **kwargs)
+        return self.submit(func, *args, key=key, **kwargs).result(timeout)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            key, func, args, kwargs, future = item
+            if not future.set_running_or_notify_cancel():
+                self._finish(key)
+                continue
+            try:
+                result = func(*args, **kwargs)
+            except BaseException as e:
+                self._finish(key)
+                future.set_exception(e)
+            else:
+                self._finish(key)
+                future.set_result(result)
+
+    def _finish(self, key):
+        if key is not None:
+            with self._lock:
+                self._in_flight.pop(key, None)
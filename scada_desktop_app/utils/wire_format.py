@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+记录数据传输格式模块
+columnar: JSON中每列一个数组，时间戳差分编码（t0 + 相邻差值）；
+binary: 固定报文头 + JSON描述 + 小端数组（时间差int32，数据float32，缺失值为NaN），
+浏览器可直接用TypedArray读取，无需逐行解析；响应体按客户端支持的编码进行gzip/brotli压缩
+"""
+
+import gzip
+import json
+import math
+import struct
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import brotli
+except ImportError:  # brotli为可选依赖，没有时只使用gzip
+    brotli = None
+
+FORMAT_ROWS = 'rows'
+FORMAT_COLUMNAR = 'columnar'
+FORMAT_BINARY = 'binary'
+FORMATS = (FORMAT_ROWS, FORMAT_COLUMNAR, FORMAT_BINARY)
+
+BINARY_MIMETYPE = 'application/vnd.modbus-recording'
+
+# 二进制报文头: 魔数, 版本, 保留, JSON描述长度
+BINARY_MAGIC = b'MBRC'
+BINARY_VERSION = 1
+_BINARY_HEADER = struct.Struct('<4sHHI')
+
+# 不随数据列传输的字段（可由时间戳推出）
+_SKIPPED_FIELDS = ('ts_ms', 'timestamp', 'recording_id')
+
+
+def _deltas(ts_ms):
+    return [0] + [b - a for a, b in zip(ts_ms, ts_ms[1:])]
+
+
+def _value_fields(data):
+    return [name for name in data if name not in _SKIPPED_FIELDS]
+
+
+def encode_columnar(data, meta=None):
+    """
+    编码为列式JSON对象
+
+    Args:
+        data (dict): {'ts_ms': [...], 列名: [...]}
+        meta (dict): 附加的元信息（分页游标、降采样方式等）
+
+    Returns:
+        dict: 可JSON序列化的对象
+    """
+    ts_ms = data.get('ts_ms', [])
+    result = dict(meta or {})
+    result.update({
+        'format': FORMAT_COLUMNAR,
+        'count': len(ts_ms),
+        't0': ts_ms[0] if ts_ms else None,
+        'dt': _deltas(ts_ms),
+        'columns': {name: data[name] for name in _value_fields(data)},
+    })
+    return result
+
+
+def _pad(size, alignment=8):
+    return (alignment - size % alignment) % alignment
+
+
+def _pack_array(values, code):
+    if np is not None:
+        dtype = '<f4' if code == 'f' else '<i4'
+        if code == 'f':
+            return np.array([np.nan if v is None else v for v in values], dtype=dtype).tobytes()
+        return np.asarray(values, dtype=dtype).tobytes()
+    if code == 'f':
+        values = [math.nan if v is None else v for v in values]
+    return struct.pack(f'<{len(values)}{code}', *values)
+
+
+def encode_binary(data, meta=None):
+    """
+    编码为二进制格式
+
+    布局: 报文头(12字节) | JSON描述(补齐到8字节) | 各数组(每个补齐到8字节)
+    JSON描述中 arrays 列出每个数组的名称、类型(int32/float32)、相对数据区的偏移和元素个数，
+    名为 dt 的数组是相对 t0 的时间差分
+
+    Returns:
+        bytes
+    """
+    ts_ms = data.get('ts_ms', [])
+    chunks = []
+    arrays = []
+    offset = 0
+    fields = [('dt', 'int32', _deltas(ts_ms))] + [
+        (name, 'int32' if name == 'count' else 'float32', data[name]) for name in _value_fields(data)
+    ]
+    for name, type, values in fields:
+        chunk = _pack_array(values, 'i' if type == 'int32' else 'f')
+        chunk += b'\0' * _pad(len(chunk))
+        arrays.append({'name': name, 'type': type, 'offset': offset, 'length': len(values)})
+        chunks.append(chunk)
+        offset += len(chunk)
+
+    description = dict(meta or {})
+    description.update({'count': len(ts_ms), 't0': ts_ms[0] if ts_ms else None, 'arrays': arrays})
+    header_json = json.dumps(description, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    header_json += b' ' * _pad(_BINARY_HEADER.size + len(header_json))
+    return (_BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, 0, len(header_json))
+            + header_json + b''.join(chunks))
+
+
+def accepted_encodings(accept_encoding):
+    """解析Accept-Encoding请求头，返回可接受的编码集合（忽略q=0的编码）"""
+    encodings = set()
+    for item in (accept_encoding or '').split(','):
+        parts = item.strip().split(';')
+        name = parts[0].strip().lower()
+        quality = 1.0
+        for param in parts[1:]:
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    pass
+        if name and quality > 0:
+            encodings.add(name)
+    return encodings
+
+
+def compress(body, accept_encoding, min_size=1024):
+    """
+    按客户端支持的编码压缩响应体，优先brotli
+
+    Returns:
+        tuple: (响应体, Content-Encoding或None)
+    """
+    if len(body) < min_size:
+        return body, None
+    encodings = accepted_encodings(accept_encoding)
+    if brotli is not None and 'br' in encodings:
+        return brotli.compress(body, quality=5), 'br'
+    if 'gzip' in encodings:
+        return gzip.compress(body, compresslevel=6), 'gzip'
+    return body, None
@@ -109,6 +109,12 @@ let connectionCheckInterval = null;
 let isRecording = false;
 let recordingId = null;
 
+// 实时事件推送 (Server-Sent Events)
+let liveEvents = null;
+let liveData = {};
+let renderedSequence = null;
+let lastLogSeq = 0;  // 已显示的最新日志序号
+
 // 图表相关变量
 let dataChart = null;
 let chartData = {};
@@ -119,9 +125,9 @@ function initApp() {
     setupEventListeners();
     updateWelcomeMessage();
     startBeijingTime();
-    startConnectionCheck();
-    startLogUpdate();
+    startLiveEvents();
     initChart();
+    loadChartHistory();
 }
 
 // 加载配置
@@ -142,7 +148,7 @@ function setupEventListeners() {
     elements.disconnectBtn.addEventListener('click', disconnect);
     elements.refreshBtn.addEventListener('click', refreshData);
     elements.autoRefreshBtn.addEventListener('click', toggleAutoRefresh);
-    elements.chartDataType.addEventListener('change', updateChart);
+    elements.chartDataType.addEventListener('change', loadChartHistory);
     elements.clearChartBtn.addEventListener('click', clearChart);
     
     // 数据记录控制事件
@@ -177,9 +183,7 @@ function updateAutoRefreshInterval() {
         const interval = parseInt(elements.refreshInterval.value) || 5;
         
         // 设置新的定时器
-        autoRefreshInterval = setInterval(async () => {
-            await refreshData();
-        }, interval * 1000);
+        autoRefreshInterval = setInterval(autoRefreshTick, interval * 1000);
         
         // 显示消息
         showMessage(`自动刷新间隔已更新为${interval}秒`, 'success');
@@ -352,24 +356,134 @@ async function refreshData() {
         
         if (data.board_data) {
             updateBoardData(data.board_data);
+        } else if (data.board_data === null) {
+            clearElements(BOARD_ELEMENT_KEYS);
         }
         
         if (data.bms_data) {
             updateBmsData(data.bms_data);
+        } else if (data.bms_data === null) {
+            clearElements(BMS_ELEMENT_KEYS);
         }
         
         updateSummaryData(data);
         updateChartData(data);
-        
-        // 如果正在记录数据，保存当前数据
-        if (isRecording) {
-            await saveCurrentData();
-        }
     } catch (error) {
         showMessage('刷新数据失败: ' + error.message, 'error');
     }
 }
 
+// 自动刷新：有实时推送时显示推送的最新数据，否则请求/api/data
+async function autoRefreshTick() {
+    if (liveEvents) {
+        renderLiveData();
+    } else {
+        await refreshData();
+    }
+}
+
+// 显示推送的最新数据（与上一次显示相同的采集结果不再重复显示）
+function renderLiveData() {
+    if (liveData.sequence === undefined || liveData.sequence === renderedSequence) {
+        return;
+    }
+    renderedSequence = liveData.sequence;
+    // 记录为null表示本次没有读取到（设备或分组掉线），清除显示而不是保留旧值
+    if (liveData.board_data) {
+        updateBoardData(liveData.board_data);
+    } else if (liveData.board_data === null) {
+        clearElements(BOARD_ELEMENT_KEYS);
+    }
+    if (liveData.bms_data) {
+        updateBmsData(liveData.bms_data);
+    } else if (liveData.bms_data === null) {
+        clearElements(BMS_ELEMENT_KEYS);
+    }
+    updateSummaryData(liveData);
+    updateChartData(liveData);
+}
+
+// 把增量合并到本地状态
+function mergeState(target, delta) {
+    Object.entries(delta).forEach(([key, value]) => {
+        if (value && typeof value === 'object' && target[key] && typeof target[key] === 'object') {
+            mergeState(target[key], value);
+        } else {
+            target[key] = (value && typeof value === 'object') ? { ...value } : value;
+        }
+    });
+    return target;
+}
+
+// 订阅服务器推送的数据、日志和状态变化，取代定时轮询
+function startLiveEvents() {
+    if (typeof EventSource === 'undefined') {
+        // 浏览器不支持SSE时退回定时轮询
+        startConnectionCheck();
+        startLogUpdate();
+        return;
+    }
+
+    liveEvents = new EventSource('/api/events');
+
+    // 连接（或断线重连）后先收到完整状态
+    liveEvents.addEventListener('state', event => {
+        const state = JSON.parse(event.data);
+        liveData = state.data ? mergeState({}, state.data) : {};
+        renderedSequence = null;
+        if (state.status) {
+            applyConnectionStatus(state.status);
+        }
+        if (state.recording) {
+            applyRecordingStatus(state.recording);
+        }
+        updateLogs();
+        if (isConnected && autoRefreshInterval) {
+            renderLiveData();
+        }
+    });
+
+    liveEvents.addEventListener('data', event => {
+        mergeState(liveData, JSON.parse(event.data));
+    });
+
+    liveEvents.addEventListener('status', event => {
+        applyConnectionStatus(JSON.parse(event.data));
+    });
+
+    liveEvents.addEventListener('recording', event => {
+        const delta = JSON.parse(event.data);
+        applyRecordingStatus({ is_recording: isRecording, recording_id: recordingId, ...delta });
+    });
+
+    liveEvents.addEventListener('log', event => {
+        appendLog(JSON.parse(event.data));
+    });
+
+    liveEvents.addEventListener('scan', event => {
+        const progress = JSON.parse(event.data);
+        scannedCount = progress.scanned;
+        totalCount = progress.total;
+        openCount = progress.open || 0;
+        updateScanProgress();
+    });
+
+    liveEvents.addEventListener('scan_done', event => {
+        finishScan(JSON.parse(event.data));
+    });
+
+    liveEvents.addEventListener('scan_device', event => {
+        if (isScanning) {
+            appendScanResult(JSON.parse(event.data));
+        }
+    });
+
+    liveEvents.onerror = () => {
+        // EventSource会自动重连，重连后重新收到完整状态
+        console.warn('实时推送连接中断，正在重连...');
+    };
+}
+
 // 更新二号板数据
 function updateBoardData(data) {
     // 电源监测数据
@@ -399,7 +513,7 @@ function updateBoardData(data) {
     // 环境监测数据
     if (data.temperature_value !== undefined) {
         const tempValue = data.temperature_value;
-        const tempText = tempValue >= 0 ? `+${tempValue}` : `${tempValue}`;
+        const tempText = tempValue === null ? null : (tempValue >= 0 ? `+${tempValue}` : `${tempValue}`);
         updateElement(elements.temperature, tempText);
     }
     updateElement(elements.humidity, data.humidity);
@@ -474,11 +588,31 @@ function updateSummaryData(data) {
     }
 }
 
-// 更新元素值并添加动画
+// 没有读取到的数据显示的文字
+const MISSING_TEXT = '--';
+
+// 记录整体缺失时需要清除的元素
+const BOARD_ELEMENT_KEYS = [...Array(10).keys()]
+    .flatMap(i => [`in${i + 1}Current`, `in${i + 1}Voltage`])
+    .concat(['acCurrent', 'vbatVoltage', 'temperature', 'humidity', 'doorStatus', 'waterStatus', 'acStatus',
+             'summaryIn1Voltage', 'summaryIn4Voltage', 'summaryIn7Voltage', 'summaryIn10Voltage']);
+const BMS_ELEMENT_KEYS = [...Array(8).keys()]
+    .map(i => `battery${i + 1}Voltage`)
+    .concat(['totalVoltage', 'current', 'temperature1', 'temperature2', 'balanceStatus',
+             'chargeDischargeStatus', 'batteryPercentage', 'summaryBattery1Voltage', 'summaryBattery4Voltage',
+             'summaryTotalVoltage', 'summaryCurrent', 'summaryBatteryPercentage']);
+
+// 把一组元素显示为缺失
+function clearElements(keys) {
+    keys.forEach(key => updateElement(elements[key], null));
+}
+
+// 更新元素值并添加动画（undefined表示不变，null表示数据缺失）
 function updateElement(element, value) {
-    if (element && value !== undefined && value !== null) {
+    if (element && value !== undefined) {
+        const text = value === null ? MISSING_TEXT : String(value);
         // 只有当值真正改变时才触发动画
-        if (element.textContent !== String(value)) {
+        if (element.textContent !== text) {
             // 添加更新动画
             element.classList.remove('updated');
             // 使用setTimeout确保动画能够重新触发
@@ -486,15 +620,15 @@ function updateElement(element, value) {
                 element.classList.add('updated');
             }, 10);
             
-            element.textContent = value;
+            element.textContent = text;
         }
     }
 }
 
-// 更新状态元素
+// 更新状态元素（null表示数据缺失）
 function updateStatusElement(element, value, statusMap) {
-    if (element && value !== undefined && value !== null) {
-        const statusText = statusMap[value] || value;
+    if (element && value !== undefined) {
+        const statusText = value === null ? MISSING_TEXT : String(statusMap[value] || value);
         
         // 只有当值真正改变时才触发动画
         if (element.textContent !== statusText) {
@@ -527,9 +661,7 @@ function toggleAutoRefresh() {
     } else {
         // 开始自动刷新
         const interval = parseInt(elements.refreshInterval.value) || 5;
-        autoRefreshInterval = setInterval(async () => {
-            await refreshData();
-        }, interval * 1000);
+        autoRefreshInterval = setInterval(autoRefreshTick, interval * 1000);
         elements.autoRefreshBtn.textContent = '停止自动刷新';
         elements.autoRefreshBtn.className = 'btn-primary';
         showMessage(`已开始自动刷新，间隔${interval}秒`, 'success');
@@ -576,6 +708,25 @@ async function startRecording() {
     }
 }
 
+// 根据推送的记录状态更新界面（其他页面开始或停止记录时同步）
+function applyRecordingStatus(status) {
+    if (status.is_recording === isRecording) {
+        return;
+    }
+    isRecording = status.is_recording;
+    recordingId = status.recording_id;
+    elements.startRecordingBtn.disabled = isRecording || !isConnected;
+    elements.stopRecordingBtn.disabled = !isRecording;
+    if (isRecording) {
+        updateRecordingStatus(status.name || status.recording_id, new Date());
+    } else {
+        const recordingStatusEl = document.getElementById('recordingStatus');
+        if (recordingStatusEl) {
+            recordingStatusEl.remove();
+        }
+    }
+}
+
 // 更新记录状态显示
 function updateRecordingStatus(name, startTime) {
     // 创建记录状态显示元素
@@ -633,49 +784,36 @@ async function stopRecording() {
     }
 }
 
-// 保存当前数据
-async function saveCurrentData() {
+// 更新日志（只获取上次之后的新日志）
+async function updateLogs() {
     try {
-        const response = await fetch('/api/save-data', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            }
-        });
-        
+        const response = await fetch(`/api/logs?since=${lastLogSeq}`);
         const result = await response.json();
         
-        if (!result.success) {
-            console.error('保存数据失败:', result.error);
-            showMessage('保存数据失败: ' + result.error, 'error');
+        if (result.entries && result.entries.length > 0) {
+            // 显示最新的20条日志
+            result.entries.slice(-20).forEach(appendLog);
         }
     } catch (error) {
-        console.error('保存数据出错:', error);
-        showMessage('保存数据出错: ' + error.message, 'error');
+        console.error('更新日志失败:', error);
     }
 }
 
-// 更新日志
-async function updateLogs() {
-    try {
-        const response = await fetch('/api/logs');
-        const logs = await response.json();
-        
-        if (logs && logs.length > 0) {
-            elements.logContent.innerHTML = '';
-            // 显示最新的20条日志
-            const displayLogs = logs.slice(-20);
-            displayLogs.forEach(log => {
-                const logDiv = document.createElement('div');
-                logDiv.textContent = log;
-                elements.logContent.appendChild(logDiv);
-            });
-            // 滚动到底部
-            elements.logContent.scrollTop = elements.logContent.scrollHeight;
-        }
-    } catch (error) {
-        console.error('更新日志失败:', error);
+// 追加一条日志（只保留最新的20条，已显示过的序号忽略）
+function appendLog(entry) {
+    if (entry.seq <= lastLogSeq) {
+        return;
+    }
+    lastLogSeq = entry.seq;
+    const logDiv = document.createElement('div');
+    logDiv.textContent = entry.text;
+    logDiv.className = `log-${entry.level}`;
+    elements.logContent.appendChild(logDiv);
+    while (elements.logContent.childElementCount > 20) {
+        elements.logContent.removeChild(elements.logContent.firstElementChild);
     }
+    // 滚动到底部
+    elements.logContent.scrollTop = elements.logContent.scrollHeight;
 }
 
 // 清除日志
@@ -729,46 +867,50 @@ async function checkConnectionStatus() {
     try {
         const response = await fetch('/api/connection-status');
         const status = await response.json();
-        
-        // 更新UI状态
-        if (status.connected !== isConnected) {
-            isConnected = status.connected;
-            if (isConnected) {
-                elements.connectBtn.disabled = true;
-                elements.disconnectBtn.disabled = false;
-                elements.startRecordingBtn.disabled = false;
-                elements.statusText.textContent = '已连接';
-                elements.statusIndicator.className = 'status-indicator connected';
-            } else {
-                elements.connectBtn.disabled = false;
-                elements.disconnectBtn.disabled = true;
-                elements.startRecordingBtn.disabled = true;
-                elements.stopRecordingBtn.disabled = true;
-                elements.statusText.textContent = '连接已断开';
-                elements.statusIndicator.className = 'status-indicator disconnected';
-                
-                // 停止自动刷新
-                if (autoRefreshInterval) {
-                    clearInterval(autoRefreshInterval);
-                    autoRefreshInterval = null;
-                    elements.autoRefreshBtn.textContent = '开始自动刷新';
-                    elements.autoRefreshBtn.className = 'btn-secondary';
-                }
-                
-                // 停止数据记录
-                if (isRecording) {
-                    isRecording = false;
-                    showMessage('检测到服务器连接已断开，已停止数据记录', 'error');
-                }
-                
-                showMessage('检测到服务器连接已断开', 'error');
-            }
-        }
+        applyConnectionStatus(status);
     } catch (error) {
         console.error('检查连接状态失败:', error);
     }
 }
 
+// 根据连接状态更新界面
+function applyConnectionStatus(status) {
+    // 更新UI状态
+    if (status.connected !== isConnected) {
+        isConnected = status.connected;
+        if (isConnected) {
+            elements.connectBtn.disabled = true;
+            elements.disconnectBtn.disabled = false;
+            elements.startRecordingBtn.disabled = false;
+            elements.statusText.textContent = '已连接';
+            elements.statusIndicator.className = 'status-indicator connected';
+        } else {
+            elements.connectBtn.disabled = false;
+            elements.disconnectBtn.disabled = true;
+            elements.startRecordingBtn.disabled = true;
+            elements.stopRecordingBtn.disabled = true;
+            elements.statusText.textContent = '连接已断开';
+            elements.statusIndicator.className = 'status-indicator disconnected';
+            
+            // 停止自动刷新
+            if (autoRefreshInterval) {
+                clearInterval(autoRefreshInterval);
+                autoRefreshInterval = null;
+                elements.autoRefreshBtn.textContent = '开始自动刷新';
+                elements.autoRefreshBtn.className = 'btn-secondary';
+            }
+            
+            // 停止数据记录
+            if (isRecording) {
+                isRecording = false;
+                showMessage('检测到服务器连接已断开，已停止数据记录', 'error');
+            }
+            
+            showMessage('检测到服务器连接已断开', 'error');
+        }
+    }
+}
+
 // 启动日志更新
 function startLogUpdate() {
     setInterval(updateLogs, 2000); // 每2秒更新一次日志
@@ -1013,6 +1155,32 @@ function updateChartData(data) {
     }
 }
 
+// 从服务端近期历史中加载当前数据项最近的数据点
+async function loadChartHistory() {
+    const selectedType = elements.chartDataType.value;
+    try {
+        const response = await fetch(`/api/history?columns=${selectedType}&last=100&format=columnar`);
+        if (response.ok) {
+            const result = await response.json();
+            const labels = [];
+            const values = [];
+            let ts = result.t0;
+            result.dt.forEach((delta, i) => {
+                ts += delta;
+                const value = result.columns[selectedType][i];
+                if (value === null) return;
+                const date = new Date(ts);
+                labels.push(`${date.getHours().toString().padStart(2, '0')}:${date.getMinutes().toString().padStart(2, '0')}:${date.getSeconds().toString().padStart(2, '0')}`);
+                values.push(value);
+            });
+            chartData[selectedType] = { labels, values };
+        }
+    } catch (error) {
+        console.error('加载近期历史失败:', error);
+    }
+    updateChart();
+}
+
 // 更新图表显示
 function updateChart() {
     if (!dataChart) return;
@@ -1056,10 +1224,10 @@ function clearChart() {
 }
 
 // 全局变量用于控制扫描过程
-let scanAbortController = null;
 let isScanning = false;
 let scannedCount = 0;
 let totalCount = 0;
+let openCount = 0;
 
 // 扫描网络中的Modbus设备
 async function scanDevices() {
@@ -1077,8 +1245,9 @@ async function scanDevices() {
     
     // 初始化扫描控制
     isScanning = true;
-    scanAbortController = new AbortController();
     scannedCount = 0;
+    totalCount = 0;
+    openCount = 0;
     
     // 更新进度文本
     updateScanProgress();
@@ -1092,92 +1261,88 @@ async function scanDevices() {
             body: JSON.stringify({
                 network: '192.168.1.0/24', // 默认网络范围
                 port: 502, // 默认Modbus端口
-                timeout: 1, // 减少超时时间以加快扫描
-                max_workers: 100 // 增加并发数以加快扫描
-            }),
-            signal: scanAbortController.signal
+                timeout: 1 // 减少超时时间以加快扫描（并发数由服务器决定）
+            })
         });
         
         const result = await response.json();
         
-        // 隐藏进度条
-        elements.scanProgress.style.display = 'none';
-        
-        // 恢复扫描按钮
-        elements.scanDevicesBtn.style.display = 'inline-block';
-        elements.stopScanBtn.style.display = 'none';
-        isScanning = false;
-        
-        if (result.success) {
-            if (result.devices.length > 0) {
-                // 显示扫描结果
-                result.devices.forEach(device => {
-                    const deviceElement = document.createElement('div');
-                    deviceElement.className = 'scan-result-item';
-                    deviceElement.innerHTML = `
-                        <div style="display: flex; justify-content: space-between; align-items: center; padding: 8px; border-bottom: 1px solid #eee;">
-                            <div>
-                                <strong>${device.ip}</strong>
-                                <span style="margin-left: 10px; color: #666;">端口: ${device.port}</span>
-                            </div>
-                            <button class="btn-secondary btn-sm" onclick="selectDevice('${device.ip}', ${device.port})" style="padding: 4px 8px; font-size: 12px;">
-                                <i class="fas fa-check"></i> 选择
-                            </button>
-                        </div>
-                    `;
-                    elements.scanResultsList.appendChild(deviceElement);
-                });
-                
-                showMessage(`扫描完成，发现 ${result.devices.length} 个设备`, 'success');
-            } else {
-                elements.scanResultsList.innerHTML = '<p style="text-align: center; color: #999; padding: 20px;">未发现Modbus设备</p>';
-                showMessage('扫描完成，未发现设备', 'info');
-            }
-        } else {
-            elements.scanResultsList.innerHTML = `<p style="color: red; text-align: center; padding: 20px;">扫描失败: ${result.error}</p>`;
-            showMessage(`扫描失败: ${result.error}`, 'error');
+        // 服务器在后台扫描，结果通过scan_done事件推送
+        if (!response.ok) {
+            finishScan(result);
         }
     } catch (error) {
-        // 检查是否是用户主动停止扫描
-        if (error.name === 'AbortError') {
+        finishScan({ success: false, error: error.message });
+    }
+}
+
+// 扫描结束（请求失败或收到scan_done事件）
+function finishScan(result) {
+    if (!isScanning) return;
+    isScanning = false;
+    
+    // 隐藏进度条，恢复扫描按钮
+    elements.scanProgress.style.display = 'none';
+    elements.scanDevicesBtn.style.display = 'inline-block';
+    elements.stopScanBtn.style.display = 'none';
+    
+    if (result.success) {
+        if (result.devices.length > 0) {
+            // 显示扫描结果（推送时已显示的设备不再重复添加）
+            result.devices.forEach(appendScanResult);
+            
+            showMessage(`扫描${result.stopped ? '已停止' : '完成'}，发现 ${result.devices.length} 个设备`, 'success');
+        } else if (result.stopped) {
             elements.scanResultsList.innerHTML = '<p style="text-align: center; color: #999; padding: 20px;">扫描已停止</p>';
             showMessage('扫描已停止', 'info');
         } else {
-            // 隐藏进度条
-            elements.scanProgress.style.display = 'none';
-            elements.scanResultsList.innerHTML = `<p style="color: red; text-align: center; padding: 20px;">扫描出错: ${error.message}</p>`;
-            showMessage(`扫描出错: ${error.message}`, 'error');
+            elements.scanResultsList.innerHTML = '<p style="text-align: center; color: #999; padding: 20px;">未发现Modbus设备</p>';
+            showMessage('扫描完成，未发现设备', 'info');
         }
-        
-        // 恢复扫描按钮
-        elements.scanDevicesBtn.style.display = 'inline-block';
-        elements.stopScanBtn.style.display = 'none';
-        isScanning = false;
+    } else {
+        elements.scanResultsList.innerHTML = `<p style="color: red; text-align: center; padding: 20px;">扫描失败: ${result.error}</p>`;
+        showMessage(`扫描失败: ${result.error}`, 'error');
     }
 }
 
-// 更新扫描进度显示
+// 更新扫描进度显示（进度由服务器推送）
 function updateScanProgress() {
     if (isScanning) {
-        elements.scanProgressText.textContent = `${scannedCount}/254`;
-        setTimeout(updateScanProgress, 100); // 每100毫秒更新一次
+        elements.scanProgressText.textContent = `${scannedCount}/${totalCount || 254}`
+            + (openCount ? `，开放端口 ${openCount}` : '');
+    }
+}
+
+// 添加一个扫描结果（扫描过程中由服务器推送，扫描结束后由响应补全）
+function appendScanResult(device) {
+    const key = `${device.ip}:${device.port}`;
+    if (elements.scanResultsList.querySelector(`[data-device="${key}"]`)) {
+        return;
     }
+    const units = device.units && device.units.length ? device.units.join(', ') : '';
+    const deviceElement = document.createElement('div');
+    deviceElement.className = 'scan-result-item';
+    deviceElement.dataset.device = key;
+    deviceElement.innerHTML = `
+        <div style="display: flex; justify-content: space-between; align-items: center; padding: 8px; border-bottom: 1px solid #eee;">
+            <div>
+                <strong>${device.ip}</strong>
+                <span style="margin-left: 10px; color: #666;">端口: ${device.port}</span>
+                ${units ? `<span style="margin-left: 10px; color: #666;">单元ID: ${units}</span>` : ''}
+            </div>
+            <button class="btn-secondary btn-sm" onclick="selectDevice('${device.ip}', ${device.port})" style="padding: 4px 8px; font-size: 12px;">
+                <i class="fas fa-check"></i> 选择
+            </button>
+        </div>
+    `;
+    elements.scanResultsList.appendChild(deviceElement);
 }
 
-// 停止扫描设备
+// 停止扫描设备（已发现的设备随scan_done事件返回）
 function stopScanDevices() {
-    if (isScanning && scanAbortController) {
-        scanAbortController.abort();
-        isScanning = false;
-        
-        // 恢复按钮状态
-        elements.scanDevicesBtn.style.display = 'inline-block';
+    if (isScanning) {
+        fetch('/api/scan-devices/stop', { method: 'POST' }).catch(() => {});
         elements.stopScanBtn.style.display = 'none';
-        
-        // 更新界面
-        elements.scanProgress.style.display = 'none';
-        elements.scanResultsList.innerHTML = '<p style="text-align: center; color: #999; padding: 20px;">扫描已停止</p>';
-        
         showMessage('正在停止扫描...', 'info');
     }
 }
@@ -1200,12 +1365,15 @@ document.addEventListener('visibilitychange', function() {
     } else if (!document.hidden && autoRefreshInterval) {
         // 页面显示时重新开始自动刷新
         const interval = parseInt(elements.refreshInterval.value) || 5;
-        autoRefreshInterval = setInterval(refreshData, interval * 1000);
+        autoRefreshInterval = setInterval(autoRefreshTick, interval * 1000);
     }
 });
 
 // 页面卸载时清理
 window.addEventListener('beforeunload', function() {
+    if (liveEvents) {
+        liveEvents.close();
+    }
     if (connectionCheckInterval) {
         clearInterval(connectionCheckInterval);
     }